@@ -63,9 +63,21 @@
         }
     });
 
+    // Same read-your-writes hint as search.js (stored by payment.js)
+    function primaryReadHeaders() {
+        const until = localStorage.getItem('siaaPrimaryUntil');
+        if (until && Number(until) > Date.now() / 1000) {
+            return { 'X-Siaa-Primary-Until': until };
+        }
+        localStorage.removeItem('siaaPrimaryUntil');
+        return {};
+    }
+
     async function fetchSpaceDetails(spaceId, startDate, endDate) {
         try {
-            const res = await fetch(`${API_BASE_URL}/spaces/${spaceId}`);
+            const res = await fetch(`${API_BASE_URL}/spaces/${spaceId}`, {
+                headers: primaryReadHeaders()
+            });
             if (!res.ok) throw new Error('Failed to fetch space details');
 
             const data = await res.json();
@@ -204,6 +204,12 @@
             body: JSON.stringify(payload)
         });
 
+        // Reads right after the booking must see it (see the backend's reads_from_primary)
+        const primaryUntil = res.headers.get('X-Siaa-Primary-Until');
+        if (primaryUntil) {
+            localStorage.setItem('siaaPrimaryUntil', primaryUntil);
+        }
+
         let data = null;
         try {
             data = await res.json();
@@ -3,9 +3,25 @@
 
 const API_BASE_URL = 'http://localhost:5000/api';
 
+// Sends the read-your-writes hint stored by payment.js after a booking, so
+// searches right after it are answered by the primary database
+function primaryReadHeaders() {
+    const until = localStorage.getItem('siaaPrimaryUntil');
+    if (until && Number(until) > Date.now() / 1000) {
+        return { 'X-Siaa-Primary-Until': until };
+    }
+    localStorage.removeItem('siaaPrimaryUntil');
+    return {};
+}
+
 let currentUser = null;
 let allSpaces = [];
 
+// The search API returns one page at a time (50 spaces by default);
+// nextCursor asks for the page after the ones shown, null when there is none
+let currentParams = new URLSearchParams();
+let nextCursor = null;
+
 // Wait for DOM to be fully loaded
 document.addEventListener('DOMContentLoaded', () => {
     console.log('Si\'aa search page loaded');
@@ -126,42 +142,46 @@ async function searchSpaces() {
     
     console.log('Searching with params:', params.toString());
     
-    try {
-        const response = await fetch(`${API_BASE_URL}/spaces/search?${params}`);
-        const data = await response.json();
-        
-        if (data.success) {
-            allSpaces = data.spaces;
-            displayResults(data.spaces);
-        } else {
-            console.error('Search failed:', data.error);
-            showNoResults();
-        }
-    } catch (error) {
-        console.error('Search error:', error);
-        showNoResults();
-    }
+    currentParams = params;
+    await fetchSearchPage(false);
 }
 
 async function loadStorageSpaces() {
     // Load all available spaces on page load
     console.log('Loading all spaces...');
     
+    currentParams = new URLSearchParams();
+    await fetchSearchPage(false);
+}
+
+async function fetchSearchPage(append) {
+    // First page of currentParams, or (append) the page after nextCursor
+    const params = new URLSearchParams(currentParams);
+    if (append && nextCursor) {
+        params.append('after', nextCursor);
+    }
+    
     try {
-        const response = await fetch(`${API_BASE_URL}/spaces/search`);
+        const response = await fetch(`${API_BASE_URL}/spaces/search?${params}`, {
+            headers: primaryReadHeaders()
+        });
         const data = await response.json();
         
         if (data.success) {
-            allSpaces = data.spaces;
-            displayResults(data.spaces);
+            nextCursor = data.hasMore ? data.nextCursor : null;
+            allSpaces = append ? allSpaces.concat(data.spaces) : data.spaces;
+            displayResults(append ? data.spaces : allSpaces, append);
+        } else {
+            console.error('Search failed:', data.error);
+            if (!append) showNoResults();
         }
     } catch (error) {
-        console.error('Error loading spaces:', error);
-        showNoResults();
+        console.error('Search error:', error);
+        if (!append) showNoResults();
     }
 }
 
-function displayResults(spaces) {
+function displayResults(spaces, append = false) {
     const resultsList = document.querySelector('.storage-results__list');
     
     if (!resultsList) {
@@ -169,13 +189,17 @@ function displayResults(spaces) {
         return;
     }
     
-    if (!spaces || spaces.length === 0) {
+    if (!append && (!spaces || spaces.length === 0)) {
         showNoResults();
         return;
     }
     
-    // Clear existing results
-    resultsList.innerHTML = '';
+    if (append) {
+        resultsList.querySelector('.storage-results__more')?.remove();
+    } else {
+        // Clear existing results
+        resultsList.innerHTML = '';
+    }
     
     // Add each space as a card with stagger
     spaces.forEach((space, index) => {
@@ -192,9 +216,36 @@ function displayResults(spaces) {
         }
     });
     
+    renderLoadMore(resultsList);
     console.log(`Displayed ${spaces.length} results`);
 }
 
+function renderLoadMore(resultsList) {
+    // A "Load more" button under the cards while more pages exist
+    if (!nextCursor) return;
+    
+    const more = document.createElement('div');
+    more.className = 'storage-results__more';
+    more.style.cssText = 'padding: 20px; text-align: center;';
+    more.innerHTML = `
+        <button type="button" style="padding: 10px 24px; cursor: pointer;">
+            Load more (showing ${allSpaces.length})
+        </button>
+    `;
+    const button = more.querySelector('button');
+    button.addEventListener('click', async () => {
+        button.disabled = true;
+        button.textContent = 'Loading...';
+        await fetchSearchPage(true);
+        // Still here when the request failed: let the user try again
+        if (button.isConnected) {
+            button.disabled = false;
+            button.textContent = `Load more (showing ${allSpaces.length})`;
+        }
+    });
+    resultsList.appendChild(more);
+}
+
 
 function createStorageCard(space) {
     const article = document.createElement('article');
@@ -0,0 +1,226 @@
+"""
+Admission control and per-client rate limiting
+
+Every API request belongs to a traffic class (booking, login, search, bulk).
+Before its handler runs it passes two gates:
+
+    RateLimiter          a token bucket per (client, class): rejects a client
+                         sending faster than its class allows with 429
+    AdmissionController  caps the requests running at once, in total and per
+                         class; the rest wait in a queue ordered by class
+                         priority, so bookings and payments get the next free
+                         slot ahead of waiting searches
+
+Overload is shed with 503 instead of piling up: a request that waits longer
+than `max_wait` gives up, a full queue rejects new arrivals, and once the
+last admitted request of a class waited longer than `shed_wait`, arrivals of
+that class that would have to queue are rejected at once.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class Rejected(Exception):
+    """Request refused; `status` is 429 or 503, `retry_after` in seconds"""
+
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def parse_limits(text, parse=int):
+    """'search=8,bulk=2' -> {'search': 8, 'bulk': 2}"""
+    limits = {}
+    for item in (text or '').split(','):
+        if item.strip():
+            name, _, value = item.partition('=')
+            limits[name.strip()] = parse(value.strip())
+    return limits
+
+
+def parse_rate(text):
+    """'20/40' -> (20.0 tokens per second, burst 40.0); '20' bursts 2x"""
+    rate, _, burst = text.partition('/')
+    rate = float(rate)
+    return rate, float(burst) if burst else 2 * rate
+
+
+class RateLimiter:
+    """Token buckets per (client, class)
+
+    rates       -- {class: (tokens per second, burst)}; classes not listed
+                   are not limited
+    max_clients -- buckets kept; the least recently seen client is dropped
+                   first (it comes back with a full bucket)
+    """
+
+    def __init__(self, rates, max_clients=100_000):
+        self.rates = rates
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()   # (client, class) -> [tokens, updated_at]
+        self._lock = threading.Lock()
+        self.limited = dict.fromkeys(rates, 0)
+
+    def check(self, client, traffic_class, cost=1.0):
+        """Take `cost` tokens, or raise Rejected(429)"""
+        rate = self.rates.get(traffic_class)
+        if rate is None:
+            return
+        per_second, burst = rate
+        key = (client, traffic_class)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [burst, now]
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * per_second)
+                bucket[1] = now
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return
+            self.limited[traffic_class] += 1
+            wait = (cost - bucket[0]) / per_second if per_second > 0 else 60
+        raise Rejected(429, 'rate_limited', wait)
+
+    def stats(self):
+        with self._lock:
+            return {'clients': len(self._buckets), 'limited': dict(self.limited)}
+
+
+class _Waiter:
+    __slots__ = ('traffic_class', 'since', 'admitted')
+
+    def __init__(self, traffic_class):
+        self.traffic_class = traffic_class
+        self.since = time.monotonic()
+        self.admitted = False
+
+
+class AdmissionController:
+    """Concurrency limits with a priority queue in front
+
+    capacity   -- requests running at once across all classes
+    limits     -- {class: requests running at once}; at most `capacity`
+    priorities -- {class: priority}; lower values are admitted first
+    max_wait   -- seconds a request may wait before it is shed
+    max_queue  -- waiting requests before new arrivals are shed
+    shed_wait  -- once the last admission of a class waited this long,
+                  arrivals of that class that would wait are shed at once
+                  (0 disables)
+    """
+
+    def __init__(self, capacity, limits, priorities, max_wait=1.0, max_queue=100, shed_wait=0.25):
+        self.capacity = capacity
+        self.limits = {name: min(limit, capacity) for name, limit in limits.items()}
+        self.priorities = priorities
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.shed_wait = shed_wait
+
+        self._cond = threading.Condition()
+        self._queue = []                # heap of (priority, seq, _Waiter)
+        self._seq = itertools.count()
+        self._running = dict.fromkeys(limits, 0)
+        self._waiting = dict.fromkeys(limits, 0)
+        self._last_wait = dict.fromkeys(limits, 0.0)
+        self._total = 0
+
+        self.admitted = dict.fromkeys(limits, 0)
+        self.rejected = {name: {'queue_full': 0, 'overloaded': 0, 'timeout': 0} for name in limits}
+
+    def acquire(self, traffic_class):
+        """Wait for a slot; returns seconds waited or raises Rejected(503)"""
+        with self._cond:
+            if not self._queue and self._fits(traffic_class):
+                self._admit(traffic_class, 0.0)
+                return 0.0
+            if len(self._queue) >= self.max_queue:
+                self._reject(traffic_class, 'queue_full')
+            if self.shed_wait and self._last_wait[traffic_class] > self.shed_wait \
+                    and self._waiting[traffic_class]:
+                self._reject(traffic_class, 'overloaded')
+
+            waiter = _Waiter(traffic_class)
+            heapq.heappush(self._queue, (self.priorities[traffic_class], next(self._seq), waiter))
+            self._waiting[traffic_class] += 1
+            deadline = waiter.since + self.max_wait
+            try:
+                while True:
+                    self._dispatch()
+                    if waiter.admitted:
+                        return self._last_wait[traffic_class]
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._reject(traffic_class, 'timeout')
+                    self._cond.wait(remaining)
+            finally:
+                if not waiter.admitted:
+                    self._queue = [entry for entry in self._queue if entry[2] is not waiter]
+                    heapq.heapify(self._queue)
+                    self._waiting[traffic_class] -= 1
+                    # A freed slot may now fit someone behind this waiter
+                    self._cond.notify_all()
+
+    def release(self, traffic_class):
+        with self._cond:
+            self._running[traffic_class] -= 1
+            self._total -= 1
+            self._dispatch()
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'capacity': self.capacity,
+                'running': dict(self._running),
+                'waiting': dict(self._waiting),
+                'limits': dict(self.limits),
+                'lastWaitMs': {name: round(wait * 1000, 3) for name, wait in self._last_wait.items()},
+                'admitted': dict(self.admitted),
+                'rejected': {name: dict(counts) for name, counts in self.rejected.items()},
+            }
+
+    def _fits(self, traffic_class):
+        return (self._total < self.capacity
+                and self._running[traffic_class] < self.limits[traffic_class])
+
+    def _admit(self, traffic_class, waited):
+        self._running[traffic_class] += 1
+        self._total += 1
+        self._last_wait[traffic_class] = waited
+        self.admitted[traffic_class] += 1
+
+    def _dispatch(self):
+        """Admit queued requests, best priority first, while slots are free
+
+        A class at its own limit does not block lower-priority classes behind it.
+        """
+        now = time.monotonic()
+        skipped = []
+        while self._queue and self._total < self.capacity:
+            entry = heapq.heappop(self._queue)
+            waiter = entry[2]
+            if self._fits(waiter.traffic_class):
+                waiter.admitted = True
+                self._waiting[waiter.traffic_class] -= 1
+                self._admit(waiter.traffic_class, now - waiter.since)
+                self._cond.notify_all()
+            else:
+                skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self._queue, entry)
+
+    def _reject(self, traffic_class, reason):
+        self.rejected[traffic_class][reason] += 1
+        raise Rejected(503, reason, self.max_wait)
@@ -0,0 +1,282 @@
+"""
+Approximate-nearest-neighbour index for space embeddings (IVF, NumPy only)
+
+Vectors are clustered into `n_lists` inverted lists with spherical k-means.
+A query scores only the vectors in its `n_probe` nearest lists, so the cost
+per request is roughly O(N * n_probe / n_lists * 384) instead of O(N * 384).
+Raising n_probe trades latency for recall; benchmarks/bench_ann.py measures
+recall@k against exact search to size both parameters.
+
+Each vector carries the attributes search_spaces() filters on (SpaceType,
+price, size, available + Active), so filters are applied inside the index:
+selective filters are answered exactly over the matching rows (pre-filter),
+broad ones by probing lists and masking candidates (post-filter).
+"""
+
+import threading
+
+import numpy as np
+
+from embedding_store import normalize_rows
+
+
+class IVFIndex:
+    """Inverted-file index with incremental add/remove and attribute filters
+
+    n_lists            -- number of k-means clusters (None: ~4 * sqrt(N))
+    n_probe            -- lists scanned per query (recall/latency knob)
+    prefilter_max_rows -- filters matching at most this many rows are
+                          answered by exact search over those rows
+    """
+
+    def __init__(self, dim, n_lists=None, n_probe=8, prefilter_max_rows=4096, seed=0):
+        self.dim = dim
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.prefilter_max_rows = prefilter_max_rows
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.RLock()
+
+        self.centroids = None
+        self._size = 0
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._list_of = np.empty(0, dtype=np.int32)
+        self._alive = np.empty(0, dtype=bool)
+        self._type_code = np.empty(0, dtype=np.int16)
+        self._price = np.empty(0, dtype=np.float32)
+        self._area = np.empty(0, dtype=np.float32)
+        self._active = np.empty(0, dtype=bool)
+
+        self._row_of = {}
+        self._type_codes = {}
+        self._lists = []        # per list: Python list of rows (append-friendly)
+        self._list_arrays = []  # per list: cached np.ndarray of rows, or None
+        self._dead = 0
+
+    def __len__(self):
+        return len(self._row_of)
+
+    # -----------------------------------------
+    # Building
+    # -----------------------------------------
+
+    def train(self, vectors, iterations=12, sample_size=50_000):
+        """Fit list centroids with spherical k-means on (a sample of) `vectors`"""
+        vectors = normalize_rows(vectors)
+        n_lists = self.n_lists or max(1, int(4 * np.sqrt(len(vectors))))
+        n_lists = min(n_lists, len(vectors))
+        if len(vectors) > sample_size:
+            vectors = vectors[self._rng.choice(len(vectors), sample_size, replace=False)]
+
+        centroids = vectors[self._rng.choice(len(vectors), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assign = self._nearest(vectors, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, vectors)
+            counts = np.bincount(assign, minlength=n_lists)
+            empty = counts == 0
+            # Re-seed empty clusters so every list stays useful
+            sums[empty] = vectors[self._rng.choice(len(vectors), int(empty.sum()))]
+            centroids = normalize_rows(sums)
+
+        with self._lock:
+            self.n_lists = n_lists
+            self.centroids = centroids
+            self._rebuild_lists()
+
+    def add(self, ids, vectors, space_types=None, prices=None, sizes=None, active=None):
+        """Insert or replace spaces; attribute arrays are row-aligned with ids"""
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = normalize_rows(vectors).reshape(len(ids), self.dim)
+        n = len(ids)
+        space_types = space_types if space_types is not None else [None] * n
+        prices = np.asarray(prices if prices is not None else np.full(n, np.nan), dtype=np.float32)
+        sizes = np.asarray(sizes if sizes is not None else np.full(n, np.nan), dtype=np.float32)
+        active = np.asarray(active if active is not None else np.ones(n), dtype=bool)
+
+        with self._lock:
+            self.remove(ids)
+            start = self._size
+            self._reserve(start + n)
+            rows = np.arange(start, start + n)
+
+            self._vectors[rows] = vectors
+            self._ids[rows] = ids
+            self._alive[rows] = True
+            self._type_code[rows] = [self._code(space_type) for space_type in space_types]
+            self._price[rows] = prices
+            self._area[rows] = sizes
+            self._active[rows] = active
+            self._size += n
+
+            for row, space_id in zip(rows.tolist(), ids.tolist()):
+                self._row_of[space_id] = row
+
+            if self.centroids is not None:
+                assign = self._nearest(vectors, self.centroids)
+                self._list_of[rows] = assign
+                for row, list_no in zip(rows.tolist(), assign.tolist()):
+                    self._lists[list_no].append(row)
+                    self._list_arrays[list_no] = None
+
+    def remove(self, ids):
+        """Drop spaces from the index (rows are reclaimed on compaction)"""
+        with self._lock:
+            for space_id in np.atleast_1d(ids).tolist():
+                row = self._row_of.pop(int(space_id), None)
+                if row is not None:
+                    self._alive[row] = False
+                    self._dead += 1
+            if self._dead > 1024 and self._dead > 0.25 * self._size:
+                self._compact()
+
+    def set_attributes(self, space_id, space_type=None, price=None, size=None, active=None):
+        """Update filter attributes of one space without touching its vector"""
+        with self._lock:
+            row = self._row_of.get(int(space_id))
+            if row is None:
+                return False
+            if space_type is not None:
+                self._type_code[row] = self._code(space_type)
+            if price is not None:
+                self._price[row] = price
+            if size is not None:
+                self._area[row] = size
+            if active is not None:
+                self._active[row] = bool(active)
+            return True
+
+    # -----------------------------------------
+    # Querying
+    # -----------------------------------------
+
+    def search(self, query, k=10, filters=None, n_probe=None, require_active=True):
+        """[(SpaceID, score)] best first
+
+        filters -- repository.SearchFilters (search_term is not applied here)
+        """
+        query = normalize_rows(query).reshape(self.dim)
+        with self._lock:
+            mask = self._filter_mask(filters, require_active)
+
+            if self.centroids is None or (
+                mask is not None and np.count_nonzero(mask) <= self.prefilter_max_rows
+            ):
+                # Untrained index or selective filter: exact scan of matching rows
+                candidates = np.flatnonzero(mask if mask is not None else self._alive[:self._size])
+                return self._top_k(candidates, query, k)
+
+            n_probe = min(n_probe or self.n_probe, self.n_lists)
+            order = np.argsort(-(self.centroids @ query))
+            while True:
+                candidates = np.concatenate(
+                    [self._list_rows(list_no) for list_no in order[:n_probe]]
+                ) if n_probe else np.empty(0, dtype=np.int64)
+                keep = mask[candidates] if mask is not None else self._alive[candidates]
+                candidates = candidates[keep]
+                # Widen the probe when a filter leaves too few candidates
+                if len(candidates) >= k or n_probe >= self.n_lists:
+                    break
+                n_probe = min(n_probe * 2, self.n_lists)
+            return self._top_k(candidates, query, k)
+
+    def stats(self):
+        with self._lock:
+            sizes = [len(rows) for rows in self._lists]
+            return {
+                'vectors': len(self._row_of),
+                'deadRows': self._dead,
+                'lists': self.n_lists or 0,
+                'nProbe': self.n_probe,
+                'maxListSize': max(sizes) if sizes else 0,
+                'memoryBytes': int(self._vectors.nbytes + self._ids.nbytes),
+            }
+
+    # -----------------------------------------
+    # Helpers
+    # -----------------------------------------
+
+    def _filter_mask(self, filters, require_active):
+        n = self._size
+        mask = self._alive[:n].copy()
+        if require_active:
+            mask &= self._active[:n]
+        if filters is None:
+            return mask if require_active else None
+        if filters.space_type:
+            code = self._type_codes.get(filters.space_type)
+            if code is None:
+                return np.zeros(n, dtype=bool)
+            mask &= self._type_code[:n] == code
+        # Same truthiness as the SQL search: 0 / None bounds are ignored
+        if filters.min_price:
+            mask &= self._price[:n] >= filters.min_price
+        if filters.max_price:
+            mask &= self._price[:n] <= filters.max_price
+        if filters.min_size:
+            mask &= self._area[:n] >= filters.min_size
+        if filters.max_size:
+            mask &= self._area[:n] <= filters.max_size
+        return mask
+
+    def _top_k(self, rows, query, k):
+        if len(rows) == 0:
+            return []
+        scores = self._vectors[rows] @ query
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self._ids[rows[i]]), float(scores[i])) for i in top]
+
+    def _list_rows(self, list_no):
+        rows = self._list_arrays[list_no]
+        if rows is None:
+            rows = np.fromiter(self._lists[list_no], dtype=np.int64)
+            self._list_arrays[list_no] = rows
+        return rows
+
+    def _code(self, space_type):
+        if space_type is None:
+            return -1
+        return self._type_codes.setdefault(space_type, len(self._type_codes))
+
+    @staticmethod
+    def _nearest(vectors, centroids, chunk=8192):
+        assign = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), chunk):
+            assign[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ centroids.T, axis=1)
+        return assign
+
+    def _reserve(self, capacity):
+        if capacity <= len(self._ids):
+            return
+        new_capacity = max(capacity, 2 * len(self._ids), 1024)
+        for name in ('_vectors', '_ids', '_list_of', '_alive', '_type_code', '_price', '_area', '_active'):
+            old = getattr(self, name)
+            grown = np.zeros((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    def _rebuild_lists(self):
+        n = self._size
+        self._lists = [[] for _ in range(self.n_lists)]
+        self._list_arrays = [None] * self.n_lists
+        if n:
+            self._list_of[:n] = self._nearest(self._vectors[:n], self.centroids)
+            for row in np.flatnonzero(self._alive[:n]).tolist():
+                self._lists[self._list_of[row]].append(row)
+
+    def _compact(self):
+        keep = np.flatnonzero(self._alive[:self._size])
+        for name in ('_vectors', '_ids', '_list_of', '_alive', '_type_code', '_price', '_area', '_active'):
+            array = getattr(self, name)
+            setattr(self, name, array[keep].copy())
+        self._size = len(keep)
+        self._dead = 0
+        self._row_of = {int(space_id): row for row, space_id in enumerate(self._ids.tolist())}
+        if self.centroids is not None:
+            self._lists = [[] for _ in range(self.n_lists)]
+            self._list_arrays = [None] * self.n_lists
+            for row, list_no in enumerate(self._list_of.tolist()):
+                self._lists[list_no].append(row)
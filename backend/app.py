@@ -2,16 +2,47 @@
 Flask Backend for Si'aa - Fixed for YOUR database schema
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, has_request_context, request, jsonify, stream_with_context
 from flask_cors import CORS
-import pyodbc
-import hashlib
-from datetime import datetime
+import base64
+import itertools
+from contextlib import contextmanager, nullcontext
+import json
+from datetime import datetime, date, timedelta
 from decimal import Decimal
 import traceback
 import uuid
+import os
+import threading
+import time
+import numpy as np
+import requests
+import embedding_store
+from ann_index import IVFIndex
+from embedding_service import EmbeddingService
+from ranking import HybridRanker, parse_weights
+from text_index import TextIndex
+from availability import AvailabilityIndex, day_range
+import catalog
+from facets import NEIGHBORHOODS, FacetIndex
+from admission import AdmissionController, RateLimiter, Rejected, parse_limits, parse_rate
+from credentials import DEFAULT_ITERATIONS, HasherBusy, IdentityCache, PasswordHasher
+from bulk_ingest import validate_booking, validate_items, validate_listing
+from db_pool import ConnectionPool
+from db_router import DatabaseRouter
+from job_queue import STATUSES as JOB_STATUSES, JobQueue, JobWorkers, PermanentJobError
+from repository import SearchFilters, SqlServerRepository
+from search_cache import ANY_SPACE, SearchCache, normalize_filters
+from serialization import FastJSONProvider, RowShape, alias, derived, dumps
+from http_caching import CachedBody, choose_encoding, compress, gzip_stream
+from metrics import InstrumentedConnection, MetricsRegistry, RequestTimer
+# Read-your-writes hint a client echoes back after it wrote (see
+# reads_from_primary); cross-origin pages may only read it once exposed
+PRIMARY_HEADER = 'X-Siaa-Primary-Until'
+
 app = Flask(__name__)
-CORS(app)
+app.json = FastJSONProvider(app)
+CORS(app, expose_headers=[PRIMARY_HEADER])
 
 # Database Configuration - UPDATE WITH YOUR CREDENTIALS
 DB_CONFIG = {
@@ -22,24 +53,705 @@ DB_CONFIG = {
     'driver': '{ODBC Driver 17 for SQL Server}'
 }
 
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Data-access backend: 'sqlserver' (Azure SQL) or 'sqlite' (local benchmarking)
+DB_BACKEND = os.environ.get('SIAA_DB_BACKEND', 'sqlserver')
+SQLITE_PATH = os.environ.get('SIAA_SQLITE_PATH', 'siaa_local.db')
+
+# Seconds a single SQL statement / SQL Server login may take (0 = no limit).
+# This is what bounds a request stuck in the database; under gunicorn's
+# gthread workers nothing else interrupts a hung request thread.
+QUERY_TIMEOUT = int(os.environ.get('SIAA_QUERY_TIMEOUT', 30))
+LOGIN_TIMEOUT = int(os.environ.get('SIAA_LOGIN_TIMEOUT', 15))
+
+def create_repository():
+    """Build the repository for the configured backend"""
+    if DB_BACKEND == 'sqlite':
+        from sqlite_repository import SqliteRepository
+        return SqliteRepository(SQLITE_PATH, query_timeout=QUERY_TIMEOUT)
+    return SqlServerRepository(DB_CONFIG, query_timeout=QUERY_TIMEOUT, login_timeout=LOGIN_TIMEOUT)
+
+repository = create_repository()
+
 def get_db_connection():
     """Create and return database connection"""
-    conn_str = (
-        f"DRIVER={DB_CONFIG['driver']};"
-        f"SERVER={DB_CONFIG['server']};"
-        f"DATABASE={DB_CONFIG['database']};"
-        f"UID={DB_CONFIG['username']};"
-        f"PWD={DB_CONFIG['password']}"
-    )
     try:
-        return pyodbc.connect(conn_str)
+        return repository.connect()
     except Exception as e:
         print(f"Database connection error: {e}")
         raise
 
-def hash_password(password):
-    """Hash password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+# Connection pool settings (override through environment variables)
+POOL_CONFIG = {
+    'size': int(os.environ.get('SIAA_POOL_SIZE', 10)),
+    'checkout_timeout': float(os.environ.get('SIAA_POOL_TIMEOUT', 5)),
+    'max_lifetime': float(os.environ.get('SIAA_POOL_MAX_LIFETIME', 1800)),
+    'max_idle': float(os.environ.get('SIAA_POOL_MAX_IDLE', 300)),
+}
+
+db_pool = ConnectionPool(get_db_connection, validate_query=repository.validate_query,
+                         **POOL_CONFIG)
+
+# Read replicas: comma-separated server names (SQL Server) or database file
+# paths (SQLite stand-ins). Read-only work goes to them round-robin; a client
+# that just booked reads from the primary for READ_YOUR_WRITES seconds, so it
+# sees its booking even while replicas lag. Writes return the deadline in the
+# PRIMARY_HEADER response header and the client sends it back on its reads;
+# the frontend is served from another origin, where cookies would not reach
+# the API.
+READ_REPLICAS = [target.strip() for target in os.environ.get('SIAA_READ_REPLICAS', '').split(',')
+                 if target.strip()]
+REPLICA_RETRY_AFTER = float(os.environ.get('SIAA_REPLICA_RETRY_AFTER', 30))
+# Seconds a read waits for a busy replica pool before moving on
+REPLICA_WAIT = float(os.environ.get('SIAA_REPLICA_WAIT', 0.05))
+READ_YOUR_WRITES = float(os.environ.get('SIAA_READ_YOUR_WRITES', 10))
+
+db_router = DatabaseRouter(
+    db_pool,
+    [(target, ConnectionPool(repository.replica(target).connect,
+                             validate_query=repository.validate_query, **POOL_CONFIG))
+     for target in READ_REPLICAS],
+    retry_after=REPLICA_RETRY_AFTER,
+    replica_wait=REPLICA_WAIT,
+)
+
+# Search result cache (see search_cache.py)
+search_cache = SearchCache(
+    max_entries=int(os.environ.get('SIAA_SEARCH_CACHE_SIZE', 1024)),
+    ttl=float(os.environ.get('SIAA_SEARCH_CACHE_TTL', 30)),
+)
+
+# Login: bounded password-hashing pool and email -> account cache (see credentials.py)
+password_hasher = PasswordHasher(
+    iterations=int(os.environ.get('SIAA_PASSWORD_ITERATIONS', DEFAULT_ITERATIONS)),
+    workers=int(os.environ.get('SIAA_HASH_WORKERS', 2)),
+    max_pending=int(os.environ.get('SIAA_HASH_QUEUE', 64)),
+)
+identity_cache = IdentityCache(
+    max_entries=int(os.environ.get('SIAA_LOGIN_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('SIAA_LOGIN_CACHE_TTL', 60)),
+)
+
+# Admission control (see admission.py): per-class concurrency limits with a
+# priority queue, and per-client token buckets. Bookings and payment status
+# go first; searches may use all but a couple of the slots, so bookings are
+# never stuck behind a search burst. Endpoints not listed (health, metrics)
+# are always admitted.
+ADMISSION_ENABLED = os.environ.get('SIAA_ADMISSION', '1') == '1'
+TRAFFIC_CLASSES = {
+    'create_booking': 'booking',
+    'create_bookings_bulk': 'booking',
+    'get_payment': 'booking',
+    'login': 'login',
+    'search_spaces': 'search',
+    'match_spaces': 'search',
+    'get_space': 'search',
+    'create_spaces_bulk': 'bulk',
+}
+CLASS_PRIORITIES = {'booking': 0, 'login': 1, 'search': 2, 'bulk': 3}
+ADMISSION_CAPACITY = int(os.environ.get('SIAA_ADMISSION_CAPACITY', POOL_CONFIG['size']))
+ADMISSION_LIMITS = {
+    'booking': ADMISSION_CAPACITY,
+    'login': max(1, ADMISSION_CAPACITY // 2),
+    'search': max(1, ADMISSION_CAPACITY - 2),
+    'bulk': 2,
+    **parse_limits(os.environ.get('SIAA_ADMISSION_LIMITS')),
+}
+# Requests per second per client and class, as rate/burst ('' disables)
+RATE_LIMITS = parse_limits(
+    os.environ.get('SIAA_RATE_LIMITS', 'booking=5/10,login=5/10,search=20/40,bulk=2/4'), parse_rate
+)
+# Behind a reverse proxy, identify clients by X-Forwarded-For instead of the peer address
+TRUST_PROXY = os.environ.get('SIAA_TRUST_PROXY') == '1'
+
+admission = AdmissionController(
+    ADMISSION_CAPACITY, ADMISSION_LIMITS, CLASS_PRIORITIES,
+    max_wait=float(os.environ.get('SIAA_ADMISSION_MAX_WAIT', 1.0)),
+    max_queue=int(os.environ.get('SIAA_ADMISSION_MAX_QUEUE', 100)),
+    shed_wait=float(os.environ.get('SIAA_ADMISSION_SHED_WAIT', 0.25)),
+)
+rate_limiter = RateLimiter(RATE_LIMITS)
+
+# Post-booking work (payment capture, notifications) runs from a durable
+# local job queue (see job_queue.py), off the booking request path. The queue
+# file is opened on first use, so scripts importing this module leave it
+# alone. Without a gateway URL payments are captured as 'Manual'; without a
+# notification URL notifications are dropped.
+JOB_QUEUE_PATH = os.environ.get('SIAA_JOB_QUEUE_PATH', os.path.join(BACKEND_DIR, 'siaa_jobs.db'))
+JOB_WORKERS = int(os.environ.get('SIAA_JOB_WORKERS', 2))
+JOB_MAX_ATTEMPTS = int(os.environ.get('SIAA_JOB_MAX_ATTEMPTS', 8))
+# Seconds between sweeps that queue capture for Pending payments left without a job
+PAYMENT_RECOVERY_INTERVAL = float(os.environ.get('SIAA_PAYMENT_RECOVERY_INTERVAL', 60))
+PAYMENT_GATEWAY_URL = os.environ.get('SIAA_PAYMENT_GATEWAY_URL')
+NOTIFY_URL = os.environ.get('SIAA_NOTIFY_URL')
+DOWNSTREAM_TIMEOUT = float(os.environ.get('SIAA_DOWNSTREAM_TIMEOUT', 10))
+PAYMENT_GATEWAY = 'Gateway' if PAYMENT_GATEWAY_URL else 'Manual'
+
+# HTTP caching: Cache-Control per endpoint and response compression
+SPACE_CACHE_CONTROL = os.environ.get('SIAA_SPACE_CACHE_CONTROL', 'private, max-age=30')
+SEARCH_CACHE_CONTROL = os.environ.get('SIAA_SEARCH_CACHE_CONTROL', 'public, no-cache')
+COMPRESS_MIN_SIZE = int(os.environ.get('SIAA_COMPRESS_MIN_SIZE', 1024))
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson'}
+
+# Request metrics (see metrics.py), served on /api/metrics
+SERVER_TIMING = os.environ.get('SIAA_SERVER_TIMING', '1') == '1'
+metrics = MetricsRegistry()
+metrics.describe('http_requests_total', 'counter', 'Requests by endpoint, method and status')
+metrics.describe('http_request_duration_seconds', 'histogram', 'Request latency until the response is ready')
+metrics.describe('http_request_phase_seconds', 'histogram',
+                 'Time per request in pool checkout, SQL execute, row fetch, serialization and compression')
+metrics.describe('http_request_db_rows', 'histogram', 'Rows fetched per request')
+metrics.describe('db_queries_total', 'counter', 'Queries executed, by endpoint and repository method')
+metrics.describe('db_rows_total', 'counter', 'Rows fetched, by endpoint and repository method')
+metrics.describe('db_query_seconds', 'histogram', 'Mean execute time per query, by repository method')
+metrics.describe('db_pool_connections', 'gauge', 'Pooled connections by state')
+metrics.describe('db_pool_timeouts_total', 'counter', 'Connection checkouts that timed out')
+metrics.describe('search_cache_lookups_total', 'counter', 'Search cache lookups by result')
+metrics.describe('catalog_snapshot_spaces', 'gauge', 'Spaces held in the catalog snapshot')
+metrics.describe('catalog_snapshot_bytes', 'gauge', 'Approximate memory held by the catalog snapshot')
+metrics.describe('login_cache_lookups_total', 'counter', 'Login account cache lookups by result')
+metrics.describe('password_checks_total', 'counter', 'Password verifications by result')
+metrics.describe('background_jobs', 'gauge', 'Jobs in the local job queue by status')
+metrics.describe('db_replica_up', 'gauge', 'Whether a read replica is in rotation')
+metrics.describe('admission_running', 'gauge', 'Admitted requests running, by traffic class')
+metrics.describe('admission_waiting', 'gauge', 'Requests queued for admission, by traffic class')
+metrics.describe('admission_rejections_total', 'counter', 'Requests refused by traffic class and reason')
+metrics.describe('db_replica_checkouts_total', 'counter', 'Read connections handed out by each replica')
+metrics.describe('db_primary_reads_total', 'counter', 'Read-only checkouts answered by the primary')
+
+# Semantic matching: binary embedding store + sentence-transformers model
+EMBEDDINGS_PATH = os.environ.get('SIAA_EMBEDDINGS', os.path.join(BACKEND_DIR, 'embeddings', 'spaces'))
+EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+MATCH_DEFAULT_LIMIT = 10
+MATCH_MAX_LIMIT = 100
+
+# IVF index over the store; below ANN_MIN_VECTORS an exact scan is just as fast
+ANN_MIN_VECTORS = int(os.environ.get('SIAA_ANN_MIN_VECTORS', 10000))
+ANN_N_PROBE = int(os.environ.get('SIAA_ANN_N_PROBE', 8))
+
+_embedding_store = None
+_match_index = None
+_embedding_lock = threading.Lock()
+
+def get_embedding_store():
+    """Memory-mapped embedding store, opened on first use (None if not built)"""
+    global _embedding_store
+    if _embedding_store is None and embedding_store.exists(EMBEDDINGS_PATH):
+        with _embedding_lock:
+            if _embedding_store is None:
+                _embedding_store = embedding_store.EmbeddingStore(EMBEDDINGS_PATH)
+    return _embedding_store
+
+def get_match_index():
+    """Filter-aware ANN index over the embedding store (None if not built)"""
+    global _match_index
+    if _match_index is None:
+        store = get_embedding_store()
+        if store is None:
+            return None
+        with _embedding_lock:
+            if _match_index is None:
+                with db_connection(read_only=True) as conn:
+                    attributes = {row[0]: row for row in repository.space_attributes(conn).fetchall()}
+                ids = [int(space_id) for space_id in store.ids]
+                rows = [attributes.get(space_id) for space_id in ids]
+                vectors = np.asarray(store.matrix, dtype=np.float32)
+                index = IVFIndex(store.dim, n_probe=ANN_N_PROBE)
+                if len(ids) >= ANN_MIN_VECTORS:
+                    index.train(vectors)
+                index.add(
+                    ids, vectors,
+                    space_types=[row[1] if row else None for row in rows],
+                    prices=[float(row[2]) if row and row[2] is not None else np.nan for row in rows],
+                    sizes=[float(row[3]) if row and row[3] is not None else np.nan for row in rows],
+                    # Spaces missing from the database are never returned
+                    active=[bool(row and row[4] and row[5] == 'Active') for row in rows],
+                )
+                _match_index = index
+    return _match_index
+
+# Query encoder: lazy model load, micro-batching and a query-embedding cache
+embedding_service = EmbeddingService(
+    EMBEDDING_MODEL,
+    max_batch=int(os.environ.get('SIAA_EMBED_MAX_BATCH', 32)),
+    batch_window=float(os.environ.get('SIAA_EMBED_BATCH_WINDOW_MS', 5)) / 1000,
+    cache_size=int(os.environ.get('SIAA_EMBED_CACHE_SIZE', 4096)),
+)
+
+if os.environ.get('SIAA_WARMUP_EMBEDDINGS') == '1':
+    # Load the model in the background instead of on the first /match request
+    threading.Thread(target=embedding_service.warm_up, name='embedding-warmup', daemon=True).start()
+
+def encode_query(text):
+    """384-d embedding of a free-text need"""
+    return embedding_service.encode(text)
+
+# Hybrid ranking for ?sort=relevance (see ranking.py); the catalog snapshot
+# is rebuilt once it is older than RANKING_MAX_AGE seconds
+RANKING_WEIGHTS = parse_weights(os.environ.get('SIAA_RANKING_WEIGHTS'))
+RANKING_MAX_AGE = float(os.environ.get('SIAA_RANKING_MAX_AGE', 300))
+
+_ranker = None
+_ranker_lock = threading.Lock()
+
+def build_ranker():
+    """Fresh HybridRanker over every searchable space"""
+    with db_connection(read_only=True) as conn:
+        rows = repository.ranking_features(conn).fetchall()
+    ranker = HybridRanker(rows, RANKING_WEIGHTS)
+    store = get_embedding_store()
+    if store is not None:
+        ranker.attach_embeddings(store)
+    return ranker
+
+def get_ranker():
+    """Current ranking snapshot; one request rebuilds it when stale while
+    the others keep using the old one"""
+    global _ranker
+    if _ranker is None:
+        with _ranker_lock:
+            if _ranker is None:
+                _ranker = build_ranker()
+    elif _ranker.age() > RANKING_MAX_AGE and _ranker_lock.acquire(blocking=False):
+        try:
+            _ranker = build_ranker()
+        finally:
+            _ranker_lock.release()
+    return _ranker
+
+# Inverted index for searchTerm (see text_index.py; it matches word prefixes,
+# not the substrings LIKE matches). New listings are picked
+# up every TEXT_INDEX_REFRESH seconds; the index is rebuilt every
+# TEXT_INDEX_MAX_AGE seconds to pick up edited listings. Terms matching more
+# than TEXT_INDEX_MAX_CANDIDATES spaces fall back to the SQL LIKE filter.
+TEXT_INDEX_ENABLED = os.environ.get('SIAA_TEXT_INDEX', '1') == '1'
+TEXT_INDEX_REFRESH = float(os.environ.get('SIAA_TEXT_INDEX_REFRESH', 5))
+TEXT_INDEX_MAX_AGE = float(os.environ.get('SIAA_TEXT_INDEX_MAX_AGE', 300))
+TEXT_INDEX_MAX_CANDIDATES = int(os.environ.get('SIAA_TEXT_INDEX_MAX_CANDIDATES', 20000))
+TEXT_INDEX_CHUNK = 5000
+
+_text_index = None
+_text_index_built = 0.0
+_text_index_checked = 0.0
+_text_index_lock = threading.Lock()
+
+def _space_text_chunks(conn, after_space_id):
+    """(SpaceID, Title + Description) for spaces after `after_space_id`"""
+    while True:
+        rows = repository.space_texts_after(conn, after_space_id, TEXT_INDEX_CHUNK)
+        if not rows:
+            return
+        for row in rows:
+            yield row[0], f"{row[1] or ''} {row[3] or ''}"
+        after_space_id = rows[-1][0]
+
+def _build_text_index():
+    global _text_index, _text_index_built, _text_index_checked
+    with db_connection(read_only=True) as conn:
+        index = TextIndex.build(_space_text_chunks(conn, 0))
+    _text_index = index
+    _text_index_built = _text_index_checked = time.monotonic()
+
+def get_text_index():
+    """Keyword index over every listing, built on first use"""
+    global _text_index_checked
+    if _text_index is None:
+        with _text_index_lock:
+            if _text_index is None:
+                _build_text_index()
+    elif (time.monotonic() - _text_index_checked > TEXT_INDEX_REFRESH
+          and _text_index_lock.acquire(blocking=False)):
+        try:
+            if time.monotonic() - _text_index_built > TEXT_INDEX_MAX_AGE:
+                _build_text_index()
+            else:
+                _text_index_checked = time.monotonic()
+                with db_connection(read_only=True) as conn:
+                    for space_id, text in _space_text_chunks(conn, _text_index.max_space_id):
+                        _text_index.update(space_id, text)
+        finally:
+            _text_index_lock.release()
+    return _text_index
+
+def resolve_search_term(filters):
+    """(filters for SQL, candidate SpaceIDs or None)
+
+    When the text index can answer filters.search_term, the term is cleared
+    and the matching SpaceIDs are returned instead; otherwise SQL applies it.
+    """
+    if not filters.search_term or not TEXT_INDEX_ENABLED:
+        return filters, None
+    space_ids = get_text_index().search(filters.search_term)
+    if space_ids is None or len(space_ids) > TEXT_INDEX_MAX_CANDIDATES:
+        return filters, None
+    return filters._replace(search_term=''), space_ids.tolist()
+
+# Active-booking interval index (see availability.py). New bookings are
+# picked up every AVAILABILITY_REFRESH seconds, re-reading the bookings of the
+# last AVAILABILITY_SETTLE_TIME seconds in case they committed out of ID
+# order. The same refresh re-checks the status of Pending bookings, so one
+# whose payment failed in another process is dropped then too. The index is
+# reloaded every AVAILABILITY_MAX_AGE seconds to drop confirmed bookings
+# cancelled through server.js.
+AVAILABILITY_REFRESH = float(os.environ.get('SIAA_AVAILABILITY_REFRESH', 5))
+AVAILABILITY_SETTLE_TIME = float(os.environ.get('SIAA_AVAILABILITY_SETTLE_TIME', 30))
+AVAILABILITY_MAX_AGE = float(os.environ.get('SIAA_AVAILABILITY_MAX_AGE', 300))
+
+_availability = None
+_availability_loaded = 0.0
+_availability_checked = 0.0
+_availability_lock = threading.Lock()
+
+def _load_availability():
+    global _availability, _availability_loaded, _availability_checked
+    settled_after = _availability.scan_after() if _availability is not None else 0
+    with db_connection() as conn:
+        index = AvailabilityIndex.from_rows(repository.active_bookings(conn).fetchall(),
+                                            settle_time=AVAILABILITY_SETTLE_TIME,
+                                            settled_after=settled_after)
+    _availability = index
+    _availability_loaded = _availability_checked = time.monotonic()
+
+def get_availability():
+    """Interval index of active bookings, loaded on first use"""
+    global _availability_checked
+    if _availability is None:
+        with _availability_lock:
+            if _availability is None:
+                _load_availability()
+    elif (time.monotonic() - _availability_checked > AVAILABILITY_REFRESH
+          and _availability_lock.acquire(blocking=False)):
+        try:
+            if time.monotonic() - _availability_loaded > AVAILABILITY_MAX_AGE:
+                _load_availability()
+            else:
+                _availability_checked = time.monotonic()
+                pending = _availability.pending_bookings()
+                with db_connection() as conn:
+                    rows = repository.active_bookings(conn, _availability.scan_after()).fetchall()
+                    statuses = repository.booking_statuses(conn, pending) if pending else []
+                _availability.apply_statuses(pending, statuses)
+                _availability.apply_scan(rows)
+        finally:
+            _availability_lock.release()
+    return _availability
+
+# Columnar catalog snapshot (see catalog.py) answering searches and space
+# detail from memory. Spaces changed since the snapshot (by ChangeVersion) are
+# re-read every CATALOG_REFRESH seconds; a full reload every CATALOG_MAX_AGE
+# seconds drops deleted spaces. Without ChangeVersion (`python catalog.py
+# init`) everything is answered in SQL, as before.
+CATALOG_ENABLED = os.environ.get('SIAA_CATALOG_SNAPSHOT', '1') == '1'
+CATALOG_REFRESH = float(os.environ.get('SIAA_CATALOG_REFRESH', 5))
+CATALOG_MAX_AGE = float(os.environ.get('SIAA_CATALOG_MAX_AGE', 600))
+
+_catalog = None
+_catalog_checked = 0.0
+_catalog_failed = None
+_catalog_lock = threading.Lock()
+# Facet bitsets (see facets.py) over the snapshot, built on first use and
+# updated in place for the spaces each refresh re-reads
+_facets = None
+
+def _load_catalog():
+    global _catalog, _catalog_checked, _facets
+    with db_connection(read_only=True) as conn:
+        _catalog = catalog.load(repository, conn)
+    _catalog_checked = time.monotonic()
+    _facets = None
+
+def get_catalog():
+    """Current catalog snapshot, loaded on first use; None when disabled or
+    unavailable (e.g. the database has no ChangeVersion column yet)"""
+    global _catalog, _catalog_checked, _catalog_failed
+    if not CATALOG_ENABLED:
+        return None
+    if _catalog is None:
+        if _catalog_failed is not None and time.monotonic() - _catalog_failed < CATALOG_MAX_AGE:
+            return None
+        with _catalog_lock:
+            if _catalog is None:
+                try:
+                    _load_catalog()
+                except Exception as e:
+                    _catalog_failed = time.monotonic()
+                    print(f"Catalog snapshot unavailable, answering from SQL: {e}")
+                    return None
+    elif (time.monotonic() - _catalog_checked > CATALOG_REFRESH
+          and _catalog_lock.acquire(blocking=False)):
+        try:
+            if _catalog.age() > CATALOG_MAX_AGE:
+                _load_catalog()
+            else:
+                _catalog_checked = time.monotonic()
+                with db_connection(read_only=True) as conn:
+                    # A new snapshot object; readers holding the old one keep it
+                    _catalog = catalog.refresh(repository, conn, _catalog)
+                changed_ids, _catalog.changed_ids = _catalog.changed_ids, None
+                if _facets is not None and changed_ids is not None:
+                    _facets.update(_catalog, changed_ids)
+        except Exception as e:
+            # Keep serving the previous snapshot
+            print(f"Catalog refresh error: {e}")
+        finally:
+            _catalog_lock.release()
+    return _catalog
+
+def get_facets():
+    """Facet index over the catalog snapshot; None without a snapshot"""
+    global _facets
+    if get_catalog() is None:
+        return None
+    if _facets is None:
+        with _catalog_lock:
+            if _facets is None:
+                text_index = get_text_index() if TEXT_INDEX_ENABLED else None
+                _facets = FacetIndex.build(_catalog, text_index)
+    return _facets
+
+def expire_catalog():
+    """Re-read changed spaces on the next request (after this process wrote some)"""
+    global _catalog_checked
+    _catalog_checked = 0.0
+
+def parse_date_range(start, end):
+    """(start, end) dates from 'YYYY-MM-DD' strings, None when neither is set
+
+    A missing end means a one-day stay. Raises ValueError on bad input.
+    """
+    if not start and not end:
+        return None
+    if not start:
+        raise ValueError('startDate is required with endDate')
+    start_day = date.fromisoformat(start[:10])
+    end_day = date.fromisoformat(end[:10]) if end else start_day + timedelta(days=1)
+    if end_day < start_day:
+        raise ValueError('endDate must not be before startDate')
+    return start_day, end_day
+
+def reads_from_primary():
+    """Has the current client written recently enough to need the primary?"""
+    if not has_request_context():
+        return False
+    try:
+        return float(request.headers.get(PRIMARY_HEADER, 0)) > time.time()
+    except ValueError:
+        return False
+
+def stick_to_primary(response):
+    """Ask this client to read from the primary for READ_YOUR_WRITES seconds"""
+    if db_router.replicas and READ_YOUR_WRITES > 0:
+        response.headers[PRIMARY_HEADER] = f"{time.time() + READ_YOUR_WRITES:.3f}"
+    return response
+
+@contextmanager
+def db_connection(read_only=False):
+    """Check out a pooled connection; use as `with db_connection() as conn:`
+
+    read_only -- a read replica may answer (see db_router.py), unless the
+                 client wrote within the last READ_YOUR_WRITES seconds
+
+    Inside a request the connection reports pool wait, SQL and fetch time to
+    the request's timer (see metrics.py).
+    """
+    fresh = read_only and reads_from_primary()
+    timer = g.get('timer') if has_request_context() else None
+    if timer is None:
+        with db_router.connection(read_only, fresh) as conn:
+            yield conn
+        return
+    started = time.perf_counter()
+    with db_router.connection(read_only, fresh) as conn:
+        timer.add('pool', time.perf_counter() - started)
+        yield InstrumentedConnection(conn, timer)
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to the current request's `phase`"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer = g.get('timer') if has_request_context() else None
+        if timer is not None:
+            timer.add(phase, time.perf_counter() - started)
+
+# =============================================
+# REQUEST METRICS
+# =============================================
+
+@app.before_request
+def start_request_timer():
+    g.timer = RequestTimer()
+
+def client_id():
+    if TRUST_PROXY and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr
+
+@app.before_request
+def admit_request():
+    """Rate-limit the client, then wait for an admission slot or shed the request"""
+    traffic_class = TRAFFIC_CLASSES.get(request.endpoint)
+    if not ADMISSION_ENABLED or traffic_class is None or request.method == 'OPTIONS':
+        return None
+    try:
+        rate_limiter.check(client_id(), traffic_class)
+        with timed('queue'):
+            admission.acquire(traffic_class)
+    except Rejected as e:
+        if e.status == 429:
+            response = jsonify({'success': False, 'error': 'Too many requests, slow down'})
+        else:
+            response = jsonify({'success': False, 'error': 'Server is busy, try again shortly'})
+        response.headers['Retry-After'] = str(e.retry_after)
+        # Consume the unread body so the keep-alive connection stays usable
+        while request.stream.read(65536):
+            pass
+        return response, e.status
+    g.admitted = traffic_class
+    return None
+
+@app.after_request
+def release_admission_on_close(response):
+    """Free the request's slot once the response is sent; for streamed
+    responses that is after the last chunk"""
+    traffic_class = g.pop('admitted', None)
+    if traffic_class is not None:
+        response.call_on_close(lambda: admission.release(traffic_class))
+    return response
+
+@app.teardown_request
+def release_admission(error=None):
+    """Free the slot of a request that ended without a response"""
+    traffic_class = g.pop('admitted', None)
+    if traffic_class is not None:
+        admission.release(traffic_class)
+
+# Registered before compress_response so it runs after it (Flask runs
+# after_request hooks in reverse) and the total includes compression
+@app.after_request
+def record_request_metrics(response):
+    """Fold the request's timings into `metrics` and add Server-Timing"""
+    timer = g.pop('timer', None)
+    if timer is None:
+        return response
+    total = timer.elapsed()
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.record_request(timer, endpoint, request.method, response.status_code, total)
+    if SERVER_TIMING:
+        response.headers['Server-Timing'] = timer.server_timing(total)
+    return response
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Request, query and pool metrics in Prometheus text format"""
+    pool = db_pool.stats()
+    cache = search_cache.stats()
+    logins = identity_cache.stats()
+    hashing = password_hasher.stats()
+    gauges = [
+        ('db_pool_connections', (('state', 'in_use'),), pool['inUse']),
+        ('db_pool_connections', (('state', 'idle'),), pool['idle']),
+        ('db_pool_timeouts_total', (), pool['timeouts']),
+        ('search_cache_lookups_total', (('result', 'hit'),), cache['hits']),
+        ('search_cache_lookups_total', (('result', 'miss'),), cache['misses']),
+        ('login_cache_lookups_total', (('result', 'hit'),), logins['hits']),
+        ('login_cache_lookups_total', (('result', 'miss'),), logins['misses']),
+        ('password_checks_total', (('result', 'match'),), hashing['verified']),
+        ('password_checks_total', (('result', 'mismatch'),), hashing['failed']),
+        ('password_checks_total', (('result', 'rejected'),), hashing['rejected']),
+        ('password_checks_total', (('result', 'upgraded'),), hashing['upgraded']),
+    ]
+    admitted = admission.stats()
+    rates = rate_limiter.stats()
+    for name, key in (('admission_running', 'running'), ('admission_waiting', 'waiting')):
+        gauges.extend(
+            (name, (('class', traffic_class),), admitted[key][traffic_class])
+            for traffic_class in CLASS_PRIORITIES
+        )
+    for traffic_class in CLASS_PRIORITIES:
+        rejected = {**admitted['rejected'][traffic_class],
+                    'rate_limited': rates['limited'].get(traffic_class, 0)}
+        gauges.extend(
+            ('admission_rejections_total', (('class', traffic_class), ('reason', reason)), count)
+            for reason, count in rejected.items()
+        )
+    routing = db_router.stats()
+    gauges.append(('db_primary_reads_total', (), routing['primaryReads']))
+    # One family after the other: Prometheus wants each family's samples together
+    gauges.extend(
+        ('db_replica_up', (('replica', replica['name']),), int(replica['healthy']))
+        for replica in routing['replicas']
+    )
+    gauges.extend(
+        ('db_replica_checkouts_total', (('replica', replica['name']),), replica['routed'])
+        for replica in routing['replicas']
+    )
+    gauges.extend(
+        ('background_jobs', (('status', status),), count)
+        for status, count in get_job_queue().stats().items() if status in JOB_STATUSES
+    )
+    snapshot = _catalog
+    if snapshot is not None:
+        gauges.append(('catalog_snapshot_spaces', (), len(snapshot)))
+        gauges.append(('catalog_snapshot_bytes', (), snapshot.nbytes()))
+    return Response(metrics.render(gauges), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# =============================================
+# HTTP CACHING AND COMPRESSION
+# =============================================
+
+def cached_body(obj):
+    """CachedBody (encoded JSON plus validators) for a response object"""
+    with timed('serialize'):
+        return CachedBody(dumps(obj) + b'\n')
+
+def conditional_response(entry, cache_control):
+    """200 with validators for a CachedBody, or 304 when the client's copy
+    (If-None-Match / If-Modified-Since) is still current"""
+    response = app.response_class(entry.body, mimetype='application/json')
+    # Weak: the compressed and uncompressed forms share one validator
+    response.set_etag(entry.etag, weak=True)
+    response.last_modified = entry.last_modified
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    response.make_conditional(request)
+    
+    if response.status_code == 200 and len(entry) >= COMPRESS_MIN_SIZE:
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding:
+            with timed('compress'):
+                response.set_data(entry.encoded(encoding))
+            response.headers['Content-Encoding'] = encoding
+    return response
+
+@app.after_request
+def compress_response(response):
+    """gzip / brotli JSON responses above COMPRESS_MIN_SIZE (streams: gzip)"""
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    
+    if response.is_streamed:
+        if choose_encoding(request.accept_encodings, ('gzip',)):
+            response.response = gzip_stream(response.response)
+            response.headers['Content-Encoding'] = 'gzip'
+            response.headers.pop('Content-Length', None)
+        return response
+    
+    if response.content_length is None or response.content_length < COMPRESS_MIN_SIZE:
+        return response
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding:
+        with timed('compress'):
+            response.set_data(compress(response.get_data(), encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
 
 # =============================================
 # AUTHENTICATION ENDPOINTS
@@ -56,54 +768,54 @@ def login():
         if not email or not password:
             return jsonify({'error': 'Email and password required'}), 400
         
-        hashed_password = hash_password(password)
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Try Seeker
-        cursor.execute("""
-            SELECT SeekerID, FirstName, LastName, Email, PhoneNumber
-            FROM StorageSeekers
-            WHERE Email = ? AND Password = ?
-        """, (email, hashed_password))
-        
-        user = cursor.fetchone()
-        if user:
-            return jsonify({
-                'success': True,
-                'user': {
-                    'userId': user[0],
-                    'userType': 'seeker',
-                    'name': f"{user[1]} {user[2]}",
-                    'email': user[3],
-                    'phone': user[4]
-                }
-            })
-        
-        # Try Provider
-        cursor.execute("""
-            SELECT ProviderID, FirstName, LastName, Email, PhoneNumber
-            FROM StorageProviders
-            WHERE Email = ? AND Password = ?
-        """, (email, hashed_password))
-        
-        user = cursor.fetchone()
-        if user:
+        # The cache holds the account without its password hash, which is
+        # always read fresh so a password change applies at once
+        user = identity_cache.get(email)
+        cached = user is not None
+        with db_connection(read_only=True) as conn:
+            if cached:
+                password_hash = repository.password_hash(conn, user[0], user[1])
+            else:
+                user = repository.find_user(conn, email)
+                password_hash = user[6] if user else None
+                if user:
+                    user = tuple(user[:6])
+                    identity_cache.put(email, user)
+
+        with timed('hash'):
+            matches, new_hash = password_hasher.verify(password, password_hash)
+
+        if matches:
+            user_type, user_id = user[0], user[1]
+            if new_hash:
+                try:
+                    with db_connection() as conn:
+                        repository.update_password(conn, user_type, user_id, new_hash)
+                        conn.commit()
+                except Exception as e:
+                    # Keep the old hash; the upgrade is retried on the next login
+                    print(f"Password hash upgrade failed for {user_type} {user_id}: {e}")
+
             return jsonify({
                 'success': True,
                 'user': {
-                    'userId': user[0],
-                    'userType': 'provider',
-                    'name': f"{user[1]} {user[2]}",
-                    'email': user[3],
-                    'phone': user[4]
+                    'userId': user_id,
+                    'userType': user_type,
+                    'name': f"{user[2]} {user[3]}",
+                    'email': user[4],
+                    'phone': user[5]
                 }
             })
         
-        conn.close()
+        if cached:
+            # The account may have changed since the row was cached
+            identity_cache.invalidate(email)
         return jsonify({'error': 'Invalid email or password'}), 401
         
+    except HasherBusy:
+        response = jsonify({'error': 'Too many login attempts in progress, try again shortly'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
     except Exception as e:
         print(f"Login error: {e}")
         return jsonify({'error': 'Server error during login'}), 500
@@ -112,9 +824,222 @@ def login():
 # SEARCH ENDPOINTS - FIXED FOR YOUR SCHEMA
 # =============================================
 
+# Page size for /api/spaces/search (?limit=); larger requests are clamped
+SEARCH_DEFAULT_LIMIT = 50
+SEARCH_MAX_LIMIT = 500
+NDJSON_FETCH_SIZE = 200
+
+def encode_search_cursor(row):
+    """Opaque `after` token from a row's (PricePerMonth, SpaceID)"""
+    payload = json.dumps([str(row['PricePerMonth']), row['SpaceID']])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_search_cursor(token):
+    """(PricePerMonth, SpaceID) from an `after` token; ValueError if malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        price, space_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return Decimal(price), int(space_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+# Search rows as the dicts search.js expects: YOUR columns plus these keys
+SEARCH_ROW = RowShape({
+    'SizeInSqMeters': alias('Size'),
+    'City': 'Jeddah',  # Default to Jeddah
+    'Location': derived(lambda description: (description or '')[:50], 'Description'),  # Use part of description
+    'AvailabilityStatus': derived(lambda available: 'Available' if available else 'Unavailable', 'IsAvailable'),
+    'ClimateControl': False,  # Default values
+    'SecurityCameras': False,
+    'Access24_7': False,
+    'ImageURL': '../Media/default-storage.png',  # Default image
+})
+
+def plan_search(filters, dates=None):
+    """(filters for SQL, candidate SpaceIDs or None, dates left to check)
+
+    With text-index candidates the date filter is applied to them up front;
+    otherwise search_rows() skips booked spaces as it reads.
+    """
+    sql_filters, candidate_ids = resolve_search_term(filters)
+    if dates and candidate_ids is not None:
+        candidate_ids = get_availability().free_spaces(candidate_ids, *dates)
+        dates = None
+    return sql_filters, candidate_ids, dates
+
+def search_rows(conn, plan, limit, after):
+    """(columns, row iterator) of at most `limit` rows for a planned search"""
+    filters, candidate_ids, dates = plan
+    if dates is None:
+        cursor = repository.search_spaces(conn, filters, limit=limit, after=after,
+                                          space_ids=candidate_ids)
+        rows = itertools.chain.from_iterable(
+            iter(lambda: cursor.fetchmany(NDJSON_FETCH_SIZE), [])
+        )
+        return [column[0] for column in cursor.description], rows
+    
+    # Read keyset batches, dropping spaces booked during `dates`
+    availability = get_availability()
+    batch_size = max(2 * (limit or 0), NDJSON_FETCH_SIZE)
+    cursor = repository.search_spaces(conn, filters, limit=batch_size, after=after,
+                                      space_ids=candidate_ids)
+    columns = [column[0] for column in cursor.description]
+    price_column = columns.index('PricePerMonth')
+    
+    def rows(cursor):
+        while True:
+            batch = cursor.fetchall()
+            for row in batch:
+                if availability.is_free(row[0], *dates):
+                    yield row
+            if len(batch) < batch_size:
+                return
+            last = batch[-1]
+            cursor = repository.search_spaces(conn, filters, limit=batch_size,
+                                              after=(last[price_column], last[0]),
+                                              space_ids=candidate_ids)
+    
+    return columns, itertools.islice(rows(cursor), limit)
+
+def catalog_for(plan):
+    """Catalog snapshot to answer a planned search from, or None for SQL"""
+    # Terms the text index could not resolve need the SQL LIKE filter
+    if plan[0].search_term:
+        return None
+    return get_catalog()
+
+def search_catalog(snapshot, plan, limit, after):
+    """(columns, row iterator) of at most `limit` rows, from the snapshot"""
+    filters, candidate_ids, dates = plan
+    exclude = get_availability().busy_spaces(*dates) if dates else None
+    positions = snapshot.search(filters, candidate_ids, exclude, limit, after)
+    rows = itertools.chain.from_iterable(
+        snapshot.rows(positions[start:start + NDJSON_FETCH_SIZE])
+        for start in range(0, len(positions), NDJSON_FETCH_SIZE)
+    )
+    return catalog.SEARCH_COLUMNS, rows
+
+def count_catalog_matches(snapshot, plan):
+    """Total rows for a planned search, from the snapshot"""
+    filters, candidate_ids, dates = plan
+    exclude = get_availability().busy_spaces(*dates) if dates else None
+    return snapshot.count(filters, candidate_ids, exclude)
+
+def count_search_matches(conn, plan):
+    """Total rows for a planned search, ignoring pagination"""
+    filters, candidate_ids, dates = plan
+    total = repository.count_spaces_matching(conn, filters, candidate_ids)
+    if dates is not None:
+        busy = sorted(get_availability().busy_spaces(*dates))
+        for start in range(0, len(busy), 5000):
+            total -= repository.count_spaces_matching(conn, filters, busy[start:start + 5000])
+    return total
+
+def search_facets(filters, dates=None):
+    """Facet counts for a search (see facets.py), or None when they cannot be
+    answered from memory (no snapshot, or a term only SQL LIKE can match)"""
+    index = get_facets()
+    if index is None:
+        return None
+    space_ids = neighborhood = None
+    if filters.search_term in NEIGHBORHOODS:
+        # Counted as the neighbourhood facet, so the other neighbourhoods show too
+        neighborhood = filters.search_term
+    elif filters.search_term:
+        sql_filters, space_ids = resolve_search_term(filters)
+        if sql_filters.search_term:
+            return None
+    exclude = get_availability().busy_spaces(*dates) if dates else None
+    return index.counts(filters, space_ids, exclude, neighborhood)
+
+def stream_search_ndjson(filters, limit, after, dates=None):
+    """Yield one JSON line per matching space, then a trailer with the next cursor"""
+    plan = plan_search(filters, dates)
+    snapshot = catalog_for(plan)
+    with nullcontext() if snapshot is not None else db_connection(read_only=True) as conn:
+        if snapshot is not None:
+            columns, rows = search_catalog(snapshot, plan, limit, after)
+        else:
+            columns, rows = search_rows(conn, plan, limit, after)
+        count = 0
+        last = None
+        to_dict = None
+        for row in rows:
+            if to_dict is None:
+                to_dict = SEARCH_ROW.mapper(columns, row)
+            last = to_dict(row)
+            count += 1
+            yield dumps(last) + b'\n'
+
+    # A full page may have more rows behind it; a short page is the end
+    next_cursor = encode_search_cursor(last) if limit and count == limit else None
+    yield dumps({'nextCursor': next_cursor, 'count': count}) + b'\n'
+
+def search_by_relevance(filters, limit, offset, dates=None, include_facets=False):
+    """Search response (a CachedBody) ranked by HybridRanker instead of price"""
+    cache_key = (filters, limit, offset, dates, include_facets, 'relevance')
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    query_vector = None
+    if filters.search_term and get_embedding_store() is not None:
+        query_vector = encode_query(filters.search_term)
+    
+    # One look-ahead result decides hasMore
+    exclude = get_availability().busy_spaces(*dates) if dates else None
+    ranked = get_ranker().rank(filters, limit + 1, offset, query_vector, exclude)
+    has_more = len(ranked) > limit
+    ranked = ranked[:limit]
+    
+    with db_connection(read_only=True) as conn:
+        cursor = repository.spaces_by_ids(conn, [space_id for space_id, _, _ in ranked])
+        columns = [column[0] for column in cursor.description]
+        rows = {row[0]: row for row in cursor.fetchall()}
+    
+    results = []
+    to_dict = SEARCH_ROW.mapper(columns, next(iter(rows.values()), None))
+    for space_id, score, components in ranked:
+        if space_id not in rows:
+            continue  # booked out or deactivated since the snapshot
+        space = to_dict(rows[space_id])
+        space['RelevanceScore'] = round(score, 4)
+        space['ScoreComponents'] = {name: round(value, 4) for name, value in components.items()}
+        results.append(space)
+    
+    response = {
+        'success': True,
+        'spaces': results,
+        'count': len(results),
+        'hasMore': has_more,
+        'nextOffset': offset + limit if has_more else None
+    }
+    space_ids = [space_id for space_id, _, _ in ranked]
+    if include_facets:
+        response['facets'] = search_facets(filters, dates)
+        space_ids.append(ANY_SPACE)
+    entry = cached_body(response)
+    search_cache.put(cache_key, entry, space_ids)
+    return entry
+
 @app.route('/api/spaces/search', methods=['GET'])
 def search_spaces():
-    """Search for storage spaces - Using YOUR actual column names"""
+    """Search for storage spaces - Using YOUR actual column names
+
+    Results are keyset-paginated on (PricePerMonth, SpaceID):
+      ?limit=N            page size (default 50, max 500)
+      ?after=<cursor>     nextCursor from the previous page
+      ?includeTotal=true  also count every matching space
+      ?facets=true        also return counts per SpaceType, size band,
+                          neighbourhood and price bucket (see facets.py)
+      ?format=ndjson      stream rows as newline-delimited JSON
+
+    ?startDate=YYYY-MM-DD&endDate=YYYY-MM-DD keeps only spaces with no active
+    booking overlapping [startDate, endDate).
+
+    ?sort=relevance ranks by a blend of semantic similarity, BM25 text match,
+    price fit and rating instead (see ranking.py); pages then use ?offset=N.
+    """
     try:
         # Get query parameters
         search_term = request.args.get('searchTerm', '')
@@ -124,90 +1049,153 @@ def search_spaces():
         min_size = request.args.get('minSize', type=float)
         max_size = request.args.get('maxSize', type=float)
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Build query using YOUR actual column names
-        query = """
-            SELECT 
-                s.SpaceID,
-                s.Title,
-                s.Description,
-                s.SpaceType,
-                s.Size,
-                s.PricePerMonth,
-                s.PricePerWeek,
-                s.PricePerDay,
-                s.IsAvailable,
-                s.Status,
-                p.FirstName + ' ' + p.LastName as ProviderName,
-                p.PhoneNumber as ProviderPhone,
-                ISNULL(AVG(CAST(r.Rating as FLOAT)), 0) as AverageRating,
-                COUNT(r.ReviewID) as ReviewCount
-            FROM StorageSpaces s
-            JOIN StorageProviders p ON s.ProviderID = p.ProviderID
-            LEFT JOIN Bookings b ON s.SpaceID = b.SpaceID
-            LEFT JOIN Reviews r ON b.BookingID = r.BookingID
-            WHERE s.IsAvailable = 1 AND s.Status = 'Active'
-        """
-        
-        params = []
-        
-        # Add filters
-        if space_type:
-            query += " AND s.SpaceType = ?"
-            params.append(space_type)
-        
-        if min_price:
-            query += " AND s.PricePerMonth >= ?"
-            params.append(min_price)
-        
-        if max_price:
-            query += " AND s.PricePerMonth <= ?"
-            params.append(max_price)
-        
-        if min_size:
-            query += " AND s.Size >= ?"
-            params.append(min_size)
-        
-        if max_size:
-            query += " AND s.Size <= ?"
-            params.append(max_size)
-        
-        if search_term:
-            query += " AND (s.Title LIKE ? OR s.Description LIKE ?)"
-            search_pattern = f"%{search_term}%"
-            params.extend([search_pattern, search_pattern])
-        
-        query += """
-            GROUP BY 
-                s.SpaceID, s.Title, s.Description, s.SpaceType, s.Size,
-                s.PricePerMonth, s.PricePerWeek, s.PricePerDay,
-                s.IsAvailable, s.Status,
-                p.FirstName, p.LastName, p.PhoneNumber
-            ORDER BY s.PricePerMonth ASC
-        """
-        
-        cursor.execute(query, params)
-        columns = [column[0] for column in cursor.description]
-        results = []
-        
-        for row in cursor.fetchall():
-            space_dict = dict(zip(columns, row))
-            
-            # Map YOUR columns to expected format for JavaScript
-            space_dict['SizeInSqMeters'] = space_dict.get('Size', 0)
-            space_dict['City'] = 'Jeddah'  # Default to Jeddah
-            space_dict['Location'] = space_dict.get('Description', '')[:50]  # Use part of description
-            space_dict['AvailabilityStatus'] = 'Available' if space_dict.get('IsAvailable') else 'Unavailable'
-            space_dict['ClimateControl'] = False  # Default values
-            space_dict['SecurityCameras'] = False
-            space_dict['Access24_7'] = False
-            space_dict['ImageURL'] = '../Media/default-storage.png'  # Default image
-            
-            results.append(space_dict)
-        
-        conn.close()
+        filters = normalize_filters(SearchFilters(
+            search_term=search_term,
+            space_type=space_type,
+            min_price=min_price,
+            max_price=max_price,
+            min_size=min_size,
+            max_size=max_size,
+        ))
+        
+        # Pagination parameters
+        stream = (request.args.get('format') == 'ndjson'
+                  or request.accept_mimetypes.best == 'application/x-ndjson')
+        limit = request.args.get('limit', type=int)
+        if limit is None:
+            # Streams may run to the end of the result set; pages may not
+            limit = None if stream else SEARCH_DEFAULT_LIMIT
+        elif limit < 1:
+            return jsonify({'error': 'limit must be a positive integer'}), 400
+        else:
+            limit = min(limit, SEARCH_MAX_LIMIT)
+        
+        try:
+            dates = parse_date_range(request.args.get('startDate'), request.args.get('endDate'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        include_facets = request.args.get('facets', '').lower() in ('1', 'true', 'yes')
+        
+        if request.args.get('sort') == 'relevance':
+            offset = request.args.get('offset', 0, type=int)
+            if offset < 0:
+                return jsonify({'error': 'offset must not be negative'}), 400
+            entry = search_by_relevance(filters, limit or SEARCH_DEFAULT_LIMIT, offset, dates,
+                                        include_facets)
+            return conditional_response(entry, SEARCH_CACHE_CONTROL)
+        
+        after = None
+        if request.args.get('after'):
+            try:
+                after = decode_search_cursor(request.args['after'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        
+        if stream:
+            return Response(
+                stream_with_context(stream_search_ndjson(filters, limit, after, dates)),
+                mimetype='application/x-ndjson'
+            )
+        
+        include_total = request.args.get('includeTotal', '').lower() in ('1', 'true', 'yes')
+        
+        cache_key = (filters, limit, after, include_total, include_facets, dates)
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            return conditional_response(cached, SEARCH_CACHE_CONTROL)
+        
+        plan = plan_search(filters, dates)
+        snapshot = catalog_for(plan)
+        if snapshot is not None:
+            # Fetch one extra row to learn whether another page exists
+            columns, rows = search_catalog(snapshot, plan, limit + 1, after)
+            rows = list(rows)
+            total = count_catalog_matches(snapshot, plan) if include_total else None
+        else:
+            with db_connection(read_only=True) as conn:
+                columns, rows = search_rows(conn, plan, limit + 1, after)
+                rows = list(rows)
+                total = count_search_matches(conn, plan) if include_total else None
+        
+        has_more = len(rows) > limit
+        results = SEARCH_ROW.map_rows(columns, rows[:limit])
+        
+        response = {
+            'success': True,
+            'spaces': results,
+            'count': len(results),
+            'hasMore': has_more,
+            'nextCursor': encode_search_cursor(results[-1]) if has_more else None
+        }
+        if include_total:
+            response['total'] = total
+        if include_facets:
+            response['facets'] = search_facets(filters, dates)
+        
+        # Cache the encoded body so hits skip serialization too
+        entry = cached_body(response)
+        # The look-ahead row decides hasMore, so the entry depends on it too
+        space_ids = [row[0] for row in rows]
+        if include_total or include_facets:
+            space_ids.append(ANY_SPACE)
+        search_cache.put(cache_key, entry, space_ids)
+        
+        return conditional_response(entry, SEARCH_CACHE_CONTROL)
+        
+    except Exception as e:
+        print(f"Search error: {e}")
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+@app.route('/api/spaces/match', methods=['GET', 'POST'])
+def match_spaces():
+    """Rank available spaces by semantic similarity to a free-text need
+
+    GET ?need=...&limit=N or POST {"need": "...", "limit": N}. The search
+    filters (spaceType, minPrice, maxPrice, minSize, maxSize) are applied
+    inside the ANN index.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        need = (data.get('need') or request.args.get('need') or '').strip()
+        limit = data.get('limit') or request.args.get('limit', type=int) or MATCH_DEFAULT_LIMIT
+        limit = max(1, min(int(limit), MATCH_MAX_LIMIT))
+        
+        if not need:
+            return jsonify({'error': 'need is required'}), 400
+        
+        def param(name, type=str):
+            value = data.get(name, request.args.get(name))
+            return type(value) if value not in (None, '') else None
+        
+        filters = normalize_filters(SearchFilters(
+            search_term='',
+            space_type=param('spaceType'),
+            min_price=param('minPrice', float),
+            max_price=param('maxPrice', float),
+            min_size=param('minSize', float),
+            max_size=param('maxSize', float),
+        ))
+        
+        index = get_match_index()
+        if index is None:
+            return jsonify({'error': 'Embedding store has not been built'}), 503
+        
+        # Over-fetch a little: the index may lag behind availability changes
+        ranked = index.search(encode_query(need), k=limit * 2, filters=filters)
+        scores = dict(ranked)
+        
+        with db_connection(read_only=True) as conn:
+            cursor = repository.spaces_by_ids(conn, [space_id for space_id, _ in ranked])
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        
+        results = SEARCH_ROW.map_rows(columns, rows)
+        for space in results:
+            space['Similarity'] = round(scores[space['SpaceID']], 4)
+            space['MatchScore'] = round(max(space['Similarity'], 0) * 100, 1)
+        results.sort(key=lambda space: space['Similarity'], reverse=True)
+        results = results[:limit]
         
         return jsonify({
             'success': True,
@@ -216,97 +1204,35 @@ def search_spaces():
         })
         
     except Exception as e:
-        print(f"Search error: {e}")
-        return jsonify({'error': f'Server error: {str(e)}'}), 500
+        print(f"Match error: {e}")
+        return jsonify({'error': 'Server error matching spaces'}), 500
 
 @app.route('/api/spaces/<int:space_id>', methods=['GET'])
 def get_space(space_id):
-    """Get single space details, including features"""
+    """Get single space details, including features
+
+    Responses carry an ETag / Last-Modified and are cached per space until a
+    booking or listing change for it, so repeat views (booking -> payment)
+    are answered with 304 Not Modified or straight from the cache.
+    """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT 
-                -- Space basic info
-                s.SpaceID,
-                s.Title,
-                s.Description,
-                s.SpaceType,
-                s.Size,
-                s.PricePerMonth,
-                s.PricePerWeek,
-                s.PricePerDay,
-                s.IsAvailable,
-                s.Status,
-                s.FavoriteCount,
-
-                -- Features (from SpaceFeatures table)
-                f.FeatureID,
-                f.Temperature,
-                f.Humidity,
-                f.ClimateControlled,
-                f.SecuritySystem,
-                f.CCTVMonitored,
-                f.AccessType,
-                f.ParkingAvailable,
-                f.LoadingAssistance,
-                f.Restrictions,
-
-                -- Provider info
-                p.ProviderID,
-                p.FirstName + ' ' + p.LastName as ProviderName,
-                p.PhoneNumber as ProviderPhone,
-                p.Email as ProviderEmail,
-
-                -- Aggregated rating
-                ISNULL(AVG(CAST(r.Rating as FLOAT)), 0) as AverageRating,
-                COUNT(r.ReviewID) as ReviewCount
-
-            FROM StorageSpaces s
-            JOIN StorageProviders p ON s.ProviderID = p.ProviderID
-            LEFT JOIN SpaceFeatures f ON s.SpaceID = f.SpaceID
-            LEFT JOIN Bookings b ON s.SpaceID = b.SpaceID
-            LEFT JOIN Reviews r ON b.BookingID = r.BookingID
-
-            WHERE s.SpaceID = ?
-
-            GROUP BY
-                s.SpaceID,
-                s.Title,
-                s.Description,
-                s.SpaceType,
-                s.Size,
-                s.PricePerMonth,
-                s.PricePerWeek,
-                s.PricePerDay,
-                s.IsAvailable,
-                s.Status,
-                s.FavoriteCount,
-
-                f.FeatureID,
-                f.Temperature,
-                f.Humidity,
-                f.ClimateControlled,
-                f.SecuritySystem,
-                f.CCTVMonitored,
-                f.AccessType,
-                f.ParkingAvailable,
-                f.LoadingAssistance,
-                f.Restrictions,
-
-                p.ProviderID,
-                p.FirstName,
-                p.LastName,
-                p.PhoneNumber,
-                p.Email
-        """, (space_id,))
+        cache_key = ('space', space_id)
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            return conditional_response(cached, SPACE_CACHE_CONTROL)
         
-        columns = [column[0] for column in cursor.description]
-        row = cursor.fetchone()
+        snapshot = get_catalog()
+        found = snapshot.detail(space_id) if snapshot is not None else None
+        if found is not None:
+            columns, row = found
+        else:
+            # Not in the snapshot (yet): ask the database
+            with db_connection(read_only=True) as conn:
+                cursor = repository.get_space(conn, space_id)
+                columns = [column[0] for column in cursor.description]
+                row = cursor.fetchone()
         
         if not row:
-            conn.close()
             return jsonify({'error': 'Space not found'}), 404
         
         space = dict(zip(columns, row))
@@ -331,24 +1257,247 @@ def get_space(space_id):
         space['ParkingAvailableFlag'] = bool(space.get('ParkingAvailable'))
         space['LoadingAssistanceFlag'] = bool(space.get('LoadingAssistance'))
 
-        conn.close()
+        # Star histogram from the rating summary
+        space['RatingHistogram'] = {
+            str(stars): space.pop(f'Rating{stars}Count') for stars in range(1, 6)
+        }
         
-        return jsonify({
+        entry = cached_body({
             'success': True,
             'space': space
         })
+        search_cache.put(cache_key, entry, [space_id])
+        return conditional_response(entry, SPACE_CACHE_CONTROL)
         
     except Exception as e:
         print(f"Get space error: {e}")
         return jsonify({'error': 'Server error fetching space'}), 500
 
+# =============================================
+# LISTING ENDPOINTS
+# =============================================
+
+def bulk_results(count, created, errors, rolled_back_error):
+    """Per-item results in request order, and the response status code"""
+    results = []
+    for index in range(count):
+        if index in created:
+            results.append({'index': index, 'success': True, **created[index]})
+        else:
+            results.append({'index': index, 'success': False,
+                            'error': errors.get(index, rolled_back_error)})
+    if not created:
+        status = 400
+    elif errors:
+        status = 207
+    else:
+        status = 201
+    return results, status
+
+@app.route('/api/spaces/bulk', methods=['POST'])
+def create_spaces_bulk():
+    """Create many listings (with their SpaceFeatures) in one transaction
+
+    Body: {"providerId": N, "spaces": [{title, type, size, price, description,
+    conditions, access_type, ...}, ...], "atomic": false}. Items may carry
+    their own providerId. Invalid items are reported and skipped, unless
+    atomic is set, in which case nothing is written.
+    """
+    try:
+        data = request.json or {}
+        atomic = bool(data.get('atomic'))
+        default_provider = data.get('providerId')
+        try:
+            valid, errors = validate_items(
+                data.get('spaces'), lambda item: validate_listing(item, default_provider)
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        created = {}
+        with db_connection() as conn:
+            providers = repository.existing_ids(
+                conn, 'StorageProviders', 'ProviderID', {item.provider_id for _, item in valid}
+            )
+            accepted = []
+            for index, item in valid:
+                if item.provider_id not in providers:
+                    errors[index] = 'Provider not found'
+                else:
+                    accepted.append((index, item))
+
+            if accepted and not (atomic and errors):
+                space_ids = repository.insert_spaces(conn, [item for _, item in accepted])
+                conn.commit()
+                for (index, item), space_id in zip(accepted, space_ids):
+                    created[index] = {'spaceId': int(space_id)}
+
+        if created:
+            # New listings can land on any cached search page
+            search_cache.invalidate_all()
+            expire_catalog()
+            if _text_index is not None:
+                for index, item in accepted:
+                    _text_index.update(created[index]['spaceId'],
+                                       f"{item.title} {item.description or ''}")
+
+        results, status = bulk_results(
+            len(data['spaces']), created, errors, 'Not created: another item in the batch failed'
+        )
+        response = jsonify({
+            'success': status != 400,
+            'created': len(created),
+            'failed': len(results) - len(created),
+            'results': results
+        })
+        if created:
+            # Let the client read back what it just wrote
+            stick_to_primary(response)
+        return response, status
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': f'Server error creating spaces: {str(e)}'}), 500
+
+# =============================================
+# BACKGROUND JOBS
+# =============================================
+
+def payment_job(transaction_id, booking_id, space_id, seeker_id, amount, currency='SAR'):
+    """Payload of the jobs that settle one booking's payment"""
+    return {
+        'transactionId': transaction_id,
+        'bookingId': int(booking_id),
+        'spaceId': int(space_id),
+        'seekerId': int(seeker_id),
+        'amount': float(amount),
+        'currency': currency,
+    }
+
+def post_downstream(url, body, idempotency_key):
+    """POST a JSON body to a downstream service; the key lets it drop retries
+    of a request it already handled"""
+    response = requests.post(url, json=body, headers={'Idempotency-Key': idempotency_key},
+                             timeout=DOWNSTREAM_TIMEOUT)
+    # Other client errors would fail the same way on every retry
+    if 400 <= response.status_code < 500 and response.status_code not in (408, 409, 425, 429):
+        raise PermanentJobError(f"{url} answered {response.status_code}")
+    response.raise_for_status()
+
+def notify_booking_event(event, payload):
+    """Fan a booking event out as one notification job per recipient"""
+    get_job_queue().enqueue_many([
+        ('notify', f"{payload['transactionId']}:{event}:{recipient}",
+         {**payload, 'event': event, 'recipient': recipient})
+        for recipient in ('seeker', 'provider')
+    ])
+
+def capture_payment(payload):
+    """Capture a booking's payment, confirm the booking and notify both sides"""
+    transaction_id = payload['transactionId']
+    if PAYMENT_GATEWAY_URL:
+        post_downstream(PAYMENT_GATEWAY_URL, payload, transaction_id)
+    with db_connection() as conn:
+        repository.set_payment_outcome(conn, transaction_id, 'Completed', 'Confirmed')
+        conn.commit()
+        row = repository.payment(conn, transaction_id)
+    if row is None:
+        raise PermanentJobError(f"No payment with TransactionID {transaction_id}")
+    if row[5] == 'Completed':
+        notify_booking_event('confirmed', payload)
+
+def cancel_unpaid_booking(payload):
+    """Fail a payment that could not be captured and cancel its booking"""
+    transaction_id = payload['transactionId']
+    with db_connection() as conn:
+        cancelled = repository.set_payment_outcome(conn, transaction_id, 'Failed', 'Cancelled')
+        conn.commit()
+    if cancelled:
+        # Other processes drop it at their next availability refresh
+        get_availability().remove_booking(payload['bookingId'])
+        search_cache.invalidate_spaces([payload['spaceId']])
+    notify_booking_event('payment_failed', payload)
+
+def send_notification(payload):
+    if NOTIFY_URL:
+        post_downstream(NOTIFY_URL, payload,
+                        f"{payload['transactionId']}:{payload['event']}:{payload['recipient']}")
+
+def job_failed(job, error):
+    """A payment that cannot be captured releases its booking"""
+    if job.kind == 'capture_payment':
+        get_job_queue().enqueue('cancel_unpaid_booking', f"{job.key}:cancel", job.payload)
+
+_job_queue = None
+job_workers = None      # started by the first request (see start_background_jobs)
+_jobs_lock = threading.Lock()
+
+def get_job_queue():
+    """Local job queue, opened on first use"""
+    global _job_queue
+    if _job_queue is None:
+        with _jobs_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue(JOB_QUEUE_PATH)
+    return _job_queue
+
+def requeue_pending_payments():
+    """Queue capture for Pending payments whose job never got enqueued (e.g.
+    the process died right after committing the booking)"""
+    try:
+        with db_connection() as conn:
+            rows = repository.pending_payments(conn)
+        # Existing keys are ignored, so queued or finished captures are not repeated
+        get_job_queue().enqueue_many([
+            ('capture_payment', row[0], payment_job(*row)) for row in rows
+        ])
+    except Exception as e:
+        print(f"Pending payment recovery error: {e}")
+
+@app.before_request
+def start_background_jobs():
+    """Open the job queue and start its workers in processes that serve requests"""
+    global job_workers
+    if job_workers is None:
+        queue = get_job_queue()
+        with _jobs_lock:
+            if job_workers is not None:
+                return
+            workers = JobWorkers(
+                queue,
+                {
+                    'capture_payment': capture_payment,
+                    'cancel_unpaid_booking': cancel_unpaid_booking,
+                    'notify': send_notification,
+                },
+                on_dead=job_failed,
+                workers=JOB_WORKERS,
+                max_attempts=JOB_MAX_ATTEMPTS,
+                maintenance=requeue_pending_payments,
+                maintenance_interval=PAYMENT_RECOVERY_INTERVAL,
+            )
+            workers.start()
+            job_workers = workers
+
 # =============================================
 # BOOKING ENDPOINTS
 # =============================================
 
+def enqueue_captures(payments):
+    """Queue capture jobs for committed (TransactionID, BookingID, SpaceID,
+    SeekerID, amount) payments"""
+    try:
+        get_job_queue().enqueue_many([
+            ('capture_payment', payment[0], payment_job(*payment)) for payment in payments
+        ])
+    except Exception as e:
+        # The payments stay Pending; requeue_pending_payments() picks them up
+        print(f"Payment job enqueue error: {e}")
+
 @app.route('/api/bookings', methods=['POST'])
 def create_booking():
-    """Create a new booking and a payment record using your real schema"""
+    """Create a Pending booking and payment; the payment is captured in the
+    background (see capture_payment)"""
     try:
         data = request.json or {}
 
@@ -381,101 +1530,66 @@ def create_booking():
         # Example: platform fee = 7% of total
         platform_fee = (total_dec * Decimal('0.07')).quantize(Decimal('0.01'))
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        # Hold the dates in the availability index first: a conflicting
+        # request is rejected without touching the database, and two
+        # overlapping requests in this process cannot both get through
+        availability = get_availability()
+        hold = availability.reserve(space_id, start_dt, end_dt)
+        if hold is None:
+            return jsonify({'success': False, 'error': 'Space is already booked for the selected dates'}), 409
 
-        # Make sure the space exists & is available
-        cursor.execute("""
-            SELECT IsAvailable, Status
-            FROM StorageSpaces
-            WHERE SpaceID = ?
-        """, (space_id,))
-        row = cursor.fetchone()
-        if not row:
-            conn.close()
-            return jsonify({'success': False, 'error': 'Space not found'}), 404
-        if not row[0] or row[1] != 'Active':
-            conn.close()
-            return jsonify({'success': False, 'error': 'Space is not available'}), 400
-
-        # 1) INSERT into Bookings and get the inserted row via OUTPUT
-        cursor.execute("""
-            INSERT INTO Bookings (
-                SpaceID,
-                SeekerID,
-                StartDate,
-                EndDate,
-                RentalDurationMonths,
-                TotalAmount,
-                PlatformFee,
-                BookingStatus,
-                CreatedAt
-            )
-            OUTPUT
-                INSERTED.BookingID,
-                INSERTED.StartDate,
-                INSERTED.EndDate,
-                INSERTED.TotalAmount,
-                INSERTED.BookingStatus
-            VALUES (
-                ?, ?, ?, ?, ?, ?, ?, 'Pending', SYSDATETIME()
-            )
-        """, (
-            int(space_id),
-            int(seeker_id),
-            start_dt,
-            end_dt,
-            rental_months,
-            total_dec,
-            platform_fee
-        ))
+        committed = False
+        try:
+            with db_connection() as conn:
+                # Lock the space row so other processes serialize on it too
+                repository.lock_spaces(conn, [space_id])
 
-        booking_row = cursor.fetchone()
-        if not booking_row:
-            conn.rollback()
-            conn.close()
-            return jsonify({'success': False, 'error': 'Could not create booking'}), 500
-
-        booking_id      = booking_row[0]
-        inserted_start  = booking_row[1]
-        inserted_end    = booking_row[2]
-        inserted_total  = booking_row[3]
-        inserted_status = booking_row[4]
-
-        # 2) INSERT into Payments with that BookingID
-        transaction_id = str(uuid.uuid4())  # fake transaction ID for now
-
-        cursor.execute("""
-            INSERT INTO Payments (
-                BookingID,
-                PaymentType,
-                Amount,
-                Currency,
-                PaymentMethod,
-                PaymentStatus,
-                TransactionID,
-                PaymentGateway,
-                PaymentDate,
-                RefundAmount,
-                RefundDate,
-                RefundReason,
-                CreatedAt
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, SYSDATETIME(), NULL, NULL, NULL, SYSDATETIME())
-        """, (
-            int(booking_id),     # BookingID
-            'Booking',           # PaymentType
-            total_dec,           # Amount (DECIMAL)
-            'SAR',               # Currency
-            'CreditCard',              # PaymentMethod
-            'Completed',         # PaymentStatus
-            transaction_id,      # TransactionID
-            'Manual'             # PaymentGateway (or 'Moyasar', 'Stripe', etc.)
-        ))
+                # Make sure the space exists & is available
+                row = repository.get_space_status(conn, space_id)
+                if not row:
+                    return jsonify({'success': False, 'error': 'Space not found'}), 404
+                if not row[0] or row[1] != 'Active':
+                    return jsonify({'success': False, 'error': 'Space is not available'}), 400
 
-        # 3) Commit both inserts
-        conn.commit()
-        conn.close()
+                # Bookings the index has not seen yet (other workers, server.js)
+                check_start, check_end = (date.fromordinal(day) for day in day_range(start_dt, end_dt))
+                if repository.find_booking_conflict(conn, space_id, check_start, check_end):
+                    return jsonify({'success': False, 'error': 'Space is already booked for the selected dates'}), 409
+
+                # 1) INSERT into Bookings and get the inserted row back
+                booking_row = repository.insert_booking(
+                    conn, space_id, seeker_id, start_dt.date(), end_dt.date(),
+                    rental_months, total_dec, platform_fee
+                )
+                if not booking_row:
+                    return jsonify({'success': False, 'error': 'Could not create booking'}), 500
+
+                booking_id      = booking_row[0]
+                inserted_start  = booking_row[1]
+                inserted_end    = booking_row[2]
+                inserted_total  = booking_row[3]
+                inserted_status = booking_row[4]
+
+                # 2) INSERT the Pending payment; its TransactionID is the
+                #    idempotency key of the capture job
+                transaction_id = str(uuid.uuid4())
+                repository.insert_payment(conn, booking_id, total_dec, transaction_id,
+                                          payment_status='Pending', payment_gateway=PAYMENT_GATEWAY)
+
+                # 3) Commit both inserts
+                conn.commit()
+                committed = True
+        finally:
+            if committed:
+                availability.confirm(hold, booking_id)
+            else:
+                availability.release(hold)
+
+        # Cached search pages showing this space are now stale
+        search_cache.invalidate_spaces([int(space_id)])
+
+        # 4) Capture, confirmation and notifications run off the request path
+        enqueue_captures([(transaction_id, booking_id, space_id, seeker_id, total_dec)])
 
         booking = {
             'bookingId': int(booking_id),
@@ -489,21 +1603,155 @@ def create_booking():
             'bookingId': int(booking_id),
             'amount': float(total_dec),
             'currency': 'SAR',
-            'paymentStatus': 'Completed',
+            'paymentStatus': 'Pending',
             'transactionId': transaction_id
         }
 
-        return jsonify({
+        # Let the client read back its booking while replicas catch up
+        return stick_to_primary(jsonify({
             'success': True,
-            'message': 'Booking and payment created successfully',
+            'message': 'Booking created; payment is being processed',
             'booking': booking,
             'payment': payment
-        }), 201
+        })), 201
 
     except Exception as e:
         traceback.print_exc()
         return jsonify({'success': False, 'error': f'Server error creating booking: {str(e)}'}), 500
 
+@app.route('/api/bookings/bulk', methods=['POST'])
+def create_bookings_bulk():
+    """Create many Pending bookings and payments in one transaction; the
+    payments are captured in the background like create_booking()'s
+
+    Body: {"bookings": [{seekerId, spaceId, startDate, endDate, totalAmount},
+    ...], "atomic": false}. Each item follows the create_booking() rules;
+    items conflicting with existing bookings or with each other are
+    rejected. With atomic set, nothing is written unless every item is valid.
+    """
+    try:
+        data = request.json or {}
+        atomic = bool(data.get('atomic'))
+        try:
+            valid, errors = validate_items(data.get('bookings'), validate_booking)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        conflict_error = 'Space is already booked for the selected dates'
+        availability = get_availability()
+        holds = {}
+        created = {}
+        committed = False
+        try:
+            with db_connection() as conn:
+                space_ids = {item.space_id for _, item in valid}
+                repository.lock_spaces(conn, space_ids)
+                statuses = repository.space_statuses(conn, space_ids)
+                seekers = repository.existing_ids(
+                    conn, 'StorageSeekers', 'SeekerID', {item.seeker_id for _, item in valid}
+                )
+                # Bookings the index has not seen yet (other workers, server.js)
+                booked = AvailabilityIndex.from_rows(
+                    repository.active_bookings_for_spaces(conn, space_ids)
+                )
+
+                accepted = []
+                for index, item in valid:
+                    status = statuses.get(item.space_id)
+                    if status is None:
+                        errors[index] = 'Space not found'
+                    elif not status[0] or status[1] != 'Active':
+                        errors[index] = 'Space is not available'
+                    elif item.seeker_id not in seekers:
+                        errors[index] = 'Seeker not found'
+                    elif not booked.is_free(item.space_id, item.start_dt, item.end_dt):
+                        errors[index] = conflict_error
+                    else:
+                        # Also rejects overlaps between items of this batch
+                        hold = availability.reserve(item.space_id, item.start_dt, item.end_dt)
+                        if hold is None:
+                            errors[index] = conflict_error
+                        else:
+                            holds[index] = hold
+                            accepted.append((index, item))
+
+                if accepted and not (atomic and errors):
+                    booking_ids = repository.insert_bookings(conn, [item for _, item in accepted])
+                    payments = [
+                        (booking_id, item.total_amount, str(uuid.uuid4()))
+                        for booking_id, (_, item) in zip(booking_ids, accepted)
+                    ]
+                    repository.insert_payments(conn, payments, payment_status='Pending',
+                                               payment_gateway=PAYMENT_GATEWAY)
+                    conn.commit()
+                    committed = True
+                    enqueue_captures([
+                        (transaction_id, booking_id, item.space_id, item.seeker_id, amount)
+                        for (booking_id, amount, transaction_id), (_, item) in zip(payments, accepted)
+                    ])
+
+                    for (index, item), (booking_id, _, transaction_id) in zip(accepted, payments):
+                        created[index] = {
+                            'bookingId': int(booking_id),
+                            'spaceId': item.space_id,
+                            'startDate': item.start_dt.date().isoformat(),
+                            'endDate': item.end_dt.date().isoformat(),
+                            'totalAmount': float(item.total_amount),
+                            'bookingStatus': 'Pending',
+                            'paymentStatus': 'Pending',
+                            'transactionId': transaction_id
+                        }
+        finally:
+            for index, hold in holds.items():
+                if committed:
+                    availability.confirm(hold, created[index]['bookingId'])
+                else:
+                    availability.release(hold)
+
+        if created:
+            search_cache.invalidate_spaces({booking['spaceId'] for booking in created.values()})
+
+        results, status = bulk_results(
+            len(data['bookings']), created, errors, 'Not created: another item in the batch failed'
+        )
+        response = jsonify({
+            'success': status != 400,
+            'created': len(created),
+            'failed': len(results) - len(created),
+            'results': results
+        })
+        if created:
+            # Let the client read back what it just wrote
+            stick_to_primary(response)
+        return response, status
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': f'Server error creating bookings: {str(e)}'}), 500
+
+@app.route('/api/payments/<transaction_id>', methods=['GET'])
+def get_payment(transaction_id):
+    """Status of a booking payment, for clients waiting on its capture"""
+    try:
+        with db_connection() as conn:
+            row = repository.payment(conn, transaction_id)
+        if row is None:
+            return jsonify({'success': False, 'error': 'Payment not found'}), 404
+        return jsonify({
+            'success': True,
+            'payment': {
+                'transactionId': transaction_id,
+                'bookingId': int(row[0]),
+                'amount': float(row[3]) if row[3] is not None else 0,
+                'currency': row[4],
+                'paymentStatus': row[5],
+                'bookingStatus': row[6]
+            }
+        })
+    except Exception as e:
+        print(f"Payment status error: {e}")
+        return jsonify({'success': False, 'error': f'Server error: {str(e)}'}), 500
+
 # =============================================
 # HEALTH CHECK
 # =============================================
@@ -512,21 +1760,32 @@ def create_booking():
 def health_check():
     """Health check endpoint"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM StorageSpaces")
-        count = cursor.fetchone()[0]
-        conn.close()
+        with db_connection() as conn:
+            count = repository.count_spaces(conn)
         return jsonify({
             'status': 'healthy',
             'database': 'connected',
-            'spaces_count': count
+            'backend': repository.name,
+            'spaces_count': count,
+            'pool': db_pool.stats(),
+            'searchCache': search_cache.stats(),
+            'embeddings': embedding_service.stats(),
+            'textIndex': _text_index.stats() if _text_index is not None else None,
+            'availability': _availability.stats() if _availability is not None else None,
+            'catalog': _catalog.stats() if _catalog is not None else None,
+            'facets': _facets.stats() if _facets is not None else None,
+            'replicas': db_router.stats() if db_router.replicas else None,
+            'admission': {**admission.stats(), 'rateLimits': rate_limiter.stats()},
+            'jobs': {**get_job_queue().stats(), **(job_workers.stats() if job_workers else {})}
         })
     except Exception as e:
         return jsonify({
             'status': 'unhealthy',
             'database': 'disconnected',
-            'error': str(e)
+            'error': str(e),
+            'pool': db_pool.stats(),
+            'searchCache': search_cache.stats(),
+            'embeddings': embedding_service.stats()
         }), 500
 
 # =============================================
@@ -537,8 +1796,11 @@ if __name__ == '__main__':
     print("=" * 50)
     print("🚀 Si'aa Flask Backend Starting...")
     print("=" * 50)
-    print(f"Database: {DB_CONFIG['database']}")
-    print(f"Server: {DB_CONFIG['server']}")
+    if repository.name == 'sqlite':
+        print(f"Database: SQLite ({SQLITE_PATH})")
+    else:
+        print(f"Database: {DB_CONFIG['database']}")
+        print(f"Server: {DB_CONFIG['server']}")
     print(f"API URL: http://localhost:5000/api")
     print("=" * 50)
     print("\nNote: Using YOUR database schema:")
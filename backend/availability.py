@@ -0,0 +1,281 @@
+"""
+Booking availability engine
+
+Keeps the active bookings (anything not Cancelled or Completed) of every
+space in memory as sorted interval arrays, so the questions
+
+    is space X free for [start, end)?
+    which of these spaces are free for [start, end)?
+
+cost one binary search per space instead of an overlap query per candidate.
+
+Dates are whole days and intervals are half-open: a booking ending on the
+15th does not conflict with one starting on the 15th. A booking whose end
+date equals its start date occupies that one day.
+
+create_booking() takes a short-lived hold on the interval before it writes
+to the database, so two requests for overlapping dates in this process can
+never both succeed; the database-side check in the same transaction covers
+other processes.
+
+Bookings written elsewhere are picked up by re-reading rows above a
+BookingID watermark. BookingIDs are assigned when a row is inserted, not
+when it commits, so a booking can become visible after a higher one was
+already read. The watermark therefore only counts rows read from the
+database (never local confirm()s) and trails by `settle_time`: each refresh
+re-reads everything above the highest BookingID seen at least that long ago.
+
+Rows may carry the BookingStatus. Bookings read as Pending are tracked, so
+refreshes can re-check their status (pending_bookings(), apply_statuses())
+and drop the ones whose payment failed in another process.
+"""
+
+import bisect
+import itertools
+import threading
+import time
+from collections import deque
+from datetime import date, datetime
+
+
+# Mirrors repository.ACTIVE_BOOKING_SQL
+INACTIVE_STATUSES = frozenset(['Cancelled', 'Completed'])
+
+
+def day_number(value):
+    """Proleptic ordinal of a date, datetime or 'YYYY-MM-DD...' string"""
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+
+def day_range(start, end):
+    """Half-open [start, end) day numbers; same-day bookings cover one day"""
+    start_day, end_day = day_number(start), day_number(end)
+    return start_day, max(end_day, start_day + 1)
+
+
+class _SpaceBookings:
+    """One space's bookings sorted by start, with a running max of end days
+
+    max_end[i] is the latest end among the first i + 1 intervals, which lets
+    an overlap test stop at a single binary search even when intervals in
+    the data overlap each other.
+    """
+
+    __slots__ = ('starts', 'ends', 'booking_ids', 'max_end')
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.booking_ids = []
+        self.max_end = []
+
+    def __len__(self):
+        return len(self.starts)
+
+    def add(self, booking_id, start, end):
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.booking_ids.insert(i, booking_id)
+        self.max_end.insert(i, 0)
+        self._refresh_max(i)
+
+    def remove(self, booking_id):
+        try:
+            i = self.booking_ids.index(booking_id)
+        except ValueError:
+            return False
+        for values in (self.starts, self.ends, self.booking_ids, self.max_end):
+            del values[i]
+        self._refresh_max(i)
+        return True
+
+    def overlaps(self, start, end):
+        # Intervals starting before `end` overlap iff the latest of their ends is after `start`
+        i = bisect.bisect_left(self.starts, end)
+        return i > 0 and self.max_end[i - 1] > start
+
+    def _refresh_max(self, i):
+        running = self.max_end[i - 1] if i > 0 else 0
+        for j in range(i, len(self.ends)):
+            running = max(running, self.ends[j])
+            self.max_end[j] = running
+
+
+class AvailabilityIndex:
+    """Thread-safe interval index of active bookings, keyed by SpaceID
+
+    settle_time   -- seconds a booking may take from getting its BookingID to
+                     committing; refreshes re-read that far back
+    settled_after -- BookingID up to which every booking had committed before
+                     the first read (a previous index's scan_after(); 0 when
+                     unknown, so refreshes re-read everything until the first
+                     read has settled)
+    """
+
+    def __init__(self, settle_time=30.0, settled_after=0):
+        self.settle_time = settle_time
+        self._lock = threading.RLock()
+        self._spaces = {}          # SpaceID -> _SpaceBookings
+        self._space_of = {}        # BookingID (or hold key) -> SpaceID
+        self._hold_keys = itertools.count(1)
+        self._pending = set()      # BookingIDs last read as Pending
+        # (monotonic time, highest BookingID read from the database by then);
+        # the first entry counts as settled
+        self._scans = deque([(float('-inf'), settled_after)])
+        self.max_booking_id = 0
+
+    @classmethod
+    def from_rows(cls, rows, **kwargs):
+        """Index (BookingID, SpaceID, StartDate, EndDate[, BookingStatus]) rows
+        read from the database"""
+        index = cls(**kwargs)
+        index.apply_scan(rows)
+        return index
+
+    def __len__(self):
+        return len(self._space_of)
+
+    # -----------------------------------------
+    # Updates
+    # -----------------------------------------
+
+    def apply_scan(self, rows):
+        """Index active-booking rows read from the database, and advance the
+        watermark to the highest BookingID among them"""
+        with self._lock:
+            highest = self._scans[-1][1]
+            for row in rows:
+                booking_id, space_id, start, end = row[:4]
+                self.add_booking(booking_id, space_id, start, end)
+                if len(row) > 4 and row[4] == 'Pending':
+                    self._pending.add(int(booking_id))
+                highest = max(highest, int(booking_id))
+            self._scans.append((time.monotonic(), highest))
+
+    def pending_bookings(self):
+        """BookingIDs read as Pending whose status should be re-checked"""
+        with self._lock:
+            return sorted(self._pending)
+
+    def apply_statuses(self, booking_ids, rows):
+        """Apply the (BookingID, BookingStatus) rows re-read for `booking_ids`
+        (from pending_bookings()): cancelled, completed and deleted bookings
+        are dropped, confirmed ones are no longer tracked"""
+        statuses = {int(booking_id): status for booking_id, status in rows}
+        with self._lock:
+            for booking_id in booking_ids:
+                status = statuses.get(booking_id)
+                if status is None or status in INACTIVE_STATUSES:
+                    self.remove_booking(booking_id)
+                elif status != 'Pending':
+                    self._pending.discard(booking_id)
+
+    def scan_after(self):
+        """BookingID the next refresh should re-read active bookings after:
+        the highest one read at least settle_time ago"""
+        with self._lock:
+            now = time.monotonic()
+            while len(self._scans) > 1 and now - self._scans[1][0] >= self.settle_time:
+                self._scans.popleft()
+            return self._scans[0][1]
+
+    def add_booking(self, booking_id, space_id, start, end):
+        """Record an active booking (re-adding a BookingID replaces it)"""
+        booking_id, space_id = int(booking_id), int(space_id)
+        start_day, end_day = day_range(start, end)
+        with self._lock:
+            self.remove_booking(booking_id)
+            self._spaces.setdefault(space_id, _SpaceBookings()).add(booking_id, start_day, end_day)
+            self._space_of[booking_id] = space_id
+            self.max_booking_id = max(self.max_booking_id, booking_id)
+
+    def remove_booking(self, booking_id):
+        """Forget a cancelled / completed booking (or an unused hold)"""
+        with self._lock:
+            self._pending.discard(booking_id)
+            space_id = self._space_of.pop(booking_id, None)
+            if space_id is None:
+                return False
+            bookings = self._spaces[space_id]
+            bookings.remove(booking_id)
+            if not bookings:
+                del self._spaces[space_id]
+            return True
+
+    def reserve(self, space_id, start, end):
+        """Atomically check [start, end) and hold it; returns a hold key, or
+        None when the dates conflict. Pass the key to confirm() or release()."""
+        space_id = int(space_id)
+        start_day, end_day = day_range(start, end)
+        with self._lock:
+            bookings = self._spaces.get(space_id)
+            if bookings is not None and bookings.overlaps(start_day, end_day):
+                return None
+            # Holds use string keys so they never collide with BookingIDs
+            key = f"hold-{next(self._hold_keys)}"
+            self._spaces.setdefault(space_id, _SpaceBookings()).add(key, start_day, end_day)
+            self._space_of[key] = space_id
+            return key
+
+    def confirm(self, hold_key, booking_id):
+        """Turn a hold into the booking row that was written for it"""
+        with self._lock:
+            space_id = self._space_of.get(hold_key)
+            if space_id is None:
+                return
+            bookings = self._spaces[space_id]
+            i = bookings.booking_ids.index(hold_key)
+            start, end = bookings.starts[i], bookings.ends[i]
+            self.remove_booking(hold_key)
+            self._spaces.setdefault(space_id, _SpaceBookings()).add(int(booking_id), start, end)
+            self._space_of[int(booking_id)] = space_id
+            self.max_booking_id = max(self.max_booking_id, int(booking_id))
+
+    def release(self, hold_key):
+        """Drop a hold whose booking was not written"""
+        self.remove_booking(hold_key)
+
+    # -----------------------------------------
+    # Queries
+    # -----------------------------------------
+
+    def is_free(self, space_id, start, end):
+        """True when no active booking of space_id overlaps [start, end)"""
+        start_day, end_day = day_range(start, end)
+        with self._lock:
+            bookings = self._spaces.get(int(space_id))
+            return bookings is None or not bookings.overlaps(start_day, end_day)
+
+    def free_spaces(self, space_ids, start, end):
+        """The SpaceIDs from `space_ids` that are free for [start, end), in order"""
+        start_day, end_day = day_range(start, end)
+        with self._lock:
+            spaces = self._spaces
+            return [
+                space_id for space_id in space_ids
+                if int(space_id) not in spaces or not spaces[int(space_id)].overlaps(start_day, end_day)
+            ]
+
+    def busy_spaces(self, start, end):
+        """Set of SpaceIDs with an active booking overlapping [start, end)"""
+        start_day, end_day = day_range(start, end)
+        with self._lock:
+            return {
+                space_id for space_id, bookings in self._spaces.items()
+                if bookings.overlaps(start_day, end_day)
+            }
+
+    def stats(self):
+        with self._lock:
+            return {
+                'bookings': len(self._space_of),
+                'spacesWithBookings': len(self._spaces),
+                'maxBookingId': self.max_booking_id,
+                'pendingBookings': len(self._pending),
+                'scannedThrough': self._scans[-1][1],
+            }
@@ -0,0 +1,155 @@
+"""
+Recall / latency benchmark for the IVF index in ann_index.py
+
+Builds an index over synthetic clustered 384-d embeddings (or a saved
+embedding store) and reports recall@k against exact search for a range of
+n_probe values, with and without a search_spaces()-style filter.
+
+    python benchmarks/bench_ann.py --n 100000 --probes 1,2,4,8,16,32
+    python benchmarks/bench_ann.py --store embeddings/spaces --json ann.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ann_index import IVFIndex  # noqa: E402
+from embedding_store import EMBEDDING_DIM, EmbeddingStore, normalize_rows  # noqa: E402
+from repository import SearchFilters  # noqa: E402
+
+SPACE_TYPES = ['Indoor room', 'Garage / parking', 'Warehouse corner', 'Outdoor covered area']
+
+
+def synthetic_vectors(rng, n, dim, clusters=200):
+    """Clustered unit vectors, closer to real sentence embeddings than noise"""
+    centers = normalize_rows(rng.standard_normal((clusters, dim)))
+    labels = rng.integers(0, clusters, n)
+    noise = rng.standard_normal((n, dim)) / np.sqrt(dim)
+    return normalize_rows(centers[labels] + 0.6 * noise)
+
+
+def exact_top_k(vectors, mask, query, k):
+    scores = vectors @ query
+    if mask is not None:
+        scores = np.where(mask, scores, -np.inf)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return set(top[np.isfinite(scores[top])].tolist())
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def run(args):
+    rng = np.random.default_rng(args.seed)
+
+    if args.store:
+        store = EmbeddingStore(args.store)
+        vectors = normalize_rows(np.asarray(store.matrix, dtype=np.float32))
+        ids = np.asarray(store.ids)
+    else:
+        vectors = synthetic_vectors(rng, args.n, EMBEDDING_DIM)
+        ids = np.arange(1, len(vectors) + 1)
+    n = len(vectors)
+
+    space_types = rng.choice(SPACE_TYPES, n)
+    prices = rng.uniform(50, 2000, n).astype(np.float32)
+    sizes = rng.integers(1, 60, n).astype(np.float32)
+    active = rng.random(n) < 0.85
+
+    started = time.perf_counter()
+    index = IVFIndex(EMBEDDING_DIM, n_lists=args.lists)
+    index.train(vectors)
+    index.add(ids, vectors, space_types, prices, sizes, active)
+    build_seconds = time.perf_counter() - started
+
+    # Queries: perturbed copies of indexed vectors
+    noise = rng.standard_normal((args.queries, EMBEDDING_DIM)) / np.sqrt(EMBEDDING_DIM)
+    queries = normalize_rows(vectors[rng.choice(n, args.queries)] + 0.3 * noise)
+    row_of_id = {int(space_id): row for row, space_id in enumerate(ids.tolist())}
+
+    scenarios = {
+        'active only': (None, active),
+        'Indoor room, <= 600 SAR': (
+            SearchFilters('', 'Indoor room', None, 600, None, None),
+            active & (space_types == 'Indoor room') & (prices <= 600),
+        ),
+    }
+
+    results = {
+        'vectors': n,
+        'lists': index.n_lists,
+        'k': args.k,
+        'buildSeconds': round(build_seconds, 2),
+        'scenarios': {},
+    }
+
+    for name, (filters, mask) in scenarios.items():
+        truth, exact_times = [], []
+        for query in queries:
+            t0 = time.perf_counter()
+            truth.append(exact_top_k(vectors, mask, query, args.k))
+            exact_times.append(time.perf_counter() - t0)
+
+        rows = []
+        for n_probe in args.probes:
+            hits, total, times = 0, 0, []
+            for query, expected in zip(queries, truth):
+                t0 = time.perf_counter()
+                found = index.search(query, args.k, filters=filters, n_probe=n_probe)
+                times.append(time.perf_counter() - t0)
+                hits += len(expected & {row_of_id[space_id] for space_id, _ in found})
+                total += len(expected)
+            rows.append({
+                'nProbe': n_probe,
+                'recall': round(hits / total, 4) if total else 1.0,
+                'p50Ms': percentile_ms(times, 50),
+                'p95Ms': percentile_ms(times, 95),
+            })
+
+        results['scenarios'][name] = {
+            'matchingRows': int(mask.sum()),
+            'exactP50Ms': percentile_ms(exact_times, 50),
+            'exactP95Ms': percentile_ms(exact_times, 95),
+            'ivf': rows,
+        }
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the IVF index against exact search')
+    parser.add_argument('--n', type=int, default=100_000, help='synthetic vectors to index')
+    parser.add_argument('--store', help='benchmark a saved embedding store instead')
+    parser.add_argument('--lists', type=int, help='IVF lists (default ~4*sqrt(N))')
+    parser.add_argument('--probes', default='1,2,4,8,16,32',
+                        type=lambda value: [int(p) for p in value.split(',')])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = run(args)
+
+    print(f"{results['vectors']:,} vectors, {results['lists']} lists, "
+          f"built in {results['buildSeconds']}s, recall@{results['k']}")
+    for name, scenario in results['scenarios'].items():
+        print(f"\n{name} ({scenario['matchingRows']:,} rows) - exact p50 {scenario['exactP50Ms']} ms")
+        print(f"  {'n_probe':>7}  {'recall':>7}  {'p50 ms':>8}  {'p95 ms':>8}")
+        for row in scenario['ivf']:
+            print(f"  {row['nProbe']:>7}  {row['recall']:>7.3f}  {row['p50Ms']:>8}  {row['p95Ms']:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Throughput / tail-latency benchmark: development server vs gunicorn
+
+Starts the backend in each serving mode, drives it with concurrent
+keep-alive clients over a mix of read endpoints, and reports requests/sec
+and latency percentiles. Each server is stopped with SIGTERM and the time
+it takes to drain is reported too.
+
+    dev       Flask's built-in server (`python app.py`, threaded, no reloader)
+    gunicorn  gunicorn -c gunicorn.conf.py app:app
+
+Point it at a local SQLite database so runs are repeatable:
+
+    python generate_sample_db.py --db /tmp/siaa.db
+    SIAA_DB_BACKEND=sqlite SIAA_SQLITE_PATH=/tmp/siaa.db \\
+        python benchmarks/bench_serving.py --clients 32 --duration 20
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_PATHS = [
+    '/api/spaces/search?searchTerm=garage',
+    '/api/spaces/search?spaceType=Indoor%20room&maxPrice=500',
+    '/api/spaces/search?minSize=10&sort=relevance',
+    '/api/spaces/1',
+    '/api/health',
+]
+
+MODES = {
+    'dev': [sys.executable, '-c',
+            "import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                 '--bind', '127.0.0.1:{port}', 'app:app'],
+}
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 2) if samples else None
+
+
+def start_server(mode, port, env):
+    command = [part.format(port=port) for part in MODES[mode]]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{mode} server exited with code {process.returncode}")
+        try:
+            if requests.get(f"{url}/api/health", timeout=2).status_code == 200:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    process.kill()
+    raise RuntimeError(f"{mode} server did not become healthy")
+
+
+def stop_server(process):
+    """SIGTERM and wait; seconds taken to drain"""
+    started = time.perf_counter()
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    return round(time.perf_counter() - started, 2)
+
+
+def drive(url, paths, clients, duration, timeout):
+    """Run `clients` keep-alive loops for `duration` seconds"""
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+    stop_at = time.perf_counter() + duration
+
+    def client(n):
+        session = requests.Session()
+        i = n
+        while time.perf_counter() < stop_at:
+            path = paths[i % len(paths)]
+            i += 1
+            t0 = time.perf_counter()
+            try:
+                response = session.get(url + path, timeout=timeout)
+                response.content
+                ok = response.status_code < 500
+            except requests.RequestException:
+                ok = False
+            if ok:
+                latencies[n].append(time.perf_counter() - t0)
+            else:
+                errors[n] += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    samples = [sample for per_client in latencies for sample in per_client]
+    return {
+        'requests': len(samples),
+        'errors': sum(errors),
+        'requestsPerSec': round(len(samples) / elapsed, 1),
+        'p50Ms': percentile_ms(samples, 50),
+        'p95Ms': percentile_ms(samples, 95),
+        'p99Ms': percentile_ms(samples, 99),
+        'maxMs': round(max(samples) * 1000, 2) if samples else None,
+    }
+
+
+def run(args):
+    env = dict(os.environ)
+    # All benchmark clients share one address; see load_test.py
+    env.setdefault('SIAA_RATE_LIMITS', '')
+    if args.workers:
+        env['SIAA_WORKERS'] = str(args.workers)
+    if args.threads:
+        env['SIAA_THREADS'] = str(args.threads)
+
+    results = {'clients': args.clients, 'duration': args.duration, 'paths': args.paths, 'modes': {}}
+    for mode in args.modes:
+        process, url = start_server(mode, args.port, env)
+        try:
+            # Warm-up builds the lazy indexes / caches in every worker
+            drive(url, args.paths, args.clients, args.warmup, args.timeout)
+            result = drive(url, args.paths, args.clients, args.duration, args.timeout)
+        except BaseException:
+            process.kill()
+            raise
+        result['shutdownSeconds'] = stop_server(process)
+        results['modes'][mode] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare serving modes under concurrent load')
+    parser.add_argument('--modes', default='dev,gunicorn', type=lambda value: value.split(','))
+    parser.add_argument('--clients', type=int, default=32, help='concurrent keep-alive clients')
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds per mode')
+    parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds per mode')
+    parser.add_argument('--timeout', type=float, default=30, help='client request timeout')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--workers', type=int, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, help='gunicorn threads per worker')
+    parser.add_argument('--paths', default=DEFAULT_PATHS, type=lambda value: value.split(','),
+                        help='comma-separated request paths, cycled by every client')
+    parser.add_argument('--json', help='write results to this file')
+    args = parser.parse_args()
+
+    results = run(args)
+
+    print(f"{results['clients']} clients, {results['duration']}s per mode")
+    print(f"  {'mode':<9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'errors':>7} {'stop s':>7}")
+    for mode, row in results['modes'].items():
+        print(f"  {mode:<9} {row['requestsPerSec']:>8} {row['p50Ms']:>8} {row['p95Ms']:>8} "
+              f"{row['p99Ms']:>8} {row['maxMs']:>8} {row['errors']:>7} {row['shutdownSeconds']:>7}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,369 @@
+"""
+Load-test harness for the Si'aa API
+
+Drives a weighted mix of the main endpoints at one or more concurrency
+levels and records throughput and p50/p95/p99 latency per endpoint:
+
+    search   GET  /api/spaces/search with the filter mixes search.js sends
+                  (neighbourhood term, size band, price cap)
+    space    GET  /api/spaces/<id>
+    login    POST /api/login as a generated seeker
+    booking  POST /api/bookings for random spaces and future dates
+
+By default it generates a local SQLite stand-in (generate_sample_db.py),
+starts the backend on a fresh copy of it for every run, and tears it down
+afterwards. Results are written as JSON together with the git commit, so
+runs can be compared between commits:
+
+    python benchmarks/load_test.py run --spaces 10000 --concurrency 1,8,32 --duration 15
+    python benchmarks/load_test.py run --url http://localhost:5000 --concurrency 16
+    python benchmarks/load_test.py compare results/before.json results/after.json
+
+--url targets a server that is already running; bookings are skipped there
+unless --allow-writes is given.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_serving import MODES, start_server, stop_server  # noqa: E402
+
+DEFAULT_MIX = {'search': 60, 'space': 25, 'login': 10, 'booking': 5}
+
+# Values of the search.html form, mapped to query parameters as search.js does
+NEIGHBORHOODS = [
+    'al-salama', 'al-rawdah', 'al-nahda', 'al-andalus', 'al-hamra', 'al-rehab',
+    'al-faisaliyah', 'al-naeem', 'al-basateen', 'al-shati', 'al-safa',
+    'al-aziziyah', 'al-baghdadiyah', 'al-balad',
+]
+SIZE_BANDS = {
+    'small': ('1', '3'),
+    'medium': ('4', '7'),
+    'large': ('8', '12'),
+    'xl': ('12', '1000'),
+}
+PRICE_CAPS = ['300', '600', '1200', '2000', '5000']   # the form defaults to 1200
+
+# Statuses that are correct answers for generated requests (e.g. a booking
+# that conflicts); anything else counts as an error
+EXPECTED_STATUSES = {
+    'search': {200},
+    'space': {200, 404},
+    'login': {200},
+    'booking': {201, 400, 409},
+}
+
+
+# -----------------------------------------
+# Request generators
+# -----------------------------------------
+
+def search_params(rng):
+    """Query parameters for one search, with the mix search.js produces"""
+    params = {}
+    if rng.random() < 0.5:
+        params['city'] = 'Jeddah'
+        params['searchTerm'] = rng.choice(NEIGHBORHOODS)
+    band = rng.choice([None, *SIZE_BANDS])
+    if band:
+        params['minSize'], params['maxSize'] = SIZE_BANDS[band]
+    if rng.random() < 0.8:
+        params['maxPrice'] = rng.choice(PRICE_CAPS)
+    return params
+
+
+def make_request(kind, rng, space_count, seeker_count):
+    """(method, path, params, json body) for one request of `kind`"""
+    if kind == 'search':
+        return 'GET', '/api/spaces/search', search_params(rng), None
+    if kind == 'space':
+        return 'GET', f"/api/spaces/{rng.randint(1, space_count)}", None, None
+    if kind == 'login':
+        body = {'email': f"seeker{rng.randint(1, seeker_count)}@example.com", 'password': 'password123'}
+        return 'POST', '/api/login', None, body
+    start = date(2030, 1, 1) + timedelta(days=rng.randrange(5 * 365))
+    body = {
+        'seekerId': rng.randint(1, seeker_count),
+        'spaceId': rng.randint(1, space_count),
+        'startDate': start.isoformat(),
+        'endDate': (start + timedelta(days=rng.randint(7, 90))).isoformat(),
+        'totalAmount': 500,
+    }
+    return 'POST', '/api/bookings', None, body
+
+
+# -----------------------------------------
+# Load generation
+# -----------------------------------------
+
+def summarize(latencies, statuses, errors, elapsed):
+    samples = np.asarray(latencies) * 1000 if latencies else None
+
+    def pct(q):
+        return round(float(np.percentile(samples, q)), 2) if samples is not None else None
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requestsPerSec': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50Ms': pct(50),
+        'p95Ms': pct(95),
+        'p99Ms': pct(99),
+        'maxMs': round(float(samples.max()), 2) if samples is not None else None,
+        'statuses': dict(sorted(statuses.items())),
+    }
+
+
+def run_level(url, mix, concurrency, duration, space_count, seeker_count, timeout, seed):
+    """Closed-loop clients for `duration` seconds; per-endpoint results"""
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    results = {kind: ([], Counter(), [0]) for kind in kinds}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(n):
+        rng = random.Random(seed * 1000 + n)
+        session = requests.Session()
+        local = {kind: ([], Counter(), 0) for kind in kinds}
+        while time.perf_counter() < stop_at:
+            kind = rng.choices(kinds, weights)[0]
+            method, path, params, body = make_request(kind, rng, space_count, seeker_count)
+            latencies, statuses, errors = local[kind]
+            started = time.perf_counter()
+            try:
+                response = session.request(method, url + path, params=params, json=body, timeout=timeout)
+                response.content
+                status = response.status_code
+            except requests.RequestException:
+                status = 'failed'
+            elapsed = time.perf_counter() - started
+            statuses[str(status)] += 1
+            if status in EXPECTED_STATUSES[kind]:
+                latencies.append(elapsed)
+            else:
+                local[kind] = (latencies, statuses, errors + 1)
+        with lock:
+            for kind, (latencies, statuses, errors) in local.items():
+                results[kind][0].extend(latencies)
+                results[kind][1].update(statuses)
+                results[kind][2][0] += errors
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    endpoints = {
+        kind: summarize(latencies, statuses, errors[0], elapsed)
+        for kind, (latencies, statuses, errors) in results.items()
+    }
+    all_latencies = [sample for latencies, _, _ in results.values() for sample in latencies]
+    all_statuses = sum((statuses for _, statuses, _ in results.values()), Counter())
+    overall = summarize(all_latencies, all_statuses, sum(e[0] for _, _, e in results.values()), elapsed)
+    return {'concurrency': concurrency, 'seconds': round(elapsed, 2), **overall, 'endpoints': endpoints}
+
+
+# -----------------------------------------
+# Runs
+# -----------------------------------------
+
+def git_revision():
+    """(commit, has uncommitted changes) of the checkout, or (None, None)"""
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR,
+                                         stderr=subprocess.DEVNULL, text=True).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                             cwd=BACKEND_DIR, text=True).strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def prepare_database(path, spaces, seed):
+    """Generate the stand-in database once; runs work on copies of it"""
+    if not os.path.exists(path):
+        from generate_sample_db import generate
+        print(f"Generating {spaces:,} spaces into {path}...")
+        generate(path, spaces, seed=seed)
+    return path
+
+
+def run(args):
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, (args.mix or '').split(',')):
+        kind, weight = part.split('=')
+        if kind not in DEFAULT_MIX:
+            raise SystemExit(f"Unknown endpoint in --mix: {kind}")
+        mix[kind] = float(weight)
+    if args.url and not args.allow_writes and mix.get('booking'):
+        print("Skipping bookings against --url (pass --allow-writes to include them)")
+        mix['booking'] = 0
+    mix = {kind: weight for kind, weight in mix.items() if weight > 0}
+
+    process = workdir = None
+    if args.url:
+        url = args.url.rstrip('/')
+    else:
+        source = prepare_database(args.db or os.path.join(BACKEND_DIR, f"loadtest-{args.spaces}.db"),
+                                  args.spaces, args.seed)
+        # Bookings write to the database, so every run starts from a clean copy
+        workdir = tempfile.mkdtemp(prefix='siaa-load-')
+        database = os.path.join(workdir, 'siaa.db')
+        shutil.copy(source, database)
+        env = dict(os.environ, SIAA_DB_BACKEND='sqlite', SIAA_SQLITE_PATH=database)
+        # Every simulated user shares one address, so per-client rate limits
+        # would throttle the whole run
+        env.setdefault('SIAA_RATE_LIMITS', '')
+        if args.workers:
+            env['SIAA_WORKERS'] = str(args.workers)
+        process, url = start_server(args.server, args.port, env)
+
+    try:
+        health = requests.get(f"{url}/api/health", timeout=30).json()
+        space_count = args.space_count or health.get('spaces_count') or args.spaces
+        # generate_sample_db.py creates one seeker per two spaces
+        seeker_count = args.seeker_count or max(1, space_count // 2)
+
+        # Warm-up builds the lazy indexes and caches before anything is measured
+        run_level(url, mix, max(args.concurrency), args.warmup, space_count, seeker_count,
+                  args.timeout, args.seed)
+        levels = []
+        for concurrency in args.concurrency:
+            level = run_level(url, mix, concurrency, args.duration, space_count, seeker_count,
+                              args.timeout, args.seed)
+            levels.append(level)
+            print_level(level)
+    finally:
+        if process is not None:
+            stop_server(process)
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    commit, dirty = git_revision()
+    return {
+        'meta': {
+            'commit': commit,
+            'dirty': dirty,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'target': args.url or f"{args.server} (sqlite, {space_count:,} spaces)",
+            'mix': mix,
+            'duration': args.duration,
+            'seed': args.seed,
+        },
+        'levels': levels,
+    }
+
+
+def print_level(level):
+    print(f"\nconcurrency {level['concurrency']}: {level['requestsPerSec']} req/s, "
+          f"{level['errors']} errors")
+    print(f"  {'endpoint':<9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for kind, row in level['endpoints'].items():
+        print(f"  {kind:<9} {row['requestsPerSec']:>8} {row['p50Ms']!s:>8} {row['p95Ms']!s:>8} "
+              f"{row['p99Ms']!s:>8} {row['errors']:>7}")
+
+
+def compare(before_path, after_path):
+    """Print throughput / latency changes between two result files"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    def change(old, new):
+        if not old or new is None:
+            return ''
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    print(f"before: {before['meta']['commit']} ({before['meta']['timestamp']})")
+    print(f"after:  {after['meta']['commit']} ({after['meta']['timestamp']})")
+    old_levels = {level['concurrency']: level for level in before['levels']}
+    for level in after['levels']:
+        old_level = old_levels.get(level['concurrency'])
+        if old_level is None:
+            continue
+        print(f"\nconcurrency {level['concurrency']}")
+        print(f"  {'endpoint':<9} {'req/s':>18} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18}")
+        rows = [('all', old_level, level)] + [
+            (kind, old_level['endpoints'][kind], row)
+            for kind, row in level['endpoints'].items() if kind in old_level['endpoints']
+        ]
+        for kind, old, new in rows:
+            cells = [f"{new[key]!s:>9} {change(old[key], new[key]):>8}"
+                     for key in ('requestsPerSec', 'p50Ms', 'p95Ms', 'p99Ms')]
+            print(f"  {kind:<9} " + ' '.join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the Si\'aa API endpoints')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run a load test and save the results')
+    run_parser.add_argument('--url', help='test a running server instead of a local stand-in')
+    run_parser.add_argument('--allow-writes', action='store_true', help='send bookings to --url')
+    run_parser.add_argument('--server', choices=sorted(MODES), default='gunicorn',
+                            help='serving mode for the local stand-in')
+    run_parser.add_argument('--workers', type=int, help='gunicorn worker processes')
+    run_parser.add_argument('--db', help='stand-in SQLite database (generated if missing)')
+    run_parser.add_argument('--spaces', type=int, default=10_000, help='spaces in a generated stand-in')
+    run_parser.add_argument('--space-count', type=int, help='SpaceIDs to request (default: from /api/health)')
+    run_parser.add_argument('--seeker-count', type=int, help='seeker accounts to log in as')
+    run_parser.add_argument('--concurrency', default=[1, 8, 32],
+                            type=lambda value: [int(c) for c in value.split(',')])
+    run_parser.add_argument('--duration', type=float, default=15, help='measured seconds per level')
+    run_parser.add_argument('--warmup', type=float, default=5)
+    run_parser.add_argument('--mix', help='endpoint weights, e.g. search=60,space=25,login=10,booking=5')
+    run_parser.add_argument('--timeout', type=float, default=30, help='client request timeout')
+    run_parser.add_argument('--port', type=int, default=5056)
+    run_parser.add_argument('--seed', type=int, default=7)
+    run_parser.add_argument('--out', help='results file (default: benchmarks/results/load-<commit>-<time>.json)')
+
+    compare_parser = commands.add_parser('compare', help='compare two result files')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+
+    args = parser.parse_args()
+    if args.command == 'compare':
+        compare(args.before, args.after)
+        return
+
+    results = run(args)
+    out = args.out
+    if not out:
+        commit = (results['meta']['commit'] or 'nogit')[:10]
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        out = os.path.join(BENCH_DIR, 'results', f"load-{commit}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""
+Offline embedding build pipeline for storage listings
+
+Streams listings from the database (or the JSON seed) in chunks, encodes
+them in large batches across CPU cores, and writes the binary embedding
+store read by /api/spaces/match (see embedding_store.py).
+
+Runs are incremental: every stored row keeps a hash of the text it was
+embedded from, and only new spaces or spaces whose title/type/description
+changed are re-encoded. Encoded chunks are checkpointed under
+<out>.build/, so an interrupted run resumes where it stopped.
+
+    python build_embeddings.py --source db --out embeddings/spaces
+    python build_embeddings.py --source json --json storage_spaces.json --workers 4
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import time
+from multiprocessing import get_context
+
+import numpy as np
+
+import embedding_store
+
+MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+
+_worker_service = None
+
+
+def listing_text(title, space_type, description):
+    """Text a listing is embedded from"""
+    return '. '.join(part.strip() for part in (title, space_type, description) if part)
+
+
+def content_hash(text):
+    """64-bit hash of the embedded text, stored next to each vector"""
+    digest = hashlib.blake2b(f"{MODEL_NAME}\n{text}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+# -----------------------------------------
+# Sources: yield lists of (SpaceID, text)
+# -----------------------------------------
+
+def iter_db_chunks(chunk_size):
+    """Keyset scan of StorageSpaces, one short query per chunk"""
+    from app import repository, get_db_connection
+
+    conn = get_db_connection()
+    try:
+        after = 0
+        while True:
+            rows = repository.space_texts_after(conn, after, chunk_size)
+            if not rows:
+                break
+            yield [(int(row[0]), listing_text(row[1], row[2], row[3])) for row in rows]
+            after = rows[-1][0]
+    finally:
+        conn.close()
+
+
+def iter_json_chunks(path, chunk_size, id_field='space_id'):
+    """Listings from a JSON array or NDJSON file (IDs default to position)"""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.ndjson') or path.endswith('.jsonl'):
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            records = iter(json.load(f))
+
+        chunk = []
+        for position, space in enumerate(records, 1):
+            text = listing_text(space.get('title'), space.get('type'), space.get('description'))
+            chunk.append((int(space.get(id_field) or position), text))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+# -----------------------------------------
+# Encoding (runs in worker processes)
+# -----------------------------------------
+
+def _init_worker(threads_per_worker):
+    global _worker_service
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+    from embedding_service import EmbeddingService
+    _worker_service = EmbeddingService(MODEL_NAME)
+
+
+def _encode_chunk(task):
+    chunk_path, ids, texts, hashes, batch_size = task
+    vectors = _worker_service.encode_many(texts, batch_size=batch_size)
+    # Write then rename so a crash never leaves a truncated checkpoint
+    tmp_path = chunk_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, ids=np.asarray(ids, dtype=np.int64), vectors=vectors,
+                 hashes=np.asarray(hashes, dtype=np.uint64))
+    os.replace(tmp_path, chunk_path)
+    return len(ids)
+
+
+# -----------------------------------------
+# Pipeline
+# -----------------------------------------
+
+def _load_existing(prefix):
+    """{SpaceID: (hash, row)} and the matrix of the current store"""
+    if not embedding_store.exists(prefix):
+        return {}, None
+    store = embedding_store.EmbeddingStore(prefix)
+    hashes = store.hashes()
+    if hashes is None:
+        return {}, None
+    return {int(space_id): (int(h), row) for row, (space_id, h) in enumerate(zip(store.ids, hashes))}, store
+
+
+def _load_checkpoints(build_dir):
+    """{SpaceID: (hash, vector)} from chunks finished by an earlier run"""
+    done = {}
+    for path in sorted(glob.glob(os.path.join(build_dir, 'chunk-*.npz'))):
+        with np.load(path) as chunk:
+            for space_id, h, vector in zip(chunk['ids'], chunk['hashes'], chunk['vectors']):
+                done[int(space_id)] = (int(h), vector)
+    return done
+
+
+def build(chunks, out, workers=None, batch_size=256, float16=False):
+    """Encode what changed and rewrite the store; returns a summary dict"""
+    started = time.perf_counter()
+    build_dir = out + '.build'
+    os.makedirs(build_dir, exist_ok=True)
+
+    existing, store = _load_existing(out)
+    resumed = _load_checkpoints(build_dir)
+    # Number new chunks after any left behind (workers finish out of order)
+    next_chunk = 1 + max((int(os.path.basename(path)[6:12])
+                          for path in glob.glob(os.path.join(build_dir, 'chunk-*.npz'))), default=-1)
+
+    workers = workers or os.cpu_count() or 1
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    seen = {}          # SpaceID -> hash, in source order
+    tasks = []
+    reused = from_checkpoint = 0
+
+    for chunk in chunks:
+        ids, texts, hashes = [], [], []
+        for space_id, text in chunk:
+            h = content_hash(text)
+            seen[space_id] = h
+            if space_id in existing and existing[space_id][0] == h:
+                reused += 1
+            elif space_id in resumed and resumed[space_id][0] == h:
+                from_checkpoint += 1
+            else:
+                ids.append(space_id)
+                texts.append(text)
+                hashes.append(h)
+        if ids:
+            chunk_path = os.path.join(build_dir, f"chunk-{next_chunk:06d}.npz")
+            next_chunk += 1
+            tasks.append((chunk_path, ids, texts, hashes, batch_size))
+
+    encoded = 0
+    if tasks:
+        if workers == 1:
+            _init_worker(threads)
+            encoded = sum(_encode_chunk(task) for task in tasks)
+        else:
+            with get_context('spawn').Pool(workers, _init_worker, (threads,)) as pool:
+                for count in pool.imap_unordered(_encode_chunk, tasks):
+                    encoded += count
+                    print(f"  encoded {encoded:,} listings")
+
+    # Assemble the new store in SpaceID order; spaces gone from the source drop out
+    fresh = _load_checkpoints(build_dir)
+    ids = np.array(sorted(seen), dtype=np.int64)
+    dim = store.dim if store is not None else embedding_store.EMBEDDING_DIM
+    matrix = np.empty((len(ids), dim), dtype=np.float32)
+    for i, space_id in enumerate(ids.tolist()):
+        if space_id in fresh and fresh[space_id][0] == seen[space_id]:
+            matrix[i] = fresh[space_id][1]
+        else:
+            matrix[i] = store.matrix[existing[space_id][1]]
+    hashes = np.array([seen[space_id] for space_id in ids.tolist()], dtype=np.uint64)
+
+    embedding_store.save(out, ids, matrix, np.float16 if float16 else np.float32, hashes=hashes)
+    shutil.rmtree(build_dir, ignore_errors=True)
+
+    return {
+        'listings': len(ids),
+        'encoded': encoded,
+        'resumed': from_checkpoint,
+        'unchanged': reused,
+        'removed': len(set(existing) - set(seen)),
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or refresh the listing embedding store')
+    parser.add_argument('--source', choices=['db', 'json'], default='db')
+    parser.add_argument('--json', default='storage_spaces.json', help='JSON / NDJSON seed for --source json')
+    parser.add_argument('--out', default='embeddings/spaces', help='embedding store path prefix')
+    parser.add_argument('--chunk-size', type=int, default=2048, help='listings per checkpointed chunk')
+    parser.add_argument('--batch-size', type=int, default=256, help='texts per model call')
+    parser.add_argument('--workers', type=int, help='encoder processes (default: CPU count)')
+    parser.add_argument('--float16', action='store_true')
+    args = parser.parse_args()
+
+    if args.source == 'db':
+        chunks = iter_db_chunks(args.chunk_size)
+    else:
+        chunks = iter_json_chunks(args.json, args.chunk_size)
+
+    summary = build(chunks, args.out, args.workers, args.batch_size, args.float16)
+    print(f"✓ {summary['listings']:,} listings in {args.out}: "
+          f"{summary['encoded']:,} encoded, {summary['resumed']:,} resumed, "
+          f"{summary['unchanged']:,} unchanged, {summary['removed']:,} removed "
+          f"({summary['seconds']}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Validation for the bulk booking and listing endpoints
+
+POST /api/bookings/bulk and POST /api/spaces/bulk accept arrays of items.
+Each item is validated here in a single pass without touching the database;
+the endpoints then check what needs the database (spaces, providers,
+conflicts) with one query per batch and insert every valid item inside one
+transaction. Results are reported per item, in request order.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+
+# Largest batch accepted in one request
+BULK_MAX_ITEMS = 1000
+
+BookingItem = namedtuple('BookingItem', [
+    'seeker_id', 'space_id', 'start_dt', 'end_dt',
+    'rental_months', 'total_amount', 'platform_fee',
+])
+
+ListingItem = namedtuple('ListingItem', [
+    'provider_id', 'title', 'description', 'space_type', 'size',
+    'price_per_month', 'price_per_week', 'price_per_day', 'features',
+])
+
+# access_type values used by the listing form / init_sample_data.py
+ACCESS_TYPES = {
+    '24-7': '24/7 access',
+    'daytime': 'Daytime access',
+    'scheduled': 'Scheduled access',
+}
+
+
+class ItemError(ValueError):
+    """An item that cannot be ingested; the message is returned to the client"""
+
+
+def _decimal(value, name):
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise ItemError(f'{name} must be a number')
+    if not number.is_finite():
+        raise ItemError(f'{name} must be a number')
+    return number
+
+
+def _int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ItemError(f'{name} must be an integer')
+
+
+def _text(value, name, max_length=None):
+    """Stripped string value, or None when absent"""
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ItemError(f'{name} must be a string')
+    value = value.strip()
+    if max_length is not None and len(value) > max_length:
+        raise ItemError(f'{name} must be at most {max_length} characters')
+    return value
+
+
+def validate_items(items, validate):
+    """([(index, item)], {index: error}) for a list of request items"""
+    if not isinstance(items, list) or not items:
+        raise ValueError('Expected a non-empty array of items')
+    if len(items) > BULK_MAX_ITEMS:
+        raise ValueError(f'At most {BULK_MAX_ITEMS} items per request')
+
+    valid, errors = [], {}
+    for index, data in enumerate(items):
+        try:
+            if not isinstance(data, dict):
+                raise ItemError('Item must be an object')
+            valid.append((index, validate(data)))
+        except ItemError as e:
+            errors[index] = str(e)
+    return valid, errors
+
+
+def validate_booking(data):
+    """BookingItem from one bulk booking entry (same rules as create_booking)"""
+    if not all(data.get(field) for field in ('seekerId', 'spaceId', 'startDate', 'endDate')):
+        raise ItemError('Missing required fields')
+    if data.get('totalAmount') is None:
+        raise ItemError('totalAmount is required')
+
+    try:
+        start_dt = datetime.fromisoformat(data['startDate'])
+        end_dt = datetime.fromisoformat(data['endDate'])
+    except (TypeError, ValueError):
+        raise ItemError('Dates must be YYYY-MM-DD')
+    if end_dt < start_dt:
+        raise ItemError('End date must be after start date')
+
+    total = _decimal(data['totalAmount'], 'totalAmount')
+    if total < 0:
+        raise ItemError('totalAmount must not be negative')
+
+    diff_days = (end_dt - start_dt).days or 1
+    return BookingItem(
+        seeker_id=_int(data['seekerId'], 'seekerId'),
+        space_id=_int(data['spaceId'], 'spaceId'),
+        start_dt=start_dt,
+        end_dt=end_dt,
+        rental_months=(Decimal(diff_days) / Decimal(30)).quantize(Decimal('0.01')),
+        total_amount=total,
+        platform_fee=(total * Decimal('0.07')).quantize(Decimal('0.01')),
+    )
+
+
+def validate_listing(data, default_provider_id=None):
+    """ListingItem from one bulk listing entry
+
+    Accepts the listing form fields (title, type, size, price, description,
+    conditions, access_type) used by init_sample_data.py.
+    """
+    provider_id = data.get('providerId', default_provider_id)
+    if provider_id is None:
+        raise ItemError('providerId is required')
+
+    title = _text(data.get('title'), 'title', 200)
+    if not title:
+        raise ItemError('title is required')
+    space_type = _text(data.get('type'), 'type', 100)
+    if not space_type:
+        raise ItemError('type is required')
+    description = _text(data.get('description'), 'description')
+
+    size = _decimal(data.get('size'), 'size')
+    price = _decimal(data.get('price'), 'price')
+    if size <= 0 or price <= 0:
+        raise ItemError('size and price must be positive')
+
+    optional_prices = []
+    for field in ('pricePerWeek', 'pricePerDay'):
+        value = data.get(field)
+        optional_prices.append(_decimal(value, field) if value is not None else None)
+
+    conditions = data.get('conditions') or []
+    if not isinstance(conditions, list) or not all(isinstance(c, str) for c in conditions):
+        raise ItemError('conditions must be an array of strings')
+    conditions = {condition.lower() for condition in conditions}
+    climate = bool(conditions & {'temperature', 'climate'})
+    access_type = _text(data.get('access_type'), 'access_type')
+
+    # Ordered like repository.FEATURE_COLUMNS
+    features = (
+        'Controlled' if 'temperature' in conditions else None,
+        'Controlled' if 'humidity' in conditions else None,
+        int(climate),
+        int('secure' in conditions),
+        int('cctv' in conditions),
+        ACCESS_TYPES.get(access_type, access_type),
+        int('parking' in conditions),
+        int('loading' in conditions),
+        _text(data.get('items_type'), 'items_type'),
+    )
+
+    return ListingItem(
+        provider_id=_int(provider_id, 'providerId'),
+        title=title,
+        description=description,
+        space_type=space_type,
+        size=size,
+        price_per_month=price,
+        price_per_week=optional_prices[0],
+        price_per_day=optional_prices[1],
+        features=features,
+    )
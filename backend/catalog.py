@@ -0,0 +1,386 @@
+"""
+Columnar in-memory snapshot of the listing catalog
+
+Search and space detail read StorageSpaces joined with SpaceFeatures,
+StorageProviders and SpaceRatingSummary. That data changes far less often
+than it is read, so the snapshot keeps all of it in memory, one array per
+column:
+
+    numbers     float64 (Size, prices, AverageRating; NaN for NULL)
+    counts/ids  int64 (-1 for NULL)
+    flags       int8 (IsAvailable and the feature flags; -1 for NULL)
+    categories  int32 codes into an interned string table (SpaceType,
+                Status, Temperature, AccessType, ...)
+    text        object arrays (Title, Description)
+
+Provider display fields are stored once per provider, not once per space.
+
+Search filters become vectorized masks over those arrays, and results come
+back as rows in the SQL search shape, so the same row mappers serialize
+them. Space detail is answered from the same arrays.
+
+Refreshes are incremental. Every write to a space, its features, its
+rating summary or its provider's display fields moves StorageSpaces.
+ChangeVersion on (see Repository.create_change_version). A refresh re-reads
+only the rows above the version it was built at and produces a new snapshot,
+which callers swap in with a single assignment, so readers never see a
+half-applied update. Deleted spaces are only dropped by a full reload.
+
+    python catalog.py init     # add ChangeVersion, its index and triggers
+    python catalog.py stats    # load a snapshot and report its footprint
+"""
+
+import argparse
+import sys
+import time
+from decimal import Decimal
+
+import numpy as np
+
+
+# How each column of Repository.catalog_rows() is stored
+NUMBER_COLUMNS = {'Size', 'PricePerMonth', 'PricePerWeek', 'PricePerDay', 'AverageRating'}
+INT_COLUMNS = {
+    'SpaceID', 'FavoriteCount', 'FeatureID', 'ProviderID', 'ReviewCount',
+    'Rating1Count', 'Rating2Count', 'Rating3Count', 'Rating4Count', 'Rating5Count',
+}
+FLAG_COLUMNS = {
+    'IsAvailable', 'ClimateControlled', 'SecuritySystem', 'CCTVMonitored',
+    'ParkingAvailable', 'LoadingAssistance',
+}
+TEXT_COLUMNS = {'Title', 'Description'}
+PROVIDER_COLUMNS = ('ProviderName', 'ProviderPhone', 'ProviderEmail')
+# Every other column is a category
+
+# Columns of a search row, in the order of Repository._search_select()
+SEARCH_COLUMNS = [
+    'SpaceID', 'Title', 'Description', 'SpaceType', 'Size', 'PricePerMonth',
+    'PricePerWeek', 'PricePerDay', 'IsAvailable', 'Status', 'ProviderName',
+    'ProviderPhone', 'AverageRating', 'ReviewCount',
+]
+
+LOAD_CHUNK = 10_000
+
+
+class StringTable:
+    """Interned strings shared by successive snapshots; code 0 is NULL
+
+    Only ever appended to (by the thread refreshing the catalog), so
+    readers of older snapshots can keep resolving their codes.
+    """
+
+    def __init__(self):
+        self.values = [None]
+        self._codes = {}
+
+    def intern(self, value):
+        if value is None:
+            return 0
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code(self, value):
+        """Code of `value`, or None if no space has it"""
+        return self._codes.get(value)
+
+    def nbytes(self):
+        return (sys.getsizeof(self.values) + sys.getsizeof(self._codes)
+                + sum(sys.getsizeof(value) for value in self.values[1:]))
+
+
+def _output_converter(sample):
+    """Function restoring the driver's value type for a stored number / flag"""
+    if isinstance(sample, bool):
+        return bool
+    if isinstance(sample, Decimal):
+        places = max(-sample.as_tuple().exponent, 0)
+        return lambda value: Decimal(f"{value:.{places}f}")
+    if isinstance(sample, int):
+        return int
+    return None
+
+
+def _build_columns(columns, rows, strings):
+    """{column: array} and {ProviderID: display fields} for catalog rows"""
+    data = {}
+    samples = {}
+    for i, name in enumerate(columns):
+        values = [row[i] for row in rows]
+        if name in PROVIDER_COLUMNS:
+            continue
+        sample = next((value for value in values if value is not None), None)
+        if name in NUMBER_COLUMNS:
+            data[name] = np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+        elif name in INT_COLUMNS:
+            data[name] = np.array([-1 if v is None else v for v in values], dtype=np.int64)
+        elif name in FLAG_COLUMNS:
+            data[name] = np.array([-1 if v is None else int(v) for v in values], dtype=np.int8)
+        elif name in TEXT_COLUMNS:
+            data[name] = np.empty(len(values), dtype=object)
+            data[name][:] = values
+        else:
+            data[name] = np.array([strings.intern(v) for v in values], dtype=np.int32)
+        if sample is not None:
+            samples[name] = sample
+
+    provider_index = columns.index('ProviderID')
+    fields = [columns.index(name) for name in PROVIDER_COLUMNS]
+    providers = {row[provider_index]: tuple(row[i] for i in fields) for row in rows}
+    converters = {
+        name: _output_converter(sample) for name, sample in samples.items()
+        if name in NUMBER_COLUMNS or name in FLAG_COLUMNS
+    }
+    return data, providers, converters
+
+
+def _text_nbytes(data):
+    """Bytes held by the strings of the text columns"""
+    return sum(sys.getsizeof(value) for name in TEXT_COLUMNS for value in data[name] if value is not None)
+
+
+class CatalogSnapshot:
+    """Columnar copy of the catalog as of one ChangeVersion; the arrays are
+    never modified once built
+
+    columns    -- column names of Repository.catalog_rows() (detail order)
+    data       -- {column: array}, rows sorted by SpaceID
+    providers  -- {ProviderID: (ProviderName, ProviderPhone, ProviderEmail)}
+    """
+
+    def __init__(self, columns, data, providers, strings, converters, version, text_bytes):
+        self.columns = columns
+        self.data = data
+        self.providers = providers
+        self.strings = strings
+        self.converters = converters
+        self.version = version
+        self.built_at = time.monotonic()
+
+        self.space_ids = data['SpaceID']
+        status = strings.code('Active')
+        self.searchable = (data['IsAvailable'] == 1) & (data['Status'] == (status or -1))
+        # Search order is (PricePerMonth, SpaceID); NULL prices sort first, as in SQL
+        self.order = np.lexsort((self.space_ids, np.nan_to_num(data['PricePerMonth'], nan=-np.inf)))
+        self.text_bytes = text_bytes
+        self._nbytes = None
+        # SpaceIDs re-read by apply() to make this snapshot (None for a full load)
+        self.changed_ids = None
+
+    @classmethod
+    def build(cls, columns, chunks, version, strings=None):
+        """Snapshot from an iterable of row lists"""
+        columns = [name for name in columns if name != 'ChangeVersion']
+        strings = strings or StringTable()
+        parts, providers, converters = [], {}, {}
+        text_bytes = 0
+        for rows in chunks:
+            data, chunk_providers, chunk_converters = _build_columns(columns, rows, strings)
+            parts.append(data)
+            text_bytes += _text_nbytes(data)
+            providers.update(chunk_providers)
+            for name, converter in chunk_converters.items():
+                converters.setdefault(name, converter)
+        if parts:
+            data = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        else:
+            data, _, _ = _build_columns(columns, [], strings)
+        order = np.argsort(data['SpaceID'], kind='stable')
+        data = {name: values[order] for name, values in data.items()}
+        return cls(columns, data, providers, strings, converters, version, text_bytes)
+
+    def apply(self, rows, version):
+        """New snapshot with `rows` (changed spaces) replacing their old rows"""
+        # A trailing ChangeVersion column is ignored
+        changed, providers, converters = _build_columns(self.columns, rows, self.strings)
+        keep = ~np.isin(self.space_ids, changed['SpaceID'])
+        replaced = {name: self.data[name][~keep] for name in TEXT_COLUMNS}
+        data = {name: np.concatenate([self.data[name][keep], changed[name]]) for name in self.data}
+        order = np.argsort(data['SpaceID'], kind='stable')
+        data = {name: values[order] for name, values in data.items()}
+        snapshot = CatalogSnapshot(
+            self.columns, data, {**self.providers, **providers}, self.strings,
+            {**converters, **self.converters}, version,
+            self.text_bytes - _text_nbytes(replaced) + _text_nbytes(changed),
+        )
+        snapshot.changed_ids = changed['SpaceID']
+        return snapshot
+
+    def with_version(self, version):
+        """This snapshot, marked current as of `version` (nothing changed)"""
+        self.version = version
+        return self
+
+    def __len__(self):
+        return len(self.space_ids)
+
+    def age(self):
+        return time.monotonic() - self.built_at
+
+    # -----------------------------------------
+    # Queries
+    # -----------------------------------------
+
+    def _mask(self, filters, space_ids=None, exclude=None):
+        """Rows matching `filters` (search_term must already be resolved)"""
+        data = self.data
+        mask = self.searchable.copy()
+        if filters.space_type:
+            mask &= data['SpaceType'] == (self.strings.code(filters.space_type) or -1)
+        # NaN (NULL) fails every comparison, like NULL in SQL
+        if filters.min_price:
+            mask &= data['PricePerMonth'] >= filters.min_price
+        if filters.max_price:
+            mask &= data['PricePerMonth'] <= filters.max_price
+        if filters.min_size:
+            mask &= data['Size'] >= filters.min_size
+        if filters.max_size:
+            mask &= data['Size'] <= filters.max_size
+        if space_ids is not None:
+            mask &= np.isin(self.space_ids, np.asarray(space_ids, dtype=np.int64))
+        if exclude:
+            mask &= ~np.isin(self.space_ids, np.fromiter(exclude, dtype=np.int64, count=len(exclude)))
+        return mask
+
+    def search(self, filters, space_ids=None, exclude=None, limit=None, after=None):
+        """Row positions matching `filters` in (PricePerMonth, SpaceID) order
+
+        space_ids -- restrict to these SpaceIDs (text index candidates)
+        exclude   -- SpaceIDs to leave out (e.g. booked for the requested dates)
+        after     -- (PricePerMonth, SpaceID) keyset of the previous page
+        """
+        order = self.order
+        positions = order[self._mask(filters, space_ids, exclude)[order]]
+        if after is not None:
+            price = self.data['PricePerMonth'][positions]
+            after_price = float(after[0])
+            positions = positions[(price > after_price)
+                                  | ((price == after_price) & (self.space_ids[positions] > after[1]))]
+        if limit is not None:
+            positions = positions[:limit]
+        return positions
+
+    def count(self, filters, space_ids=None, exclude=None):
+        """Number of spaces matching `filters`"""
+        return int(np.count_nonzero(self._mask(filters, space_ids, exclude)))
+
+    def rows(self, positions, columns=SEARCH_COLUMNS):
+        """Rows (tuples of `columns`) at `positions`, with driver value types"""
+        return list(zip(*(self._column_values(name, positions) for name in columns)))
+
+    def detail(self, space_id):
+        """(columns, row) for one space in the space detail shape, or None"""
+        position = np.searchsorted(self.space_ids, space_id)
+        if position >= len(self.space_ids) or self.space_ids[position] != space_id:
+            return None
+        return self.columns, self.rows(np.array([position]), self.columns)[0]
+
+    def _column_values(self, name, positions):
+        if name in PROVIDER_COLUMNS:
+            field = PROVIDER_COLUMNS.index(name)
+            providers = self.providers
+            return [providers[provider_id][field]
+                    for provider_id in self.data['ProviderID'][positions].tolist()]
+
+        values = self.data[name][positions]
+        if name in TEXT_COLUMNS:
+            return values.tolist()
+        if name in NUMBER_COLUMNS:
+            if name == 'AverageRating':
+                # COALESCE(NULL, 0) when the space has no reviews
+                counts = self.data['ReviewCount'][positions]
+                return [value if count > 0 else 0 for value, count in zip(values.tolist(), counts.tolist())]
+            convert = self.converters.get(name)
+            return [None if value != value else (convert(value) if convert else value)
+                    for value in values.tolist()]
+        if name in INT_COLUMNS:
+            return [None if value < 0 else value for value in values.tolist()]
+        if name in FLAG_COLUMNS:
+            convert = self.converters.get(name) or int
+            return [None if value < 0 else convert(value) for value in values.tolist()]
+        strings = self.strings.values
+        return [strings[code] for code in values.tolist()]
+
+    # -----------------------------------------
+    # Footprint
+    # -----------------------------------------
+
+    def nbytes(self):
+        """Approximate memory held by this snapshot (computed once)"""
+        if self._nbytes is None:
+            total = sum(values.nbytes for values in self.data.values())
+            total += self.searchable.nbytes + self.order.nbytes + self.text_bytes
+            total += sys.getsizeof(self.providers) + sum(
+                sys.getsizeof(fields) + sum(sys.getsizeof(value) for value in fields)
+                for fields in self.providers.values()
+            )
+            total += self.strings.nbytes()
+            self._nbytes = total
+        return self._nbytes
+
+    def stats(self):
+        spaces = len(self)
+        nbytes = self.nbytes()
+        return {
+            'spaces': spaces,
+            'providers': len(self.providers),
+            'version': self.version,
+            'ageSeconds': round(self.age(), 1),
+            'bytes': nbytes,
+            'bytesPer10kSpaces': round(nbytes * 10_000 / spaces) if spaces else 0,
+        }
+
+
+def load(repository, conn, chunk_size=LOAD_CHUNK):
+    """Full snapshot of the catalog"""
+    # Read the version first: rows changed while scanning are re-read next refresh
+    version = repository.catalog_version(conn)
+    cursor = repository.catalog_rows(conn)
+    columns = [column[0] for column in cursor.description]
+    return CatalogSnapshot.build(columns, iter(lambda: cursor.fetchmany(chunk_size), []), version)
+
+
+def refresh(repository, conn, snapshot):
+    """Snapshot with every space changed since `snapshot` was built re-read
+
+    Returns `snapshot` itself when nothing changed.
+    """
+    version = repository.catalog_version(conn)
+    if version == snapshot.version:
+        return snapshot
+    rows = repository.catalog_rows(conn, snapshot.version).fetchall()
+    if not rows:
+        return snapshot.with_version(version)
+    return snapshot.apply(rows, version)
+
+
+def main():
+    # Imported here so the module stays usable without a configured app
+    from app import repository, get_db_connection
+
+    parser = argparse.ArgumentParser(description='Maintain and inspect the catalog snapshot')
+    parser.add_argument('command', choices=['init', 'stats'])
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        if args.command == 'init':
+            repository.create_change_version(conn)
+            print('✓ StorageSpaces.ChangeVersion, index and triggers ready')
+            return
+
+        started = time.perf_counter()
+        snapshot = load(repository, conn)
+        stats = snapshot.stats()
+        print(f"✓ Loaded {stats['spaces']:,} spaces ({stats['providers']:,} providers) "
+              f"in {time.perf_counter() - started:.1f}s")
+        print(f"  {stats['bytes'] / 2**20:.1f} MiB total, "
+              f"{stats['bytesPer10kSpaces'] / 2**20:.2f} MiB per 10k spaces")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Password hashing and login lookups for the Si'aa Flask backend
+
+Passwords are stored as salted PBKDF2-HMAC-SHA256 hashes:
+
+    pbkdf2_sha256$<iterations>$<salt>$<hash>      (salt and hash in base64)
+
+Older accounts (and accounts registered through server.js) hold an unsalted
+SHA-256 hex digest. Both verify. When a login succeeds against a legacy hash,
+or against fewer iterations than currently configured, the password is
+rehashed with the current settings so it can be stored in place.
+
+Hashing is deliberately slow. It runs in a small, bounded thread pool
+(hashlib releases the GIL while hashing), so a login storm queues for the
+hashing workers instead of occupying every request thread. Once the queue is
+full, further logins fail fast with HasherBusy.
+
+IdentityCache keeps recently resolved email -> account rows for a short TTL,
+so repeated logins skip the database lookup; the password is still verified
+every time.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+ALGORITHM = 'pbkdf2_sha256'
+SALT_BYTES = 16
+DEFAULT_ITERATIONS = 600_000
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue is full"""
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def hash_password(password, iterations=DEFAULT_ITERATIONS):
+    """Encoded PBKDF2 hash of `password` with a fresh salt"""
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+    return f"{ALGORITHM}${iterations}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def verify_password(password, stored, iterations=DEFAULT_ITERATIONS):
+    """(matches, needs rehash) for `password` against a stored hash"""
+    if not stored:
+        return False, False
+    if stored.startswith(ALGORITHM + '$'):
+        try:
+            _, rounds, salt, expected = stored.split('$')
+            rounds = int(rounds)
+            digest = hashlib.pbkdf2_hmac('sha256', password.encode(), _b64decode(salt), rounds)
+            expected = _b64decode(expected)
+        except ValueError:
+            return False, False
+        matches = hmac.compare_digest(digest, expected)
+        return matches, matches and rounds < iterations
+    # Legacy unsalted SHA-256 hex digest; compare_digest() only accepts ASCII str,
+    # so compare bytes
+    digest = hashlib.sha256(password.encode()).hexdigest()
+    matches = hmac.compare_digest(digest.encode(), stored.strip().lower().encode())
+    return matches, matches
+
+
+class PasswordHasher:
+    """Bounded thread pool for hashing and verifying passwords
+
+    iterations  -- PBKDF2 cost for new hashes; stored hashes with fewer are
+                   rehashed on their next successful login
+    workers     -- hashing threads (at most this many hashes run at once)
+    max_pending -- hashes running or queued before HasherBusy is raised
+    """
+
+    def __init__(self, iterations=DEFAULT_ITERATIONS, workers=2, max_pending=64):
+        self.iterations = iterations
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hasher')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        # Hashed once, on a hashing thread, for verifying unknown emails
+        self._dummy = self._pool.submit(hash_password, _b64encode(os.urandom(12)), iterations)
+        self._lock = threading.Lock()
+
+        self.verified = 0
+        self.failed = 0
+        self.upgraded = 0
+        self.rejected = 0
+
+    def verify(self, password, stored):
+        """(matches, new hash or None)
+
+        The new hash is set when the stored one should be upgraded. With
+        stored=None (unknown email) a dummy hash is checked, so unknown
+        accounts take as long to reject as wrong passwords.
+        """
+        if stored is None:
+            stored = self._dummy.result()
+        matches, new_hash = self._run(self._verify, password, stored)
+        with self._lock:
+            if matches:
+                self.verified += 1
+                self.upgraded += new_hash is not None
+            else:
+                self.failed += 1
+        return matches, new_hash
+
+    def hash(self, password):
+        """Encoded hash of `password` with the current settings"""
+        return self._run(hash_password, password, self.iterations)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'iterations': self.iterations,
+                'workers': self.workers,
+                'verified': self.verified,
+                'failed': self.failed,
+                'upgraded': self.upgraded,
+                'rejected': self.rejected,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+    def _verify(self, password, stored):
+        matches, needs_rehash = verify_password(password, stored, self.iterations)
+        if matches and needs_rehash:
+            return True, hash_password(password, self.iterations)
+        return matches, None
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy("Too many logins in progress")
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+
+class IdentityCache:
+    """Short-lived cache of email -> account row for successful lookups
+
+    It saves the email lookup across both account tables. The row must not
+    carry the password hash: callers read the hash by primary key on every
+    login, so a changed password takes effect at once. Unknown emails are
+    never cached, so a new registration can log in at once. Entries expire
+    after `ttl` seconds, and callers drop an entry when a password check
+    against it fails.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # email -> (expires_at, row)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, email):
+        """Cached row for `email`, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[email]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(email)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, email, row):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[email] = (time.monotonic() + self.ttl, row)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, email):
+        with self._lock:
+            self._entries.pop(email, None)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,243 @@
+"""
+Database connection pool for the Si'aa Flask backend
+
+Opening a pyodbc connection to Azure SQL costs a TCP + TLS + login handshake,
+so connections are kept open and handed out to requests instead.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out in time"""
+
+
+class _PooledEntry:
+    """A raw connection plus the bookkeeping the pool needs for recycling"""
+
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """Bounded pool of reusable DB-API connections
+
+    connect          -- zero-argument factory returning a new connection
+    size             -- maximum number of open connections
+    checkout_timeout -- seconds to wait for a free connection
+    max_lifetime     -- recycle connections older than this (seconds)
+    max_idle         -- recycle connections idle longer than this (seconds)
+    validate_query   -- statement run on checkout to detect dead connections
+    validate_after   -- only validate connections idle at least this long
+    """
+
+    def __init__(self, connect, size=10, checkout_timeout=5.0, max_lifetime=1800,
+                 max_idle=300, validate_query='SELECT 1', validate_after=5.0):
+        self._connect = connect
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.validate_query = validate_query
+        self.validate_after = validate_after
+
+        self._idle = deque()
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self._created = 0
+        self._recycled = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    # -----------------------------------------
+    # Checkout / checkin
+    # -----------------------------------------
+
+    def acquire(self, timeout=None):
+        """Check out a connection, blocking up to `timeout` seconds
+        (checkout_timeout when None; 0 does not wait at all)"""
+        if timeout is None:
+            timeout = self.checkout_timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        while True:
+            entry = None
+            create = False
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout('Connection pool is closed')
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._in_use < self.size:
+                        create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f'No database connection available after {timeout}s'
+                        )
+                    self._cond.wait(remaining)
+                # Reserve the slot before doing any I/O outside the lock
+                self._in_use += 1
+
+            if create:
+                try:
+                    entry = _PooledEntry(self._connect())
+                except Exception:
+                    self._release_slot()
+                    raise
+                with self._cond:
+                    self._created += 1
+            elif not self._is_usable(entry):
+                self._discard(entry)
+                self._release_slot()
+                continue
+
+            waited = time.monotonic() - start
+            with self._cond:
+                self._checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            return entry
+
+    def release(self, entry, broken=False):
+        """Return a connection to the pool, discarding it if broken"""
+        if not broken:
+            try:
+                # Never hand a half-finished transaction to the next request
+                entry.conn.rollback()
+            except Exception:
+                broken = True
+
+        with self._cond:
+            self._in_use -= 1
+            if broken or self._closed or self._expired(entry, time.monotonic()):
+                discard = True
+            else:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+                discard = False
+            self._cond.notify()
+
+        if discard:
+            self._discard(entry)
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a pooled connection
+
+        The connection always goes back to the pool, rolled back if the caller
+        did not commit.
+        """
+        entry = self.acquire()
+        broken = False
+        try:
+            yield entry.conn
+        except Exception as e:
+            broken = self.is_disconnect(e)
+            raise
+        finally:
+            self.release(entry, broken=broken)
+
+    # -----------------------------------------
+    # Maintenance
+    # -----------------------------------------
+
+    def prune(self):
+        """Close idle connections past their lifetime or idle limit"""
+        now = time.monotonic()
+        with self._cond:
+            keep, stale = deque(), []
+            for entry in self._idle:
+                (stale if self._expired(entry, now) else keep).append(entry)
+            self._idle = keep
+        for entry in stale:
+            self._discard(entry)
+        return len(stale)
+
+    def close(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._cond.notify_all()
+        for entry in idle:
+            self._discard(entry)
+
+    def stats(self):
+        """Snapshot of pool usage for health checks and metrics"""
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                'size': self.size,
+                'inUse': self._in_use,
+                'idle': len(self._idle),
+                'created': self._created,
+                'recycled': self._recycled,
+                'checkouts': checkouts,
+                'timeouts': self._timeouts,
+                'waitTimeTotalMs': round(self._wait_total * 1000, 3),
+                'waitTimeAvgMs': round(self._wait_total * 1000 / checkouts, 3) if checkouts else 0.0,
+                'waitTimeMaxMs': round(self._wait_max * 1000, 3),
+            }
+
+    # -----------------------------------------
+    # Helpers
+    # -----------------------------------------
+
+    def _expired(self, entry, now):
+        if self.max_lifetime and now - entry.created_at > self.max_lifetime:
+            return True
+        if self.max_idle and now - entry.last_used > self.max_idle:
+            return True
+        return False
+
+    def _is_usable(self, entry):
+        now = time.monotonic()
+        if self._expired(entry, now):
+            return False
+        if self.validate_query and now - entry.last_used >= self.validate_after:
+            try:
+                cursor = entry.conn.cursor()
+                cursor.execute(self.validate_query)
+                cursor.fetchall()
+                cursor.close()
+            except Exception:
+                return False
+        return True
+
+    def _release_slot(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def _discard(self, entry):
+        with self._cond:
+            self._recycled += 1
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def is_disconnect(error):
+        """Best-effort check for errors that leave the connection unusable"""
+        # pyodbc reports SQLSTATE 08xxx for communication link failures
+        state = error.args[0] if getattr(error, 'args', None) else ''
+        return isinstance(state, str) and state.startswith('08')
@@ -0,0 +1,130 @@
+"""
+Read/write routing between the primary database and read replicas
+
+Writes, and reads that must see them, check out from the primary pool. Read-
+only work (search, space detail, index loads) is spread round-robin over the
+replica pools, so it stops competing with booking transactions.
+
+A replica that fails to connect, or drops a connection mid-query, is taken
+out of rotation for `retry_after` seconds; the next request after that tries
+it again. Reads fall through to the next replica, and to the primary when
+none is left. A replica whose pool is merely exhausted is skipped for that
+request but stays healthy. Replica checkouts only wait `replica_wait`
+seconds, so a busy replica costs a read a short delay rather than the full
+checkout timeout; the primary fallback waits as long as any other checkout.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+class _Replica:
+    """A replica's pool plus its health bookkeeping"""
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.down_until = 0.0
+        self.failures = 0
+        self.routed = 0
+        self.last_error = None
+
+
+class DatabaseRouter:
+    """Hands out primary or replica connections
+
+    primary     -- ConnectionPool of the primary (all writes)
+    replicas    -- [(name, ConnectionPool)] of read replicas; may be empty
+    retry_after -- seconds an unhealthy replica is left out of rotation
+    replica_wait -- seconds to wait for a busy replica pool before trying
+                    the next replica (0 does not wait)
+    """
+
+    def __init__(self, primary, replicas=(), retry_after=30.0, replica_wait=0.05):
+        self.primary = primary
+        self.replicas = [_Replica(name, pool) for name, pool in replicas]
+        self.retry_after = retry_after
+        self.replica_wait = replica_wait
+        self._next = 0
+        self._lock = threading.Lock()
+
+        self.primary_reads = 0      # read-only checkouts served by the primary
+        self.fallbacks = 0          # ... of which because no replica was usable
+
+    @contextmanager
+    def connection(self, read_only=False, fresh=False):
+        """Context manager yielding a connection; a replica's when `read_only`
+
+        fresh -- the read must see the latest writes, so use the primary
+        """
+        if read_only and not fresh and self.replicas:
+            for replica in self._rotation():
+                try:
+                    entry = replica.pool.acquire(timeout=self.replica_wait)
+                except Exception as e:
+                    # Busy replicas are skipped, unreachable ones also marked down
+                    self._failed(replica, e, down=not isinstance(e, PoolTimeout))
+                    continue
+                with self._lock:
+                    replica.routed += 1
+                broken = False
+                try:
+                    yield entry.conn
+                except Exception as e:
+                    broken = ConnectionPool.is_disconnect(e)
+                    if broken:
+                        self._failed(replica, e, down=True)
+                    raise
+                finally:
+                    replica.pool.release(entry, broken=broken)
+                return
+            with self._lock:
+                self.fallbacks += 1
+        if read_only:
+            with self._lock:
+                self.primary_reads += 1
+        with self.primary.connection() as conn:
+            yield conn
+
+    def close(self):
+        self.primary.close()
+        for replica in self.replicas:
+            replica.pool.close()
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            replicas = [{
+                'name': replica.name,
+                'healthy': replica.down_until <= now,
+                'routed': replica.routed,
+                'failures': replica.failures,
+                'lastError': replica.last_error,
+                'pool': replica.pool.stats(),
+            } for replica in self.replicas]
+            return {
+                'primaryReads': self.primary_reads,
+                'fallbacks': self.fallbacks,
+                'replicas': replicas,
+            }
+
+    def _rotation(self):
+        """Healthy replicas, starting from the next one in round-robin order"""
+        now = time.monotonic()
+        with self._lock:
+            start = self._next
+            self._next = (start + 1) % len(self.replicas)
+        ordered = self.replicas[start:] + self.replicas[:start]
+        return [replica for replica in ordered if replica.down_until <= now]
+
+    def _failed(self, replica, error, down):
+        with self._lock:
+            replica.failures += 1
+            replica.last_error = f"{type(error).__name__}: {error}"
+            if down:
+                replica.down_until = time.monotonic() + self.retry_after
+        if down:
+            print(f"Replica {replica.name} unavailable for {self.retry_after}s: {error}")
@@ -0,0 +1,196 @@
+"""
+Batched query-embedding service
+
+Loads the sentence-transformers model lazily (or in an explicit warm-up step
+outside the request path), micro-batches concurrent encode requests arriving
+within a short window into one model call, and memoizes embeddings of
+repeated query texts in a bounded LRU cache. search.js mostly sends a handful
+of templated phrases, so the cache absorbs most of the inference cost.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+from metrics import Histogram
+
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class EmbeddingService:
+    """Thread-safe, micro-batching, caching wrapper around a text encoder
+
+    model_name   -- sentence-transformers model, loaded on first use
+    max_batch    -- largest batch passed to the model in one call
+    batch_window -- seconds to wait for more requests before encoding
+    cache_size   -- query texts kept in the LRU cache
+    loader       -- optional factory returning an object with .encode(list)
+    """
+
+    def __init__(self, model_name, max_batch=32, batch_window=0.005, cache_size=4096, loader=None):
+        self.model_name = model_name
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.cache_size = cache_size
+        self._loader = loader or self._load_sentence_transformer
+
+        self._model = None
+        self._model_lock = threading.Lock()
+
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        self._pending = []       # [(text, Future)]
+        self._inflight = {}      # text -> Future, so duplicates share one encode
+        self._queue_cond = threading.Condition()
+        self._worker = None
+
+        self._stats_lock = threading.Lock()
+        self.encode_latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.load_seconds = None
+
+    # -----------------------------------------
+    # Model lifecycle
+    # -----------------------------------------
+
+    def _load_sentence_transformer(self):
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(self.model_name)
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def warm_up(self):
+        """Load the model and run one encode so the first request pays nothing"""
+        self._get_model().encode(['warm up'])
+        return self
+
+    def _get_model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    started = time.perf_counter()
+                    self._model = self._loader()
+                    self.load_seconds = round(time.perf_counter() - started, 3)
+        return self._model
+
+    # -----------------------------------------
+    # Encoding
+    # -----------------------------------------
+
+    def encode(self, text, timeout=30.0):
+        """Embedding for one query text (float32 vector)"""
+        key = ' '.join(text.split()).lower()
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        with self._queue_cond:
+            future = self._inflight.get(key)
+            if future is None:
+                # It may have finished between the cache check and here
+                with self._cache_lock:
+                    cached = self._cache.get(key)
+                if cached is not None:
+                    return cached
+                future = Future()
+                self._inflight[key] = future
+                self._pending.append((key, future))
+                self._ensure_worker()
+                self._queue_cond.notify()
+        return future.result(timeout)
+
+    def encode_many(self, texts, batch_size=None):
+        """Encode a list directly in large batches (offline pipelines; no cache)"""
+        model = self._get_model()
+        vectors = model.encode(list(texts), batch_size=batch_size or self.max_batch)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            with self._queue_cond:
+                while not self._pending:
+                    self._queue_cond.wait()
+                # Give concurrent requests a moment to join this batch
+                deadline = time.monotonic() + self.batch_window
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._queue_cond.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+
+            texts = [text for text, _ in batch]
+            try:
+                started = time.perf_counter()
+                vectors = np.asarray(self._get_model().encode(texts), dtype=np.float32)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with self._stats_lock:
+                    self.encode_latency_ms.observe(elapsed_ms)
+                    self.batch_sizes.observe(len(batch))
+                for (text, future), vector in zip(batch, vectors):
+                    self._cache_put(text, vector)
+                    future.set_result(vector)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            finally:
+                with self._queue_cond:
+                    for text in texts:
+                        self._inflight.pop(text, None)
+
+    # -----------------------------------------
+    # Cache
+    # -----------------------------------------
+
+    def _cache_get(self, key):
+        with self._cache_lock:
+            vector = self._cache.get(key)
+            if vector is None:
+                self.cache_misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return vector
+
+    def _cache_put(self, key, vector):
+        vector.setflags(write=False)
+        with self._cache_lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def stats(self):
+        with self._cache_lock:
+            cache = {
+                'entries': len(self._cache),
+                'maxEntries': self.cache_size,
+                'hits': self.cache_hits,
+                'misses': self.cache_misses,
+            }
+        with self._stats_lock:
+            return {
+                'model': self.model_name,
+                'loaded': self.loaded,
+                'loadSeconds': self.load_seconds,
+                'cache': cache,
+                'encodeLatencyMs': self.encode_latency_ms.snapshot(),
+                'batchSize': self.batch_sizes.snapshot(),
+            }
@@ -0,0 +1,195 @@
+"""
+Binary, memory-mappable store of space embeddings
+
+storage_spaces.json keeps each 384-d embedding as a JSON list of floats, which
+is slow to parse and impossible to score without a Python loop. The store
+keeps one contiguous matrix instead:
+
+    <prefix>.v<N>/matrix.npy  float32 / float16 matrix, one L2-normalized row per space
+    <prefix>.v<N>/ids.npy     int64 SpaceIDs, row-aligned with the matrix
+    <prefix>.v<N>/hashes.npy  optional uint64 content hashes (build_embeddings.py)
+    <prefix>.current          name of the version directory readers open
+
+Every save writes a new version directory and then replaces the pointer
+file, so a reader always gets a matrix and IDs from the same save. The
+previous version is kept for readers that still have it open. Stores
+written before versioning (<prefix>.npy and <prefix>.ids.npy) still load.
+
+The files are opened with mmap, so workers share the pages through the OS
+cache, and cosine similarity is a single matrix-vector product.
+
+    python embedding_store.py build --json storage_spaces.json --out embeddings/spaces
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+
+EMBEDDING_DIM = 384
+
+
+def _pointer_path(prefix):
+    return f"{prefix}.current"
+
+
+def _paths(prefix):
+    """(matrix, ids, hashes) paths of the current version"""
+    try:
+        with open(_pointer_path(prefix), encoding='utf-8') as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        # Unversioned store
+        return f"{prefix}.npy", f"{prefix}.ids.npy", f"{prefix}.hashes.npy"
+    directory = os.path.join(os.path.dirname(os.path.abspath(prefix)), version)
+    return tuple(os.path.join(directory, name) for name in ('matrix.npy', 'ids.npy', 'hashes.npy'))
+
+
+def normalize_rows(vectors):
+    """L2-normalize rows so a dot product equals cosine similarity"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def save(prefix, ids, vectors, dtype=np.float32, hashes=None):
+    """Write a new version of the store and switch readers to it in one step"""
+    matrix = np.ascontiguousarray(normalize_rows(vectors), dtype=dtype).reshape(len(ids), -1)
+    ids = np.ascontiguousarray(ids, dtype=np.int64)
+    if len(ids) != len(matrix) or (hashes is not None and len(hashes) != len(ids)):
+        raise ValueError('ids, vectors and hashes must have the same length')
+
+    parent = os.path.dirname(os.path.abspath(prefix))
+    version = f"{os.path.basename(prefix)}.v{time.time_ns()}"
+    directory = os.path.join(parent, version)
+    os.makedirs(directory)
+    arrays = [('matrix.npy', matrix), ('ids.npy', ids)]
+    if hashes is not None:
+        arrays.append(('hashes.npy', np.ascontiguousarray(hashes, dtype=np.uint64)))
+    for name, array in arrays:
+        with open(os.path.join(directory, name), 'wb') as f:
+            np.save(f, array)
+
+    pointer = _pointer_path(prefix)
+    with open(pointer + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(pointer + '.tmp', pointer)
+    _prune(prefix, keep=2)
+
+
+def _prune(prefix, keep):
+    """Delete all but the newest `keep` versions, and an unversioned store"""
+    versions = sorted(glob.glob(f"{glob.escape(prefix)}.v[0-9]*"))
+    for path in versions[:-keep]:
+        shutil.rmtree(path, ignore_errors=True)
+    for path in (f"{prefix}.npy", f"{prefix}.ids.npy", f"{prefix}.hashes.npy"):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def exists(prefix):
+    return all(os.path.exists(path) for path in _paths(prefix)[:2])
+
+
+def load_hashes(prefix):
+    """Content hashes saved with the current version of the store, or None"""
+    return EmbeddingStore(prefix).hashes() if exists(prefix) else None
+
+
+class EmbeddingStore:
+    """Read-only view over a saved embedding matrix"""
+
+    def __init__(self, prefix):
+        matrix_path, ids_path, self._hashes_path = _paths(prefix)
+        self.prefix = prefix
+        self.matrix = np.load(matrix_path, mmap_mode='r')
+        self.ids = np.load(ids_path, mmap_mode='r')
+        if len(self.ids) != len(self.matrix):
+            raise ValueError(f"Embedding store {prefix}: {len(self.matrix)} rows "
+                             f"but {len(self.ids)} SpaceIDs")
+        self._row_of = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self):
+        return self.matrix.shape[1]
+
+    def hashes(self):
+        """Content hashes saved with this version, or None"""
+        if not os.path.exists(self._hashes_path):
+            return None
+        hashes = np.load(self._hashes_path)
+        if len(hashes) != len(self.ids):
+            raise ValueError(f"Embedding store {self.prefix}: hashes do not match the SpaceIDs")
+        return hashes
+
+    def row_of(self, space_id):
+        """Matrix row for a SpaceID, or None"""
+        if self._row_of is None:
+            self._row_of = {int(space_id): row for row, space_id in enumerate(self.ids)}
+        return self._row_of.get(int(space_id))
+
+    def scores(self, query_vector):
+        """Cosine similarity of every stored space to `query_vector`"""
+        query = normalize_rows(query_vector).astype(self.matrix.dtype, copy=False)
+        return np.asarray(self.matrix @ query, dtype=np.float32)
+
+    def top_k(self, query_vector, k=10, mask=None):
+        """[(SpaceID, score)] best first; `mask` limits the candidate rows"""
+        scores = self.scores(query_vector)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        # argpartition is O(N); only the k winners get sorted
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[row]), float(scores[row])) for row in top if np.isfinite(scores[row])]
+
+
+def load_json_embeddings(json_path, id_field='space_id'):
+    """(ids, vectors) from a storage_spaces.json-style file
+
+    Entries without `id_field` get their 1-based position, matching the order
+    init_sample_data.py inserts them in.
+    """
+    with open(json_path, encoding='utf-8') as f:
+        spaces = json.load(f)
+
+    ids, vectors = [], []
+    for position, space in enumerate(spaces, 1):
+        if not space.get('embedding'):
+            continue
+        ids.append(int(space.get(id_field) or position))
+        vectors.append(space['embedding'])
+    return np.array(ids, dtype=np.int64), np.array(vectors, dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the binary embedding store')
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--json', default='storage_spaces.json', help='source JSON with embeddings')
+    parser.add_argument('--out', default='embeddings/spaces', help='output path prefix')
+    parser.add_argument('--id-field', default='space_id')
+    parser.add_argument('--float16', action='store_true', help='halve the size on disk')
+    args = parser.parse_args()
+
+    ids, vectors = load_json_embeddings(args.json, args.id_field)
+    save(args.out, ids, vectors, np.float16 if args.float16 else np.float32)
+    matrix_path = _paths(args.out)[0]
+    print(f"✓ Wrote {len(ids)} embeddings to {matrix_path} ({os.path.getsize(matrix_path):,} bytes)")
+
+
+if __name__ == '__main__':
+    main()
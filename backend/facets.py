@@ -0,0 +1,302 @@
+"""
+Facet counts for the search page
+
+search.js filters by neighbourhood, a fixed size band and a price cap. This
+index keeps, for every facet value, a bitset of the spaces that have it:
+
+    spaceType     one bitset per SpaceType
+    sizeBand      small / medium / large / xl (search.js size bands)
+    neighborhood  one per neighbourhood of the search form, matched in the
+                  listing text the same way the text index matches searchTerm
+    price         PricePerMonth buckets
+
+plus a bitset of the spaces that can be booked at all (IsAvailable and
+Active). Bitsets are NumPy uint64 words indexed by SpaceID, so the counts
+for any filter combination are a few ANDs and popcounts, with no query.
+
+Counts for a facet ignore that facet's own filter, so choosing a size band
+still shows how many spaces the other bands would give.
+
+The index is built from the catalog snapshot (catalog.py) and updated in
+place for the spaces each snapshot refresh re-reads.
+"""
+
+import threading
+
+import numpy as np
+
+from text_index import index_terms, query_terms
+
+
+# search.js size bands (minSize, maxSize), both inclusive like the SQL filter
+SIZE_BANDS = {
+    'small': (1, 3),
+    'medium': (4, 7),
+    'large': (8, 12),
+    'xl': (12, 1000),
+}
+
+# Neighbourhoods of the search form (values sent as searchTerm)
+NEIGHBORHOODS = [
+    'al-salama', 'al-rawdah', 'al-nahda', 'al-andalus', 'al-hamra', 'al-rehab',
+    'al-faisaliyah', 'al-naeem', 'al-basateen', 'al-shati', 'al-safa',
+    'al-aziziyah', 'al-baghdadiyah', 'al-balad',
+]
+
+# PricePerMonth bucket edges (SAR); bucket i holds edges[i] <= price < edges[i + 1]
+PRICE_EDGES = (0, 100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000)
+
+
+if hasattr(np, 'bitwise_count'):
+    def _popcount(words):
+        return int(np.bitwise_count(words).sum())
+else:
+    _BYTE_COUNTS = np.array([bin(n).count('1') for n in range(256)], dtype=np.uint8)
+
+    def _popcount(words):
+        return int(_BYTE_COUNTS[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+def _pack(mask, words):
+    """Bitset (`words` uint64 words) of a boolean array indexed by SpaceID"""
+    packed = np.zeros(words * 8, dtype=np.uint8)
+    bits = np.packbits(mask, bitorder='little')
+    packed[:len(bits)] = bits
+    return packed.view(np.uint64)
+
+
+def _neighborhood_matcher(slug):
+    """Predicate on a listing's index terms: does it mention `slug`?
+
+    Mirrors TextIndex.search(): every term must match, the last as a prefix.
+    """
+    *exact, last = query_terms(slug)
+    return lambda terms: all(term in terms for term in exact) and any(
+        term.startswith(last) for term in terms
+    )
+
+
+_MATCHERS = {slug: _neighborhood_matcher(slug) for slug in NEIGHBORHOODS}
+
+
+def listing_neighborhoods(title, description):
+    """Neighbourhood slugs a listing's text matches"""
+    terms = set(index_terms(f"{title or ''} {description or ''}"))
+    return [slug for slug, matches in _MATCHERS.items() if matches(terms)]
+
+
+class FacetIndex:
+    """Bitsets per facet value over SpaceIDs; see the module docstring"""
+
+    def __init__(self, capacity=0):
+        self._lock = threading.Lock()
+        self._words = 0
+        self.live = None
+        self.space_types = {}
+        self.size_bands = {}
+        self.neighborhoods = {}
+        self.price_buckets = []
+        self.prices = np.empty(0)
+        self.sizes = np.empty(0)
+        self._grow(capacity)
+
+    @classmethod
+    def build(cls, snapshot, text_index=None):
+        """Index over every space in a catalog snapshot
+
+        With a TextIndex the neighbourhood bitsets come from its postings
+        instead of re-tokenizing every listing.
+        """
+        index = cls(int(snapshot.space_ids[-1]) + 1 if len(snapshot) else 0)
+        index._set_rows(snapshot, np.arange(len(snapshot)), text=text_index is None)
+        if text_index is not None:
+            for slug, bits in index.neighborhoods.items():
+                ids = text_index.search(slug)
+                if ids is not None:
+                    index._set(bits, index._in_range(ids))
+        return index
+
+    def update(self, snapshot, space_ids):
+        """Re-index `space_ids` from `snapshot` (a refreshed catalog)"""
+        space_ids = np.asarray(space_ids, dtype=np.int64)
+        if not len(space_ids):
+            return
+        positions = np.searchsorted(snapshot.space_ids, space_ids)
+        positions = positions[positions < len(snapshot)]
+        positions = positions[np.isin(snapshot.space_ids[positions], space_ids)]
+        with self._lock:
+            self._grow(int(space_ids.max()) + 1)
+            self._clear(space_ids)
+            self._set_rows(snapshot, positions)
+
+    # -----------------------------------------
+    # Counting
+    # -----------------------------------------
+
+    def counts(self, filters, space_ids=None, exclude=None, neighborhood=None):
+        """Facet counts for spaces matching `filters`
+
+        space_ids    -- only these SpaceIDs (text index candidates)
+        exclude      -- leave these SpaceIDs out (e.g. booked on the dates)
+        neighborhood -- slug the search is restricted to, counted as a facet
+        """
+        with self._lock:
+            common = self.live.copy()
+            if space_ids is not None:
+                common &= self._from_ids(space_ids)
+            if exclude:
+                common &= ~self._from_ids(exclude)
+
+            by_facet = {}
+            if filters.space_type:
+                by_facet['spaceType'] = self.space_types.get(filters.space_type, self._empty())
+            if filters.min_size or filters.max_size:
+                by_facet['sizeBand'] = self._range(self.sizes, filters.min_size, filters.max_size)
+            if filters.min_price or filters.max_price:
+                by_facet['price'] = self._range(self.prices, filters.min_price, filters.max_price)
+            if neighborhood:
+                by_facet['neighborhood'] = self.neighborhoods.get(neighborhood, self._empty())
+
+            def base(facet):
+                words = common.copy()
+                for name, bits in by_facet.items():
+                    if name != facet:
+                        words &= bits
+                return words
+
+            def count_each(facet, bitsets):
+                words = base(facet)
+                return {key: _popcount(words & bits) for key, bits in bitsets}
+
+            types = count_each('spaceType', sorted(self.space_types.items()))
+            prices = count_each('price', enumerate(self.price_buckets))
+            return {
+                'total': _popcount(base(None)),
+                'spaceType': {name: count for name, count in types.items() if count},
+                'sizeBand': count_each('sizeBand', self.size_bands.items()),
+                'neighborhood': count_each('neighborhood', self.neighborhoods.items()),
+                'price': [
+                    {'min': PRICE_EDGES[i],
+                     'max': PRICE_EDGES[i + 1] if i + 1 < len(PRICE_EDGES) else None,
+                     'count': prices[i]}
+                    for i in range(len(PRICE_EDGES))
+                ],
+            }
+
+    def stats(self):
+        with self._lock:
+            bitsets = (1 + len(self.space_types) + len(self.size_bands)
+                       + len(self.neighborhoods) + len(self.price_buckets))
+            return {
+                'spaces': _popcount(self.live),
+                'bitsets': bitsets,
+                'bytes': bitsets * self._words * 8 + self.prices.nbytes + self.sizes.nbytes,
+            }
+
+    # -----------------------------------------
+    # Maintenance
+    # -----------------------------------------
+
+    def _empty(self):
+        return np.zeros(self._words, dtype=np.uint64)
+
+    def _bitsets(self):
+        return ([self.live], self.space_types.values(), self.size_bands.values(),
+                self.neighborhoods.values(), self.price_buckets)
+
+    def _grow(self, capacity):
+        """Make room for SpaceIDs below `capacity`"""
+        words = (capacity + 63) // 64
+        if words <= self._words:
+            return
+        # Grow geometrically so appended listings rarely reallocate
+        words = max(words, self._words * 3 // 2)
+
+        def grown(bits):
+            new = np.zeros(words, dtype=np.uint64)
+            if bits is not None:
+                new[:len(bits)] = bits
+            return new
+
+        self.live = grown(self.live)
+        self.space_types = {name: grown(bits) for name, bits in self.space_types.items()}
+        self.size_bands = {band: grown(self.size_bands.get(band)) for band in SIZE_BANDS}
+        self.neighborhoods = {slug: grown(self.neighborhoods.get(slug)) for slug in NEIGHBORHOODS}
+        self.price_buckets = [
+            grown(self.price_buckets[i] if i < len(self.price_buckets) else None)
+            for i in range(len(PRICE_EDGES))
+        ]
+        self.prices = np.concatenate([self.prices, np.full(words * 64 - len(self.prices), np.nan)])
+        self.sizes = np.concatenate([self.sizes, np.full(words * 64 - len(self.sizes), np.nan)])
+        self._words = words
+
+    def _clear(self, space_ids):
+        mask = ~self._from_ids(space_ids)
+        for group in self._bitsets():
+            for bits in group:
+                bits &= mask
+        self.prices[space_ids] = np.nan
+        self.sizes[space_ids] = np.nan
+
+    def _set_rows(self, snapshot, positions, text=True):
+        """Set the bits of the snapshot rows at `positions`"""
+        data = snapshot.data
+        ids = snapshot.space_ids[positions]
+        prices = data['PricePerMonth'][positions]
+        sizes = data['Size'][positions]
+        self.prices[ids] = prices
+        self.sizes[ids] = sizes
+
+        self._set(self.live, ids[snapshot.searchable[positions]])
+
+        codes = data['SpaceType'][positions]
+        for code in np.unique(codes):
+            name = snapshot.strings.values[code]
+            if name is None:
+                continue
+            bits = self.space_types.get(name)
+            if bits is None:
+                bits = self.space_types[name] = self._empty()
+            self._set(bits, ids[codes == code])
+
+        for band, (low, high) in SIZE_BANDS.items():
+            self._set(self.size_bands[band], ids[(sizes >= low) & (sizes <= high)])
+
+        buckets = np.searchsorted(PRICE_EDGES, prices, side='right') - 1
+        for i, bits in enumerate(self.price_buckets):
+            # NaN prices land past the last edge and are dropped here
+            self._set(bits, ids[(buckets == i) & ~np.isnan(prices)])
+
+        if not text:
+            return
+        titles = data['Title'][positions]
+        descriptions = data['Description'][positions]
+        for space_id, title, description in zip(ids.tolist(), titles, descriptions):
+            for slug in listing_neighborhoods(title, description):
+                self._set(self.neighborhoods[slug], [space_id])
+
+    @staticmethod
+    def _set(bits, space_ids):
+        space_ids = np.asarray(space_ids, dtype=np.int64)
+        if len(space_ids):
+            np.bitwise_or.at(bits, space_ids >> 6, np.left_shift(np.uint64(1), (space_ids & 63).astype(np.uint64)))
+
+    def _in_range(self, space_ids):
+        """SpaceIDs (any iterable) as an int64 array, dropping those past capacity"""
+        if isinstance(space_ids, (set, frozenset)):
+            space_ids = list(space_ids)
+        space_ids = np.asarray(space_ids, dtype=np.int64)
+        return space_ids[(space_ids >= 0) & (space_ids < self._words * 64)]
+
+    def _from_ids(self, space_ids):
+        bits = self._empty()
+        self._set(bits, self._in_range(space_ids))
+        return bits
+
+    def _range(self, values, low, high):
+        mask = np.ones(len(values), dtype=bool)
+        if low:
+            mask &= values >= low
+        if high:
+            mask &= values <= high
+        return _pack(mask, self._words)
@@ -0,0 +1,287 @@
+"""
+Generate a local SQLite database with realistic Si'aa data
+
+Used for profiling and benchmarking the search, space detail and booking
+paths without the live Azure database.
+
+    python generate_sample_db.py --scale 10k --db siaa_local.db
+    SIAA_DB_BACKEND=sqlite SIAA_SQLITE_PATH=siaa_local.db python app.py
+
+Every seeker and provider gets the password "password123".
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from rating_summary import backfill
+from sqlite_repository import CHANGE_VERSION_TRIGGERS, SCHEMA, INDEXES, TRIGGERS, SqliteRepository
+
+
+SCALES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+BATCH_SIZE = 10_000
+DEFAULT_PASSWORD = 'password123'
+
+NEIGHBORHOODS = [
+    'Al-Salama', 'Al-Rawdah', 'Al-Nahda', 'Al-Andalus', 'Al-Hamra', 'Al-Rehab',
+    'Al-Faisaliyah', 'Al-Naeem', 'Al-Zahra', 'Al-Shati', 'Al-Khalidiyah',
+    'Al-Marwah', 'Al-Safa', 'Al-Basateen', 'Obhur', 'Al-Aziziyah',
+]
+
+# SpaceType -> (size range m2, base price per m2 per month, title stem)
+SPACE_TYPES = {
+    'Indoor room': ((2, 10), 32, 'Indoor Storage Room'),
+    'Garage / parking': ((8, 25), 30, 'Garage Storage'),
+    'Warehouse corner': ((6, 40), 36, 'Warehouse Corner'),
+    'Outdoor covered area': ((10, 60), 24, 'Outdoor Covered Area'),
+}
+
+ADJECTIVES = ['Spacious', 'Compact', 'Secure', 'Premium', 'Budget', 'Clean', 'Large', 'Small']
+
+DESCRIPTION_PARTS = [
+    'Ideal for boxes, luggage, and small furniture.',
+    'Suitable for vehicles, large furniture, and equipment.',
+    'Perfect for electronics, documents, and temperature-sensitive items.',
+    'Secure building with daytime access.',
+    '24/7 access with security gate.',
+    'Climate-controlled environment perfect for sensitive items.',
+    'Clean, dry environment.',
+    'Humidity-controlled environment.',
+    'Scheduled access with on-site staff.',
+    'Good for business inventory and seasonal stock.',
+]
+
+ACCESS_TYPES = ['24/7 access', 'Daytime access', 'Scheduled access']
+FIRST_NAMES = ['Lama', 'Sara', 'Noura', 'Reem', 'Hala', 'Ahmed', 'Omar', 'Khalid', 'Faisal', 'Yousef']
+LAST_NAMES = ['Alharbi', 'Alghamdi', 'Alzahrani', 'Alqahtani', 'Alotaibi', 'Alshehri', 'Almutairi']
+
+
+def _password_hash(password):
+    # Same unsalted SHA-256 the login endpoint compares against
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def _batched(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _people(rng, count, password_hash, id_prefix):
+    for i in range(1, count + 1):
+        yield (
+            i,
+            rng.choice(FIRST_NAMES),
+            rng.choice(LAST_NAMES),
+            f"{id_prefix}{i}@example.com",
+            f"05{rng.randrange(10_000_000, 99_999_999)}",
+            password_hash,
+        )
+
+
+def _spaces(rng, count, provider_count):
+    type_names = list(SPACE_TYPES)
+    for space_id in range(1, count + 1):
+        space_type = rng.choice(type_names)
+        (min_size, max_size), per_m2, stem = SPACE_TYPES[space_type]
+        size = rng.randint(min_size, max_size)
+        neighborhood = rng.choice(NEIGHBORHOODS)
+        monthly = round(size * per_m2 * rng.uniform(0.7, 1.4), -1) or 50
+        description = ' '.join(rng.sample(DESCRIPTION_PARTS, 3))
+        available = 1 if rng.random() < 0.85 else 0
+        status = 'Active' if rng.random() < 0.95 else 'Inactive'
+        yield (
+            space_id,
+            rng.randint(1, provider_count),
+            f"{rng.choice(ADJECTIVES)} {stem} · {neighborhood}",
+            description,
+            space_type,
+            size,
+            monthly,
+            round(monthly / 4 * 1.1, 2),
+            round(monthly / 30 * 1.25, 2),
+            available,
+            status,
+            rng.randint(0, 40),
+        )
+
+
+def _features(rng, count):
+    for space_id in range(1, count + 1):
+        climate = rng.random() < 0.4
+        yield (
+            space_id,
+            space_id,
+            f"{rng.randint(18, 25)}C" if climate else None,
+            f"{rng.randint(30, 55)}%" if climate else None,
+            int(climate),
+            int(rng.random() < 0.6),
+            int(rng.random() < 0.5),
+            rng.choice(ACCESS_TYPES),
+            int(rng.random() < 0.5),
+            int(rng.random() < 0.3),
+            None,
+        )
+
+
+def _bookings(rng, space_count, seeker_count, per_space):
+    """Yields (booking row, review row or None, payment row)"""
+    booking_id = 0
+    review_id = 0
+    today = date.today()
+    for space_id in range(1, space_count + 1):
+        # Skewed history: a few popular spaces carry most of the bookings
+        n = int(rng.expovariate(1 / per_space)) if per_space else 0
+        start = today - timedelta(days=rng.randint(30, 720))
+        for _ in range(n):
+            booking_id += 1
+            days = rng.choice([7, 14, 30, 60, 90])
+            end = start + timedelta(days=days)
+            total = round(rng.uniform(100, 2000), 2)
+            status = 'Completed' if end < today else rng.choice(['Pending', 'Confirmed'])
+            seeker_id = rng.randint(1, seeker_count)
+            booking = (
+                booking_id, space_id, seeker_id, start.isoformat(), end.isoformat(),
+                round(days / 30, 2), total, round(total * 0.07, 2), status,
+            )
+            review = None
+            if status == 'Completed' and rng.random() < 0.6:
+                review_id += 1
+                rating = min(5, max(1, round(rng.gauss(4.1, 0.9))))
+                review = (review_id, booking_id, seeker_id, rating, 'Generated review text.')
+            payment = (
+                booking_id, booking_id, 'Booking', total, 'SAR', 'CreditCard',
+                'Completed', f"gen-{booking_id}", 'Manual',
+            )
+            yield booking, review, payment
+            start = end + timedelta(days=rng.randint(0, 20))
+
+
+def generate(path, space_count, bookings_per_space=3.0, seed=42):
+    """Create and fill the SQLite database at `path`"""
+    for stale in (path, path + '-wal', path + '-shm'):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    rng = random.Random(seed)
+    provider_count = max(1, space_count // 5)
+    seeker_count = max(1, space_count // 2)
+    password_hash = _password_hash(DEFAULT_PASSWORD)
+
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    # Indexes are built after the bulk insert, which is much faster
+    conn.executescript(SCHEMA)
+
+    started = time.perf_counter()
+
+    for batch in _batched(_people(rng, provider_count, password_hash, 'provider')):
+        conn.executemany("""
+            INSERT INTO StorageProviders (ProviderID, FirstName, LastName, Email, PhoneNumber, Password)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, batch)
+
+    for batch in _batched(_people(rng, seeker_count, password_hash, 'seeker')):
+        conn.executemany("""
+            INSERT INTO StorageSeekers (SeekerID, FirstName, LastName, Email, PhoneNumber, Password)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, batch)
+
+    for batch in _batched(_spaces(rng, space_count, provider_count)):
+        conn.executemany("""
+            INSERT INTO StorageSpaces (
+                SpaceID, ProviderID, Title, Description, SpaceType, Size,
+                PricePerMonth, PricePerWeek, PricePerDay, IsAvailable, Status, FavoriteCount
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, batch)
+
+    for batch in _batched(_features(rng, space_count)):
+        conn.executemany("""
+            INSERT INTO SpaceFeatures (
+                FeatureID, SpaceID, Temperature, Humidity, ClimateControlled, SecuritySystem,
+                CCTVMonitored, AccessType, ParkingAvailable, LoadingAssistance, Restrictions
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, batch)
+
+    booking_count = review_count = 0
+    for batch in _batched(_bookings(rng, space_count, seeker_count, bookings_per_space)):
+        conn.executemany("""
+            INSERT INTO Bookings (
+                BookingID, SpaceID, SeekerID, StartDate, EndDate,
+                RentalDurationMonths, TotalAmount, PlatformFee, BookingStatus
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [b for b, _, _ in batch])
+        reviews = [r for _, r, _ in batch if r]
+        conn.executemany("""
+            INSERT INTO Reviews (ReviewID, BookingID, ReviewerSeekerID, Rating, Comment)
+            VALUES (?, ?, ?, ?, ?)
+        """, reviews)
+        conn.executemany("""
+            INSERT INTO Payments (
+                PaymentID, BookingID, PaymentType, Amount, Currency, PaymentMethod,
+                PaymentStatus, TransactionID, PaymentGateway, PaymentDate
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, [p for _, _, p in batch])
+        booking_count += len(batch)
+        review_count += len(reviews)
+
+    conn.executescript(INDEXES)
+    conn.commit()
+
+    # Summaries are built once in bulk; triggers take over from here on
+    backfill(SqliteRepository(path), conn)
+    conn.executescript(TRIGGERS)
+    conn.executescript(CHANGE_VERSION_TRIGGERS)
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+
+    return {
+        'spaces': space_count,
+        'providers': provider_count,
+        'seekers': seeker_count,
+        'bookings': booking_count,
+        'reviews': review_count,
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a local Si'aa SQLite database")
+    parser.add_argument('--db', default='siaa_local.db', help='output SQLite file')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='10k',
+                        help='number of storage spaces to generate')
+    parser.add_argument('--spaces', type=int, help='exact number of spaces (overrides --scale)')
+    parser.add_argument('--bookings-per-space', type=float, default=3.0,
+                        help='mean bookings per space')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    space_count = args.spaces or SCALES[args.scale]
+    print(f"Generating {space_count:,} spaces into {args.db}...")
+    summary = generate(args.db, space_count, args.bookings_per_space, args.seed)
+    for key, value in summary.items():
+        print(f"  {key}: {value:,}" if isinstance(value, int) else f"  {key}: {value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Production serving config for the Si'aa Flask backend
+
+`python app.py` runs Flask's single-process development server. For
+deployments run the same app under gunicorn instead:
+
+    cd backend
+    gunicorn -c gunicorn.conf.py app:app
+
+Process/thread model: handlers spend most of their time waiting on SQL
+Server round trips, so each worker process runs a thread per pooled
+connection (gthread) and there is one process per core for the CPU-bound
+parts (JSON encoding, NumPy ranking). Every worker keeps its own
+connection pool and in-memory indexes.
+
+Settings come from the environment:
+
+    SIAA_BIND              address to listen on (0.0.0.0:5000)
+    SIAA_WORKERS           worker processes (CPU count)
+    SIAA_THREADS           threads per worker (SIAA_POOL_SIZE, default 10)
+    SIAA_WORKER_TIMEOUT    restart a worker whose main loop stops responding (60 s)
+    SIAA_GRACEFUL_TIMEOUT  on SIGTERM, time to finish in-flight requests (30 s)
+    SIAA_KEEPALIVE         idle keep-alive connection lifetime (5 s)
+    SIAA_MAX_REQUESTS      recycle a worker after this many requests (0 = never)
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('SIAA_BIND', '0.0.0.0:5000')
+
+worker_class = 'gthread'
+workers = int(os.environ.get('SIAA_WORKERS', multiprocessing.cpu_count()))
+# One thread per pooled connection, so a request never queues for a connection
+threads = int(os.environ.get('SIAA_THREADS', os.environ.get('SIAA_POOL_SIZE', 10)))
+
+# With gthread this is only a heartbeat check on the worker process: it is
+# restarted when its main loop stops responding, but a hung request thread is
+# never killed. A request stuck in the database is bounded by
+# SIAA_QUERY_TIMEOUT instead, which every pooled connection enforces per
+# statement (see app.py).
+timeout = int(os.environ.get('SIAA_WORKER_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('SIAA_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('SIAA_KEEPALIVE', 5))
+
+# Recycling also drops the worker's in-memory indexes, so it is off by default
+max_requests = int(os.environ.get('SIAA_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+# Load the app in each worker, not the master: pyodbc connections and the
+# embedding batcher thread do not survive a fork
+preload_app = False
+
+accesslog = os.environ.get('SIAA_ACCESS_LOG')
+errorlog = '-'
+
+
+def worker_exit(server, worker):
+    """Finish running background jobs, then close pooled connections, once
+    the worker has drained its requests"""
+    import app
+    if app.job_workers is not None:
+        app.job_workers.stop()
+    app.db_router.close()
@@ -0,0 +1,94 @@
+"""
+HTTP caching and compression for API responses
+
+Space detail and search responses are cached in-process as encoded bodies
+(see search_cache.py). Each cached body carries its validators:
+
+    ETag           hash of the body, computed once when the entry is built
+    Last-Modified  when the entry was built from the database
+
+so a conditional GET whose validators still match gets a 304 without
+touching the database or the encoder. Entries are dropped when a space they
+contain changes, which is what moves the validators on.
+
+Bodies above a size threshold are compressed with brotli (when the brotli
+package is installed) or gzip, whichever the client prefers. The compressed
+forms of a cached body are memoized with it, so a cache hit never
+recompresses.
+"""
+
+import hashlib
+import time
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+# Order of preference when the client accepts several encodings equally
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def body_etag(body):
+    """ETag value (without quotes) for an encoded body"""
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+def choose_encoding(accept_encodings, encodings=ENCODINGS):
+    """Best content coding the client accepts from `encodings`, or None"""
+    best, best_quality = None, 0
+    for encoding in encodings:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    # wbits=31 writes the gzip header and trailer
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def gzip_stream(chunks):
+    """Gzip a streamed body chunk by chunk
+
+    Each chunk is sync-flushed, so the client can decode it as soon as it
+    arrives instead of waiting for zlib's buffer to fill.
+    """
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        if chunk:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+class CachedBody:
+    """An encoded response body with its validators and compressed forms"""
+
+    __slots__ = ('body', 'etag', 'last_modified', '_encoded')
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = body_etag(body)
+        self.last_modified = int(time.time())
+        self._encoded = {}
+
+    def __len__(self):
+        return len(self.body)
+
+    def encoded(self, encoding):
+        """The body compressed with `encoding` (compressed once, then reused)"""
+        data = self._encoded.get(encoding)
+        if data is None:
+            # Two threads may both compress; either result is fine to keep
+            data = self._encoded[encoding] = compress(self.body, encoding)
+        return data
@@ -1,14 +1,40 @@
 """
 Initialize sample storage spaces data for testing
 Run this script to populate the database with sample data
+
+Without arguments it loads the eight sample spaces below. With --file it
+streams a JSON / NDJSON / CSV catalog of any size into POST /api/spaces/bulk:
+batches are sent from a bounded pool of worker threads over keep-alive
+sessions, requests that were refused or shed (429/503) are retried with
+exponential backoff, and every finished batch is checkpointed so a rerun skips what was already loaded.
+
+    python init_sample_data.py
+    python init_sample_data.py --file catalog.ndjson --provider-id 3 --workers 8
 """
 
+import argparse
+import bisect
+import csv
 import json
-import requests
+import os
+import random
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
 
 API_BASE_URL = 'http://localhost:5000/api'
 
+# Responses worth retrying; anything else is reported and checkpointed.
+# Both are returned before the batch is processed (rate limit, admission
+# control). A batch POST is not idempotent, so 500/502/504, which may come
+# after the server committed it, are not retried.
+RETRY_STATUSES = {429, 503}
+
 # Sample storage spaces data
 sample_spaces = [
     {
@@ -109,56 +135,320 @@ sample_spaces = [
     }
 ]
 
-def check_server():
+def check_server(api_base_url=API_BASE_URL):
     """Check if the server is running"""
     try:
-        response = requests.get(f"{API_BASE_URL}/health", timeout=5)
+        response = requests.get(f"{api_base_url}/health", timeout=5)
         return response.status_code == 200
-    except:
+    except requests.RequestException:
         return False
 
-def add_sample_spaces():
+# =============================================
+# READERS: stream catalog rows from disk
+# =============================================
+
+def read_ndjson(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def read_json(path):
+    """Items of a top-level JSON array (streamed when ijson is installed)"""
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+    with open(path, 'rb') as f:
+        if ijson is None:
+            yield from json.load(f)
+        else:
+            yield from ijson.items(f, 'item', use_float=True)
+
+def read_csv(path):
+    """Rows of a CSV with a header; list fields such as conditions use `;`"""
+    with open(path, encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            space = {key: value for key, value in row.items() if value not in (None, '')}
+            if 'conditions' in space:
+                space['conditions'] = [c.strip() for c in space['conditions'].split(';') if c.strip()]
+            yield space
+
+def read_catalog(path):
+    if path.endswith(('.ndjson', '.jsonl')):
+        return read_ndjson(path)
+    if path.endswith('.csv'):
+        return read_csv(path)
+    return read_json(path)
+
+def batched(rows, size, done=()):
+    """(first row, rows) chunks, skipping row numbers covered by `done`
+
+    Rows are numbered by their position in the file, so a checkpoint stays
+    valid when a rerun uses a different batch size.
+    """
+    batch = []
+    first = 0
+    for number, row in enumerate(rows):
+        if number in done:
+            if batch:
+                yield first, batch
+                batch = []
+            continue
+        if not batch:
+            first = number
+        batch.append(row)
+        if len(batch) == size:
+            yield first, batch
+            batch = []
+    if batch:
+        yield first, batch
+
+# =============================================
+# LOADER
+# =============================================
+
+def _not_sent(error):
+    """True if the connection failed before the request was sent"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0] if error.args else None, 'reason', None)
+    # NewConnectionError (refused, unreachable) is a ConnectTimeoutError
+    return isinstance(error, requests.ConnectionError) and isinstance(reason, ConnectTimeoutError)
+
+
+class Checkpoint:
+    """Append-only record of loaded row ranges (`first end` per line)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._starts = []
+        self._ends = []
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        first, end = map(int, line.split())
+                        self._add(first, end)
+
+    def __len__(self):
+        """Number of rows already loaded"""
+        return sum(end - first for first, end in zip(self._starts, self._ends))
+
+    def __contains__(self, row):
+        i = bisect.bisect_right(self._starts, row)
+        return i > 0 and row < self._ends[i - 1]
+
+    def _add(self, first, end):
+        # Keep ranges sorted and merged so a lookup is one bisect
+        i = bisect.bisect_left(self._starts, first)
+        self._starts.insert(i, first)
+        self._ends.insert(i, end)
+        starts, ends = [], []
+        for s, e in zip(self._starts, self._ends):
+            if starts and s <= ends[-1]:
+                ends[-1] = max(ends[-1], e)
+            else:
+                starts.append(s)
+                ends.append(e)
+        self._starts, self._ends = starts, ends
+
+    def mark(self, first, count):
+        with self._lock:
+            self._add(first, first + count)
+            if not self.path:
+                return
+            with open(self.path, 'a') as f:
+                f.write(f"{first} {first + count}\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+class BulkLoader:
+    """Send batches to POST /api/spaces/bulk from a bounded thread pool
+
+    workers     -- concurrent requests (each thread keeps its own session)
+    retries     -- attempts after the first for refused connections and 429/503
+    timeout     -- seconds per request
+    """
+
+    def __init__(self, api_base_url, provider_id, workers=4, retries=5, timeout=60,
+                 checkpoint=None, errors_path=None):
+        self.url = f"{api_base_url}/spaces/bulk"
+        self.provider_id = provider_id
+        self.workers = workers
+        self.retries = retries
+        self.timeout = timeout
+        self.checkpoint = checkpoint if checkpoint is not None else Checkpoint(None)
+        self.errors_path = errors_path
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.stats = {'created': 0, 'failed': 0, 'skipped': 0, 'batches': 0,
+                      'failedBatches': 0, 'retries': 0}
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self._local.session = session
+        return session
+
+    def _post(self, batch):
+        """Response JSON for one batch, retrying transient failures"""
+        body = {'providerId': self.provider_id, 'spaces': batch}
+        for attempt in range(self.retries + 1):
+            try:
+                response = self._session().post(self.url, json=body, timeout=self.timeout)
+                if response.status_code >= 500 and response.status_code not in RETRY_STATUSES:
+                    # Not checkpointed; whoever reruns the load decides whether to resend it
+                    raise RuntimeError(f"HTTP {response.status_code}, the batch may have been saved")
+                if response.status_code not in RETRY_STATUSES:
+                    return response.status_code, response.json()
+                error = f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                # Only retry when the request never reached the server; after a
+                # read timeout or a dropped connection it may still commit the
+                # batch, and retrying could duplicate it
+                if not _not_sent(e):
+                    raise
+                error = str(e)
+            if attempt == self.retries:
+                raise RuntimeError(f"gave up after {attempt + 1} attempts: {error}")
+            with self._stats_lock:
+                self.stats['retries'] += 1
+            # Exponential backoff with full jitter, capped at 30 s
+            time.sleep(random.uniform(0, min(30, 0.5 * 2 ** attempt)))
+
+    def _load_batch(self, first, batch):
+        try:
+            status, data = self._post(batch)
+        except Exception as e:
+            with self._stats_lock:
+                self.stats['failedBatches'] += 1
+            print(f"✗ Rows {first}-{first + len(batch) - 1} not loaded ({e}); rerun to retry them")
+            return
+
+        results = data.get('results') or []
+        failures = [dict(result, line=first + result['index'], row=batch[result['index']])
+                    for result in results
+                    if not result.get('success')]
+        if status >= 400 and not results:
+            failures = [{'line': first, 'rows': len(batch), 'error': data.get('error')}]
+
+        # Item errors are validation failures: a retry would fail the same way
+        self.checkpoint.mark(first, len(batch))
+        with self._stats_lock:
+            self.stats['batches'] += 1
+            self.stats['created'] += data.get('created', 0)
+            self.stats['failed'] += len(failures) if results else len(batch)
+            if failures and self.errors_path:
+                with open(self.errors_path, 'a', encoding='utf-8') as f:
+                    for failure in failures:
+                        f.write(json.dumps(failure, ensure_ascii=False) + '\n')
+
+    def run(self, rows, batch_size=200, report_every=5.0):
+        """Load every row; returns the stats dict"""
+        self.stats['skipped'] = len(self.checkpoint)
+        started = time.perf_counter()
+        last_report = started
+        # At most 2 batches queued per worker, so the file is never read ahead
+        slots = threading.BoundedSemaphore(self.workers * 2)
+
+        def task(first, batch):
+            try:
+                self._load_batch(first, batch)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for first, batch in batched(rows, batch_size, self.checkpoint):
+                slots.acquire()
+                pool.submit(task, first, batch)
+
+                now = time.perf_counter()
+                if now - last_report >= report_every:
+                    last_report = now
+                    self._report(now - started)
+
+        self.stats['seconds'] = round(time.perf_counter() - started, 2)
+        self._report(self.stats['seconds'])
+        return self.stats
+
+    def _report(self, elapsed):
+        with self._stats_lock:
+            loaded = self.stats['created'] + self.stats['failed']
+            rate = loaded / elapsed if elapsed else 0.0
+            print(f"  {self.stats['created']:,} created, {self.stats['failed']:,} failed, "
+                  f"{self.stats['skipped']:,} skipped - {rate:,.0f} rows/s")
+
+def add_sample_spaces(api_base_url=API_BASE_URL, provider_id=1):
     """Add sample spaces to the database"""
     print("Adding sample storage spaces...")
     print("=" * 50)
-    
-    for i, space in enumerate(sample_spaces, 1):
-        try:
-            response = requests.post(
-                f"{API_BASE_URL}/spaces",
-                json=space,
-                headers={'Content-Type': 'application/json'},
-                timeout=30
-            )
-            
-            if response.status_code == 201:
-                data = response.json()
-                print(f"✓ Added: {space['title']} (ID: {data.get('space_id', 'N/A')})")
-            else:
-                print(f"✗ Failed to add: {space['title']} - {response.status_code}")
-        except Exception as e:
-            print(f"✗ Error adding {space['title']}: {str(e)}")
-    
+
+    loader = BulkLoader(api_base_url, provider_id, workers=1)
+    loader.run(sample_spaces, batch_size=len(sample_spaces))
+
     print("=" * 50)
     print("Done!")
 
-if __name__ == '__main__':
+def main():
+    parser = argparse.ArgumentParser(description="Load storage spaces into the Si'aa backend")
+    parser.add_argument('--file', help='JSON array, NDJSON (.ndjson/.jsonl) or CSV catalog')
+    parser.add_argument('--api', default=API_BASE_URL, help='API base URL')
+    parser.add_argument('--provider-id', type=int, default=1,
+                        help='ProviderID for rows that do not carry one')
+    parser.add_argument('--workers', type=int, default=4, help='concurrent requests')
+    parser.add_argument('--batch-size', type=int, default=200, help='spaces per request (max 1000)')
+    parser.add_argument('--retries', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=60, help='seconds per request')
+    parser.add_argument('--checkpoint', help='progress file (default: <file>.checkpoint)')
+    parser.add_argument('--errors', help='rejected rows as NDJSON (default: <file>.errors.ndjson)')
+    args = parser.parse_args()
+
     print("\nSi'aa Platform - Sample Data Initializer")
     print("=" * 50)
-    
-    if not check_server():
+
+    if not check_server(args.api):
         print("\n❌ Error: Backend server is not running!")
         print("Please start the server first:")
         print("  cd backend")
         print("  python app.py")
         print("\nThen run this script again.")
         sys.exit(1)
-    
+
     print("\n✓ Backend server is running")
-    print("\nInitializing sample data...\n")
-    
-    add_sample_spaces()
-    
-    print("\nYou can now test the search functionality!")
 
+    if not args.file:
+        print("\nInitializing sample data...\n")
+        add_sample_spaces(args.api, args.provider_id)
+        print("\nYou can now test the search functionality!")
+        return
 
+    checkpoint = Checkpoint(args.checkpoint or f"{args.file}.checkpoint")
+    if len(checkpoint):
+        print(f"\nResuming: {len(checkpoint):,} rows already loaded")
+    print(f"\nLoading {args.file} with {args.workers} workers...\n")
+
+    loader = BulkLoader(
+        args.api, args.provider_id,
+        workers=args.workers,
+        retries=args.retries,
+        timeout=args.timeout,
+        checkpoint=checkpoint,
+        errors_path=args.errors or f"{args.file}.errors.ndjson",
+    )
+    stats = loader.run(read_catalog(args.file), batch_size=min(args.batch_size, 1000))
+
+    print("=" * 50)
+    print(f"✓ {stats['created']:,} created, {stats['failed']:,} rejected, "
+          f"{stats['skipped']:,} skipped (already loaded) in {stats['seconds']}s "
+          f"({stats['retries']} retries)")
+    if stats['failedBatches']:
+        print(f"✗ {stats['failedBatches']} batches were not loaded; run again to retry them")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
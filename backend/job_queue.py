@@ -0,0 +1,318 @@
+"""
+Durable background job queue for post-booking work
+
+create_booking() only commits the Pending booking and its Pending payment,
+then enqueues the rest (payment capture, booking status transitions,
+notifications) here, so its latency does not depend on the payment gateway or
+anything downstream.
+
+Jobs live in a local SQLite file, so they survive restarts, and every gunicorn
+worker process can claim from the same file. A claimed job holds a lease; a
+job whose worker died is claimed again once the lease runs out. Failed jobs
+are retried with exponential backoff and, after `max_attempts`, marked dead.
+
+Each job has an idempotency key (the booking's TransactionID plus a suffix):
+enqueueing an existing key is a no-op, and handlers must be safe to run more
+than once, since a job can be retried after doing part of its work.
+"""
+
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Jobs (
+    JobID           INTEGER PRIMARY KEY,
+    Kind            TEXT NOT NULL,
+    IdempotencyKey  TEXT NOT NULL UNIQUE,
+    Payload         TEXT NOT NULL,
+    Status          TEXT NOT NULL DEFAULT 'queued',   -- queued / running / done / dead
+    Attempts        INTEGER NOT NULL DEFAULT 0,
+    RunAfter        REAL NOT NULL,
+    LeaseUntil      REAL,
+    LastError       TEXT,
+    CreatedAt       REAL NOT NULL,
+    FinishedAt      REAL
+);
+CREATE INDEX IF NOT EXISTS IX_Jobs_Ready ON Jobs (Status, RunAfter);
+"""
+
+STATUSES = ('queued', 'running', 'done', 'dead')
+
+Job = namedtuple('Job', ['job_id', 'kind', 'key', 'payload', 'attempts'])
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help (e.g. a declined card)"""
+
+
+class JobQueue:
+    """SQLite-backed queue of (kind, idempotency key, JSON payload) jobs"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._ready = threading.Condition()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit; claims take the write lock explicitly (BEGIN IMMEDIATE)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -----------------------------------------
+    # Producers
+    # -----------------------------------------
+
+    def enqueue(self, kind, key, payload, delay=0):
+        """Add a job; returns False when `key` was already enqueued"""
+        return self.enqueue_many([(kind, key, payload)], delay) == 1
+
+    def enqueue_many(self, jobs, delay=0):
+        """Add (kind, key, payload) jobs in one transaction; returns how many were new"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            added = 0
+            for kind, key, payload in jobs:
+                cursor = conn.execute("""
+                    INSERT OR IGNORE INTO Jobs (Kind, IdempotencyKey, Payload, RunAfter, CreatedAt)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (kind, key, json.dumps(payload), now + delay, now))
+                added += cursor.rowcount
+        if added:
+            with self._ready:
+                self._ready.notify(added)
+        return added
+
+    # -----------------------------------------
+    # Consumers
+    # -----------------------------------------
+
+    def claim(self, lease=60.0):
+        """Next job that is due (or whose lease expired), marked running; or None"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("""
+                SELECT JobID, Kind, IdempotencyKey, Payload, Attempts
+                FROM Jobs
+                WHERE (Status = 'queued' AND RunAfter <= ?)
+                   OR (Status = 'running' AND LeaseUntil <= ?)
+                ORDER BY RunAfter
+                LIMIT 1
+            """, (now, now)).fetchone()
+            if row is None:
+                return None
+            conn.execute("""
+                UPDATE Jobs SET Status = 'running', Attempts = Attempts + 1, LeaseUntil = ?
+                WHERE JobID = ?
+            """, (now + lease, row[0]))
+        return Job(row[0], row[1], row[2], json.loads(row[3]), row[4] + 1)
+
+    def complete(self, job_id):
+        self._finish(job_id, 'done', None)
+
+    def bury(self, job_id, error):
+        """Give up on a job; it stays in the table as 'dead' for inspection"""
+        self._finish(job_id, 'dead', error)
+
+    def retry(self, job_id, error, delay):
+        self._connect().execute("""
+            UPDATE Jobs SET Status = 'queued', RunAfter = ?, LeaseUntil = NULL, LastError = ?
+            WHERE JobID = ?
+        """, (time.time() + delay, error, job_id))
+
+    def _finish(self, job_id, status, error):
+        self._connect().execute("""
+            UPDATE Jobs SET Status = ?, LastError = ?, FinishedAt = ?, LeaseUntil = NULL
+            WHERE JobID = ?
+        """, (status, error, time.time(), job_id))
+
+    def wait(self, timeout):
+        """Block until a job is enqueued in this process, or `timeout` passes"""
+        with self._ready:
+            self._ready.wait(timeout)
+
+    def wake_all(self):
+        with self._ready:
+            self._ready.notify_all()
+
+    # -----------------------------------------
+    # Maintenance
+    # -----------------------------------------
+
+    def purge(self, older_than):
+        """Delete jobs finished more than `older_than` seconds ago
+
+        Their keys can then be enqueued again; handlers are idempotent anyway.
+        """
+        cursor = self._connect().execute(
+            "DELETE FROM Jobs WHERE Status = 'done' AND FinishedAt < ?", (time.time() - older_than,)
+        )
+        return cursor.rowcount
+
+    def stats(self):
+        now = time.time()
+        conn = self._connect()
+        counts = dict(conn.execute("SELECT Status, COUNT(*) FROM Jobs GROUP BY Status").fetchall())
+        oldest = conn.execute(
+            "SELECT MIN(RunAfter) FROM Jobs WHERE Status = 'queued' AND RunAfter <= ?", (now,)
+        ).fetchone()[0]
+        stats = {status: counts.get(status, 0) for status in STATUSES}
+        stats['oldestReadySeconds'] = round(now - oldest, 3) if oldest is not None else 0
+        return stats
+
+
+class JobWorkers:
+    """Threads running queued jobs through per-kind handlers
+
+    handlers     -- {kind: callable(payload)}; raise to retry, or
+                    PermanentJobError to give up at once
+    on_dead      -- optional callable(job, error) when a job is given up on
+    maintenance  -- optional callable() run by one of the workers every
+                    maintenance_interval seconds, first when they start (e.g.
+                    to enqueue work whose enqueue was lost)
+    workers      -- worker threads in this process
+    lease        -- seconds a claimed job is reserved for its worker
+    max_attempts -- attempts before a failing job is marked dead
+    retry_delay  -- backoff after the first failure, doubled per attempt
+    retention    -- seconds finished jobs (and their keys) are kept
+    """
+
+    def __init__(self, queue, handlers, on_dead=None, workers=2, lease=60.0,
+                 max_attempts=8, retry_delay=2.0, max_retry_delay=300.0,
+                 poll_interval=1.0, retention=7 * 86400,
+                 maintenance=None, maintenance_interval=60.0):
+        self.queue = queue
+        self.handlers = handlers
+        self.on_dead = on_dead
+        self.maintenance = maintenance
+        self.maintenance_interval = maintenance_interval
+        self.workers = workers
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.poll_interval = poll_interval
+        self.retention = retention
+
+        self._threads = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._purged = 0.0
+        self._maintained = float('-inf')
+
+        self.succeeded = 0
+        self.retried = 0
+        self.dead = 0
+
+    def start(self):
+        """Start the worker threads (once)"""
+        with self._lock:
+            if self._threads or self.workers < 1:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout=10.0):
+        """Let running jobs finish and stop claiming new ones"""
+        self._stopping.set()
+        self.queue.wake_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': len(self._threads),
+                'succeeded': self.succeeded,
+                'retried': self.retried,
+                'dead': self.dead,
+            }
+
+    def _run(self):
+        while not self._stopping.is_set():
+            # Not only when idle: a busy queue must not postpone recovery
+            self._maintain()
+            try:
+                job = self.queue.claim(self.lease)
+            except sqlite3.Error as e:
+                print(f"Job queue error: {e}")
+                job = None
+            if job is None:
+                self._purge()
+                self.queue.wait(self.poll_interval)
+                continue
+            self._execute(job)
+
+    def _execute(self, job):
+        handler = self.handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler for job kind {job.kind!r}")
+            handler(job.payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if isinstance(e, PermanentJobError) or job.attempts >= self.max_attempts:
+                self._give_up(job, error)
+            else:
+                delay = min(self.retry_delay * 2 ** (job.attempts - 1), self.max_retry_delay)
+                # Jitter keeps jobs that failed together from retrying together
+                self.queue.retry(job.job_id, error, delay * random.uniform(0.5, 1.0))
+                with self._lock:
+                    self.retried += 1
+            return
+        self.queue.complete(job.job_id)
+        with self._lock:
+            self.succeeded += 1
+
+    def _give_up(self, job, error):
+        print(f"Job {job.kind} {job.key} failed permanently: {error}")
+        self.queue.bury(job.job_id, error)
+        with self._lock:
+            self.dead += 1
+        if self.on_dead is not None:
+            try:
+                self.on_dead(job, error)
+            except Exception as e:
+                print(f"Job failure handler error: {e}")
+
+    def _maintain(self):
+        if self.maintenance is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._maintained < self.maintenance_interval:
+                return
+            self._maintained = now
+        try:
+            self.maintenance()
+        except Exception as e:
+            print(f"Job maintenance error: {e}")
+
+    def _purge(self):
+        now = time.monotonic()
+        if now - self._purged < 3600:
+            return
+        self._purged = now
+        try:
+            self.queue.purge(self.retention)
+        except sqlite3.Error as e:
+            print(f"Job queue purge error: {e}")
@@ -0,0 +1,279 @@
+"""
+Per-request instrumentation for the Si'aa Flask backend
+
+Each request gets a RequestTimer. Instrumented connections feed it:
+db_connection() wraps pooled connections so every cursor reports
+
+    pool       time waiting to check out a connection
+    sql        time in execute() / executemany()
+    fetch      time in fetchone() / fetchmany() / fetchall() and iteration
+
+plus one query and the rows it returned. The app adds `queue` (admission
+wait), `hash` (password verification), `serialize` (JSON encoding) and
+`compress`. At the end of the
+request the timer is folded into a MetricsRegistry, exposed in Prometheus
+text format on /api/metrics, and summarized in a Server-Timing header.
+
+SQL time is also recorded per query, labelled with the repository method
+that opened the cursor (search_spaces, count_spaces_matching, get_space,
+...), so a slow endpoint can be traced to the statement responsible.
+"""
+
+import os
+import sys
+import threading
+import time
+
+
+# Histogram bucket upper bounds (seconds)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000)
+
+# Phases reported in Server-Timing, in this order
+PHASES = ('queue', 'pool', 'sql', 'fetch', 'hash', 'serialize', 'compress')
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative counts like Prometheus)"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.n += 1
+
+    def snapshot(self):
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            running += count
+            cumulative[str(bound)] = running
+        return {
+            'count': self.n,
+            'sum': round(self.total, 3),
+            'mean': round(self.total / self.n, 3) if self.n else 0.0,
+            'buckets': cumulative,
+        }
+
+
+class RequestTimer:
+    """Time and query counts accumulated while serving one request"""
+
+    __slots__ = ('started', 'phases', 'queries', 'rows', 'by_query')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.rows = 0
+        self.by_query = {}   # query label -> [count, sql seconds, rows]
+
+    def add(self, phase, seconds):
+        self.phases[phase] += seconds
+
+    def add_query(self, label, seconds):
+        self.phases['sql'] += seconds
+        self.queries += 1
+        stats = self.by_query.get(label)
+        if stats is None:
+            self.by_query[label] = [1, seconds, 0]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+
+    def add_rows(self, label, seconds, count):
+        self.phases['fetch'] += seconds
+        self.rows += count
+        stats = self.by_query.get(label)
+        if stats is not None:
+            stats[2] += count
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total):
+        """Server-Timing header value (durations in milliseconds)"""
+        parts = [f"{phase};dur={seconds * 1000:.2f}" for phase, seconds in self.phases.items() if seconds]
+        parts.append(f'db;desc="{self.queries} queries, {self.rows} rows"')
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ', '.join(parts)
+
+
+class InstrumentedCursor:
+    """DB-API cursor proxy reporting execute / fetch time to a RequestTimer"""
+
+    __slots__ = ('_cursor', '_timer', '_label')
+
+    def __init__(self, cursor, timer, label):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_timer', timer)
+        object.__setattr__(self, '_label', label)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        # e.g. pyodbc's cursor.fast_executemany
+        setattr(self._cursor, name, value)
+
+    def execute(self, *args):
+        started = time.perf_counter()
+        try:
+            self._cursor.execute(*args)
+        finally:
+            self._timer.add_query(self._label, time.perf_counter() - started)
+        return self
+
+    def executemany(self, *args):
+        started = time.perf_counter()
+        try:
+            self._cursor.executemany(*args)
+        finally:
+            self._timer.add_query(self._label, time.perf_counter() - started)
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._timer.add_rows(self._label, time.perf_counter() - started, row is not None)
+        return row
+
+    def fetchmany(self, *args):
+        started = time.perf_counter()
+        rows = self._cursor.fetchmany(*args)
+        self._timer.add_rows(self._label, time.perf_counter() - started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._timer.add_rows(self._label, time.perf_counter() - started, len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+
+class InstrumentedConnection:
+    """DB-API connection proxy whose cursors report to a RequestTimer"""
+
+    __slots__ = ('_conn', '_timer')
+
+    def __init__(self, conn, timer):
+        self._conn = conn
+        self._timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self):
+        # Label queries with the function that opened the cursor (usually a
+        # Repository method); one frame lookup per cursor
+        label = sys._getframe(1).f_code.co_name
+        return InstrumentedCursor(self._conn.cursor(), self._timer, label)
+
+
+class MetricsRegistry:
+    """Thread-safe histograms and counters rendered in Prometheus text format
+
+    Each gunicorn worker keeps its own registry; series carry a `worker`
+    label so scrapes from different workers never mix.
+    """
+
+    def __init__(self, prefix='siaa'):
+        self.prefix = prefix
+        self.worker = str(os.getpid())
+        self._lock = threading.Lock()
+        self._histograms = {}    # (name, labels) -> Histogram
+        self._counters = {}      # (name, labels) -> float
+        self._help = {}
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def increment(self, name, labels, value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def record_request(self, timer, endpoint, method, status, total):
+        """Fold one finished request into the registry"""
+        labels = (('endpoint', endpoint), ('method', method))
+        self.increment('http_requests_total', labels + (('status', str(status)),))
+        self.observe('http_request_duration_seconds', labels, total)
+        for phase, seconds in timer.phases.items():
+            if seconds:
+                self.observe('http_request_phase_seconds', labels + (('phase', phase),), seconds)
+        self.observe('http_request_db_rows', labels, timer.rows, ROW_BUCKETS)
+        for query, (count, seconds, rows) in timer.by_query.items():
+            query_labels = (('endpoint', endpoint), ('query', query))
+            self.increment('db_queries_total', query_labels, count)
+            self.increment('db_rows_total', query_labels, rows)
+            self.observe('db_query_seconds', (('query', query),), seconds / count)
+
+    def render(self, gauges=()):
+        """Prometheus text exposition; gauges are extra (name, labels, value)
+
+        Gauges may come in any order; each name's samples are emitted
+        together, since the format requires a family to be one group.
+        """
+        worker = ('worker', self.worker)
+        with self._lock:
+            histograms = [(key, h.buckets, list(h.counts), h.total, h.n)
+                          for key, h in self._histograms.items()]
+            counters = list(self._counters.items())
+
+        lines = []
+        described = set()
+
+        def header(name):
+            if name not in described and name in self._help:
+                kind, text = self._help[name]
+                lines.append(f"# HELP {self.prefix}_{name} {text}")
+                lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+            described.add(name)
+
+        for (name, labels), buckets, counts, total, n in sorted(histograms):
+            header(name)
+            running = 0
+            for bound, count in zip(buckets + ('+Inf',), counts):
+                running += count
+                lines.append(self._sample(f"{name}_bucket", labels + (worker, ('le', str(bound))), running))
+            lines.append(self._sample(f"{name}_sum", labels + (worker,), round(total, 6)))
+            lines.append(self._sample(f"{name}_count", labels + (worker,), n))
+        for (name, labels), value in sorted(counters):
+            header(name)
+            lines.append(self._sample(name, labels + (worker,), value))
+        families = {}
+        for name, labels, value in gauges:
+            families.setdefault(name, []).append((labels, value))
+        for name, samples in families.items():
+            header(name)
+            for labels, value in samples:
+                lines.append(self._sample(name, labels + (worker,), value))
+        return '\n'.join(lines) + '\n'
+
+    def _sample(self, name, labels, value):
+        rendered = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+        return f"{self.prefix}_{name}{{{rendered}}} {value}"
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
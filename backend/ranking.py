@@ -0,0 +1,211 @@
+"""
+Hybrid relevance ranking for space search
+
+search_spaces() can only order by price, and its searchTerm is a pair of
+`LIKE '%term%'` predicates. For ?sort=relevance the app instead keeps a
+snapshot of every available space in NumPy arrays and scores all candidates
+in one vectorized pass, blending:
+
+    semantic -- cosine similarity of the query to the space embedding
+    text     -- BM25 over Title + Description (terms as in text_index.py)
+    price    -- fit against the seeker's maxPrice (or the typical price)
+    rating   -- average rating, shrunk towards a prior for few reviews
+
+Only the top offset + k candidates are ordered (argpartition), so a broad
+query over a large catalog never sorts the whole candidate set.
+"""
+
+import math
+import time
+from collections import Counter, namedtuple
+
+import numpy as np
+
+from text_index import index_terms, query_terms
+
+
+RankingWeights = namedtuple('RankingWeights', ['semantic', 'text', 'price', 'rating'])
+
+DEFAULT_WEIGHTS = RankingWeights(semantic=0.5, text=0.25, price=0.15, rating=0.10)
+
+# Bayesian average: RATING_PRIOR_COUNT virtual reviews of RATING_PRIOR_MEAN stars
+RATING_PRIOR_MEAN = 3.0
+RATING_PRIOR_COUNT = 5
+
+def parse_weights(value):
+    """RankingWeights from 'semantic,text,price,rating' (e.g. an env var)"""
+    if not value:
+        return DEFAULT_WEIGHTS
+    return RankingWeights(*(float(part) for part in value.split(',')))
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents, scored for all rows at once"""
+
+    def __init__(self, texts, k1=1.2, b=0.75):
+        postings = {}
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = Counter(index_terms(text))
+            lengths[row] = sum(counts.values())
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((row, tf))
+
+        self.size = len(texts)
+        avg_length = float(lengths.mean()) if self.size else 0.0
+        norm = k1 * (1 - b + b * lengths / (avg_length or 1.0))
+
+        # Per term: rows and the query-independent part of the BM25 term weight
+        self._postings = {}
+        for term, entries in postings.items():
+            rows = np.fromiter((row for row, _ in entries), dtype=np.int64, count=len(entries))
+            tf = np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries))
+            idf = math.log(1 + (self.size - len(rows) + 0.5) / (len(rows) + 0.5))
+            self._postings[term] = (rows, (idf * tf * (k1 + 1) / (tf + norm[rows])).astype(np.float32))
+
+    def scores(self, query):
+        """BM25 score of every document for `query` (zeros where nothing matches)"""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(query_terms(query)):
+            posting = self._postings.get(term)
+            if posting is not None:
+                rows, weights = posting
+                scores[rows] += weights
+        return scores
+
+
+class HybridRanker:
+    """Snapshot of the searchable catalog with vectorized hybrid scoring
+
+    rows -- iterable of (SpaceID, Title, Description, SpaceType,
+            PricePerMonth, Size, AverageRating, ReviewCount), as returned by
+            Repository.ranking_features()
+    """
+
+    def __init__(self, rows, weights=DEFAULT_WEIGHTS):
+        rows = list(rows)
+        self.weights = weights
+        self.built_at = time.monotonic()
+
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.space_types = np.array([row[3] or '' for row in rows], dtype=object)
+        self.prices = np.array([_float(row[4]) for row in rows], dtype=np.float32)
+        self.sizes = np.array([_float(row[5]) for row in rows], dtype=np.float32)
+        ratings = np.array([_float(row[6], 0.0) for row in rows], dtype=np.float32)
+        counts = np.array([row[7] or 0 for row in rows], dtype=np.float32)
+
+        # Rating component is query-independent, so it is computed once
+        self.rating_scores = (
+            (ratings * counts + RATING_PRIOR_MEAN * RATING_PRIOR_COUNT)
+            / (counts + RATING_PRIOR_COUNT) / 5.0
+        ).astype(np.float32)
+
+        self.text_index = BM25Index([f"{row[1] or ''} {row[2] or ''}" for row in rows])
+        self._store_rows = None
+        self._store = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def age(self):
+        return time.monotonic() - self.built_at
+
+    def attach_embeddings(self, store):
+        """Align an EmbeddingStore with the snapshot rows (spaces without an
+        embedding get a semantic score of 0)"""
+        rows = (store.row_of(space_id) for space_id in self.ids.tolist())
+        self._store_rows = np.array([-1 if row is None else row for row in rows], dtype=np.int64)
+        self._store = store
+
+    # -----------------------------------------
+    # Scoring
+    # -----------------------------------------
+
+    def filter_mask(self, filters):
+        """Rows matching everything in `filters` except the search term"""
+        mask = np.ones(len(self.ids), dtype=bool)
+        if filters.space_type:
+            mask &= self.space_types == filters.space_type
+        # Same truthiness as the SQL search: 0 / None bounds are ignored
+        if filters.min_price:
+            mask &= self.prices >= filters.min_price
+        if filters.max_price:
+            mask &= self.prices <= filters.max_price
+        if filters.min_size:
+            mask &= self.sizes >= filters.min_size
+        if filters.max_size:
+            mask &= self.sizes <= filters.max_size
+        return mask
+
+    def rank(self, filters, k, offset=0, query_vector=None, exclude=None):
+        """[(SpaceID, score, components)] for ranks offset .. offset + k - 1
+
+        query_vector -- embedding of filters.search_term; without it (or
+                        without attached embeddings) a search term must
+                        match textually, as in the SQL search
+        exclude      -- SpaceIDs to leave out (e.g. booked for the dates)
+        """
+        mask = self.filter_mask(filters)
+        if exclude:
+            mask &= ~np.isin(self.ids, np.fromiter(exclude, dtype=np.int64, count=len(exclude)))
+        candidates = np.flatnonzero(mask)
+
+        text = np.zeros(len(candidates), dtype=np.float32)
+        if filters.search_term:
+            text = self.text_index.scores(filters.search_term)[candidates]
+
+        semantic = np.zeros(len(candidates), dtype=np.float32)
+        if query_vector is not None and self._store is not None and len(candidates):
+            store_rows = self._store_rows[candidates]
+            has_vector = store_rows >= 0
+            similarity = self._store.scores(query_vector)
+            semantic[has_vector] = np.clip(similarity[store_rows[has_vector]], 0, 1)
+        elif filters.search_term:
+            keep = text > 0
+            candidates, text, semantic = candidates[keep], text[keep], semantic[keep]
+
+        if len(candidates) == 0:
+            return []
+
+        # BM25 is unbounded: scale to [0, 1] within this candidate set
+        top_text = float(text.max())
+        if top_text > 0:
+            text = text / top_text
+
+        prices = self.prices[candidates]
+        budget = filters.max_price or float(np.nanmedian(prices)) or 1.0
+        price = np.nan_to_num(np.clip(1 - 0.5 * prices / budget, 0, 1))
+
+        rating = self.rating_scores[candidates]
+
+        w = self.weights
+        scores = w.semantic * semantic + w.text * text + w.price * price + w.rating * rating
+
+        top = self._top(scores, candidates, offset + k)[offset:]
+        return [
+            (int(self.ids[candidates[i]]), float(scores[i]), {
+                'semantic': float(semantic[i]),
+                'text': float(text[i]),
+                'price': float(price[i]),
+                'rating': float(rating[i]),
+            })
+            for i in top
+        ]
+
+    def _top(self, scores, candidates, n):
+        """Indices of the n best scores, best first (ties by SpaceID)"""
+        n = min(n, len(scores))
+        if n <= 0:
+            return np.empty(0, dtype=np.int64)
+        if n < len(scores):
+            # Everything tied with the n-th score stays in so ties break by id
+            threshold = np.partition(scores, len(scores) - n)[len(scores) - n]
+            pool = np.flatnonzero(scores >= threshold)
+        else:
+            pool = np.arange(len(scores))
+        order = np.lexsort((self.ids[candidates[pool]], -scores[pool]))
+        return pool[order[:n]]
+
+
+def _float(value, default=np.nan):
+    return float(value) if value is not None else default
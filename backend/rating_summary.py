@@ -0,0 +1,66 @@
+"""
+Materialized per-space rating aggregates (SpaceRatingSummary)
+
+Search and space detail read average rating, review count and the 1-5 star
+histogram from SpaceRatingSummary instead of joining Bookings -> Reviews on
+every request. Triggers on Reviews keep the summary current as reviews are
+created, edited or deleted (by this backend or server.js); this module
+creates those objects and rebuilds the summary in bulk.
+
+    python rating_summary.py init        # create table + triggers
+    python rating_summary.py backfill    # recompute every space from Reviews
+"""
+
+import argparse
+import time
+
+
+def backfill(repository, conn, batch_size=10_000, progress=None):
+    """Recompute SpaceRatingSummary for every space in SpaceID batches
+
+    Each batch is its own short transaction so a full rebuild never holds
+    locks on the whole table. Returns the number of summary rows written.
+    """
+    first, last = repository.space_id_range(conn)
+    if first is None:
+        return 0
+
+    written = 0
+    for start in range(first, last + 1, batch_size):
+        end = min(start + batch_size - 1, last)
+        rows = repository.rebuild_rating_summary(conn, start, end)
+        conn.commit()
+        written += max(rows, 0)
+        if progress:
+            progress(end, last, written)
+    return written
+
+
+def main():
+    # Imported here so the module stays usable without a configured app
+    from app import repository, get_db_connection
+
+    parser = argparse.ArgumentParser(description='Maintain SpaceRatingSummary')
+    parser.add_argument('command', choices=['init', 'backfill'])
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        if args.command == 'init':
+            repository.create_rating_summary(conn)
+            print('✓ SpaceRatingSummary table and triggers ready')
+            return
+
+        started = time.perf_counter()
+        written = backfill(
+            repository, conn, args.batch_size,
+            progress=lambda done, last, rows: print(f"  up to SpaceID {done}/{last}: {rows} rows")
+        )
+        print(f"✓ Rebuilt {written} summary rows in {time.perf_counter() - started:.1f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
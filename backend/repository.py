@@ -0,0 +1,922 @@
+"""
+Data-access layer for the Si'aa Flask backend
+
+All SQL for StorageSpaces, StorageProviders, StorageSeekers, SpaceFeatures,
+Bookings, Reviews and Payments lives here. Endpoints talk to a Repository and
+never build SQL themselves, so the same handlers run against Azure SQL
+(SqlServerRepository) or a local SQLite file (see sqlite_repository.py).
+
+Query methods take an open connection (from the pool) so several calls can
+share one transaction. Reads return the executed cursor; callers fetch from it.
+"""
+
+from collections import namedtuple
+
+
+# Normalized search filters; unset filters are None / ''
+SearchFilters = namedtuple('SearchFilters', [
+    'search_term',
+    'space_type',
+    'min_price',
+    'max_price',
+    'min_size',
+    'max_size',
+])
+
+
+# Average rating from the SpaceRatingSummary row joined as `rs`
+AVERAGE_RATING_SQL = (
+    "COALESCE(CAST(rs.RatingSum AS FLOAT) / NULLIF(rs.RatingCount, 0), 0)"
+)
+
+# SpaceFeatures columns written for new listings, in insert order
+FEATURE_COLUMNS = [
+    'Temperature', 'Humidity', 'ClimateControlled', 'SecuritySystem', 'CCTVMonitored',
+    'AccessType', 'ParkingAvailable', 'LoadingAssistance', 'Restrictions',
+]
+
+# Account tables and their keys, by user type
+USER_TABLES = {
+    'seeker': ('StorageSeekers', 'SeekerID'),
+    'provider': ('StorageProviders', 'ProviderID'),
+}
+
+# Bookings that still occupy their dates
+ACTIVE_BOOKING_SQL = "BookingStatus NOT IN ('Cancelled', 'Completed')"
+
+
+def _id_list(ids):
+    """Inlined integer list for IN (...); NULL when empty"""
+    return ', '.join(str(int(value)) for value in ids) or 'NULL'
+
+
+class Repository:
+    """SQL shared by every backend; dialect specifics are overridden below"""
+
+    name = 'base'
+    validate_query = 'SELECT 1'
+
+    # Multi-row inserts are split to stay under these per-statement limits
+    max_params = 999
+    max_values_rows = 500
+
+    def connect(self):
+        """Open a new DB-API connection"""
+        raise NotImplementedError
+
+    def replica(self, target):
+        """Repository connecting read-only to the read replica `target`"""
+        raise NotImplementedError
+
+    # -----------------------------------------
+    # Dialect hooks
+    # -----------------------------------------
+
+    def concat(self, *exprs):
+        """SQL expression concatenating string expressions"""
+        raise NotImplementedError
+
+    def now(self):
+        """SQL expression for the current timestamp"""
+        raise NotImplementedError
+
+    def insert_returning(self, table, columns, values, returning):
+        """INSERT statement that returns the `returning` columns of the new row"""
+        raise NotImplementedError
+
+    def limit(self, count):
+        """Clause appended after ORDER BY to return at most `count` rows"""
+        raise NotImplementedError
+
+    def insert_select_returning(self, table, columns, select, returning):
+        """INSERT ... SELECT statement returning the `returning` columns"""
+        raise NotImplementedError
+
+    def values_table(self, columns, row_count):
+        """Derived table `v` of `row_count` parameter rows with `columns`"""
+        raise NotImplementedError
+
+    def executemany(self, conn, sql, rows):
+        """Run `sql` once per row in as few round trips as the driver allows"""
+        cursor = conn.cursor()
+        cursor.executemany(sql, rows)
+
+    def create_rating_summary(self, conn):
+        """Create SpaceRatingSummary and the Reviews triggers maintaining it"""
+        raise NotImplementedError
+
+    # StorageSpaces.ChangeVersion as an integer, and the filter for spaces
+    # changed after a version (one `?`)
+    change_version_sql = 's.ChangeVersion'
+    changed_after_sql = 's.ChangeVersion > ?'
+
+    def create_change_version(self, conn):
+        """Add StorageSpaces.ChangeVersion, its index, and the triggers moving
+        it on writes to a space, its features, rating summary or provider"""
+        raise NotImplementedError
+
+    # -----------------------------------------
+    # StorageSeekers / StorageProviders
+    # -----------------------------------------
+
+    def find_user(self, conn, email):
+        """Account row (type, id, first, last, email, phone, password hash) for
+        `email`; a seeker wins when both tables have the address"""
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT 'seeker' AS UserType, SeekerID, FirstName, LastName, Email, PhoneNumber, Password
+            FROM StorageSeekers
+            WHERE Email = ?
+            UNION ALL
+            SELECT 'provider' AS UserType, ProviderID, FirstName, LastName, Email, PhoneNumber, Password
+            FROM StorageProviders
+            WHERE Email = ?
+            ORDER BY UserType DESC
+        """, (email, email))
+        return cursor.fetchone()
+
+    def password_hash(self, conn, user_type, user_id):
+        """Stored password hash of a seeker or provider, or None"""
+        table, key = USER_TABLES[user_type]
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT Password FROM {table} WHERE {key} = ?", (user_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def update_password(self, conn, user_type, user_id, password_hash):
+        """Store a new password hash for a seeker or provider"""
+        table, key = USER_TABLES[user_type]
+        cursor = conn.cursor()
+        cursor.execute(f"UPDATE {table} SET Password = ? WHERE {key} = ?", (password_hash, user_id))
+
+    # -----------------------------------------
+    # StorageSpaces / SpaceFeatures
+    # -----------------------------------------
+
+    def _search_where(self, filters, space_ids=None):
+        """WHERE clause and params shared by the search and count queries
+
+        `space_ids` restricts the result to those SpaceIDs (e.g. the spaces
+        text_index.TextIndex found for a search term, which callers then
+        clear from `filters` so no LIKE scan is added).
+        """
+        where = "WHERE s.IsAvailable = 1 AND s.Status = 'Active'"
+        params = []
+
+        if filters.space_type:
+            where += " AND s.SpaceType = ?"
+            params.append(filters.space_type)
+
+        if filters.min_price:
+            where += " AND s.PricePerMonth >= ?"
+            params.append(filters.min_price)
+
+        if filters.max_price:
+            where += " AND s.PricePerMonth <= ?"
+            params.append(filters.max_price)
+
+        if filters.min_size:
+            where += " AND s.Size >= ?"
+            params.append(filters.min_size)
+
+        if filters.max_size:
+            where += " AND s.Size <= ?"
+            params.append(filters.max_size)
+
+        if space_ids is not None:
+            # Inlined integers: candidate sets can exceed the driver's parameter limit
+            where += f" AND s.SpaceID IN ({_id_list(space_ids)})"
+
+        if filters.search_term:
+            where += " AND (s.Title LIKE ? OR s.Description LIKE ?)"
+            search_pattern = f"%{filters.search_term}%"
+            params.extend([search_pattern, search_pattern])
+
+        return where, params
+
+    def _search_select(self):
+        """SELECT ... FROM for rows in the search result shape"""
+        return f"""
+            SELECT
+                s.SpaceID,
+                s.Title,
+                s.Description,
+                s.SpaceType,
+                s.Size,
+                s.PricePerMonth,
+                s.PricePerWeek,
+                s.PricePerDay,
+                s.IsAvailable,
+                s.Status,
+                {self.concat('p.FirstName', "' '", 'p.LastName')} as ProviderName,
+                p.PhoneNumber as ProviderPhone,
+                {AVERAGE_RATING_SQL} as AverageRating,
+                COALESCE(rs.RatingCount, 0) as ReviewCount
+            FROM StorageSpaces s
+            JOIN StorageProviders p ON s.ProviderID = p.ProviderID
+            LEFT JOIN SpaceRatingSummary rs ON s.SpaceID = rs.SpaceID
+        """
+
+    def search_spaces(self, conn, filters, limit=None, after=None, space_ids=None):
+        """Execute the search query for `filters`; returns the cursor
+
+        Rows are ordered by (PricePerMonth, SpaceID). `after` is the
+        (PricePerMonth, SpaceID) of the last row already seen, so each page
+        seeks straight to its first row instead of skipping an OFFSET.
+        """
+        where, params = self._search_where(filters, space_ids)
+
+        if after is not None:
+            where += " AND (s.PricePerMonth > ? OR (s.PricePerMonth = ? AND s.SpaceID > ?))"
+            params.extend([after[0], after[0], after[1]])
+
+        query = f"""
+            {self._search_select()}
+            {where}
+            ORDER BY s.PricePerMonth ASC, s.SpaceID ASC
+        """
+
+        if limit is not None:
+            query += self.limit(limit)
+
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        return cursor
+
+    def spaces_by_ids(self, conn, space_ids):
+        """Execute a search-shaped query for available spaces in `space_ids`"""
+        placeholders = ', '.join('?' for _ in space_ids) or 'NULL'
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            {self._search_select()}
+            WHERE s.IsAvailable = 1 AND s.Status = 'Active'
+              AND s.SpaceID IN ({placeholders})
+        """, [int(space_id) for space_id in space_ids])
+        return cursor
+
+    def space_attributes(self, conn):
+        """Execute a scan of (SpaceID, SpaceType, PricePerMonth, Size,
+        IsAvailable, Status) for every space, used to build in-memory indexes"""
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT SpaceID, SpaceType, PricePerMonth, Size, IsAvailable, Status
+            FROM StorageSpaces
+        """)
+        return cursor
+
+    def ranking_features(self, conn):
+        """Execute a scan of (SpaceID, Title, Description, SpaceType,
+        PricePerMonth, Size, AverageRating, ReviewCount) for every searchable
+        space, used to build the relevance ranking snapshot"""
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT
+                s.SpaceID, s.Title, s.Description, s.SpaceType,
+                s.PricePerMonth, s.Size,
+                {AVERAGE_RATING_SQL} as AverageRating,
+                COALESCE(rs.RatingCount, 0) as ReviewCount
+            FROM StorageSpaces s
+            LEFT JOIN SpaceRatingSummary rs ON s.SpaceID = rs.SpaceID
+            WHERE s.IsAvailable = 1 AND s.Status = 'Active'
+        """)
+        return cursor
+
+    def space_texts_after(self, conn, after_space_id, limit):
+        """Up to `limit` (SpaceID, Title, SpaceType, Description) rows with
+        SpaceID > after_space_id, in SpaceID order (for chunked scans)"""
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT SpaceID, Title, SpaceType, Description
+            FROM StorageSpaces
+            WHERE SpaceID > ?
+            ORDER BY SpaceID
+            {self.limit(limit)}
+        """, (after_space_id,))
+        return cursor.fetchall()
+
+    def count_spaces_matching(self, conn, filters, space_ids=None):
+        """Number of spaces matching `filters`, ignoring pagination"""
+        where, params = self._search_where(filters, space_ids)
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT COUNT(*)
+            FROM StorageSpaces s
+            JOIN StorageProviders p ON s.ProviderID = p.ProviderID
+            {where}
+        """, params)
+        return cursor.fetchone()[0]
+
+    def _detail_select(self, extra_columns=''):
+        """SELECT ... FROM for rows in the space detail shape"""
+        return f"""
+            SELECT
+                -- Space basic info
+                s.SpaceID,
+                s.Title,
+                s.Description,
+                s.SpaceType,
+                s.Size,
+                s.PricePerMonth,
+                s.PricePerWeek,
+                s.PricePerDay,
+                s.IsAvailable,
+                s.Status,
+                s.FavoriteCount,
+
+                -- Features (from SpaceFeatures table)
+                f.FeatureID,
+                f.Temperature,
+                f.Humidity,
+                f.ClimateControlled,
+                f.SecuritySystem,
+                f.CCTVMonitored,
+                f.AccessType,
+                f.ParkingAvailable,
+                f.LoadingAssistance,
+                f.Restrictions,
+
+                -- Provider info
+                p.ProviderID,
+                {self.concat('p.FirstName', "' '", 'p.LastName')} as ProviderName,
+                p.PhoneNumber as ProviderPhone,
+                p.Email as ProviderEmail,
+
+                -- Rating summary (maintained by triggers on Reviews)
+                {AVERAGE_RATING_SQL} as AverageRating,
+                COALESCE(rs.RatingCount, 0) as ReviewCount,
+                COALESCE(rs.Rating1Count, 0) as Rating1Count,
+                COALESCE(rs.Rating2Count, 0) as Rating2Count,
+                COALESCE(rs.Rating3Count, 0) as Rating3Count,
+                COALESCE(rs.Rating4Count, 0) as Rating4Count,
+                COALESCE(rs.Rating5Count, 0) as Rating5Count
+                {extra_columns}
+
+            FROM StorageSpaces s
+            JOIN StorageProviders p ON s.ProviderID = p.ProviderID
+            LEFT JOIN SpaceFeatures f ON s.SpaceID = f.SpaceID
+            LEFT JOIN SpaceRatingSummary rs ON s.SpaceID = rs.SpaceID
+        """
+
+    def get_space(self, conn, space_id):
+        """Execute the space detail query (space, features, provider, rating)"""
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            {self._detail_select()}
+            WHERE s.SpaceID = ?
+        """, (space_id,))
+        return cursor
+
+    def get_space_status(self, conn, space_id):
+        """(IsAvailable, Status) for a space, or None if it does not exist"""
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT IsAvailable, Status
+            FROM StorageSpaces
+            WHERE SpaceID = ?
+        """, (space_id,))
+        return cursor.fetchone()
+
+    def count_spaces(self, conn):
+        """Total number of rows in StorageSpaces"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM StorageSpaces")
+        return cursor.fetchone()[0]
+
+    # -----------------------------------------
+    # Catalog snapshot (see catalog.py)
+    # -----------------------------------------
+
+    def catalog_version(self, conn):
+        """Highest ChangeVersion whose writes are all committed and visible"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(ChangeVersion), 0) FROM StorageSpaces")
+        return cursor.fetchone()[0]
+
+    def catalog_rows(self, conn, after_version=None):
+        """Execute a scan of every space in the detail shape plus its
+        ChangeVersion; only spaces changed after `after_version` if given"""
+        query = self._detail_select(f", {self.change_version_sql} as ChangeVersion")
+        params = []
+        if after_version is not None:
+            query += f" WHERE {self.changed_after_sql}"
+            params.append(after_version)
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        return cursor
+
+    # -----------------------------------------
+    # Reviews / SpaceRatingSummary
+    # -----------------------------------------
+
+    def space_id_range(self, conn):
+        """(min, max) SpaceID, or (None, None) when there are no spaces"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT MIN(SpaceID), MAX(SpaceID) FROM StorageSpaces")
+        return tuple(cursor.fetchone())
+
+    def rebuild_rating_summary(self, conn, first_space_id, last_space_id):
+        """Recompute summary rows for a SpaceID range from Reviews
+
+        Runs inside the caller's transaction; commit afterwards.
+        """
+        cursor = conn.cursor()
+        cursor.execute(
+            "DELETE FROM SpaceRatingSummary WHERE SpaceID BETWEEN ? AND ?",
+            (first_space_id, last_space_id)
+        )
+        cursor.execute(f"""
+            INSERT INTO SpaceRatingSummary (
+                SpaceID, RatingCount, RatingSum,
+                Rating1Count, Rating2Count, Rating3Count, Rating4Count, Rating5Count,
+                UpdatedAt
+            )
+            SELECT
+                b.SpaceID,
+                COUNT(*),
+                SUM(r.Rating),
+                SUM(CASE WHEN r.Rating = 1 THEN 1 ELSE 0 END),
+                SUM(CASE WHEN r.Rating = 2 THEN 1 ELSE 0 END),
+                SUM(CASE WHEN r.Rating = 3 THEN 1 ELSE 0 END),
+                SUM(CASE WHEN r.Rating = 4 THEN 1 ELSE 0 END),
+                SUM(CASE WHEN r.Rating = 5 THEN 1 ELSE 0 END),
+                {self.now()}
+            FROM Bookings b
+            JOIN Reviews r ON r.BookingID = b.BookingID
+            WHERE b.SpaceID BETWEEN ? AND ?
+            GROUP BY b.SpaceID
+        """, (first_space_id, last_space_id))
+        return cursor.rowcount
+
+    # -----------------------------------------
+    # Bookings / Payments
+    # -----------------------------------------
+
+    def active_bookings(self, conn, after_booking_id=0):
+        """Execute a scan of (BookingID, SpaceID, StartDate, EndDate,
+        BookingStatus) for active bookings with BookingID > after_booking_id"""
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT BookingID, SpaceID, StartDate, EndDate, BookingStatus
+            FROM Bookings
+            WHERE {ACTIVE_BOOKING_SQL} AND BookingID > ?
+            ORDER BY BookingID
+        """, (after_booking_id,))
+        return cursor
+
+    def booking_statuses(self, conn, booking_ids, chunk_size=1000):
+        """(BookingID, BookingStatus) rows for the bookings that exist"""
+        booking_ids = list(booking_ids)
+        cursor = conn.cursor()
+        rows = []
+        for i in range(0, len(booking_ids), chunk_size):
+            cursor.execute(f"""
+                SELECT BookingID, BookingStatus
+                FROM Bookings
+                WHERE BookingID IN ({_id_list(booking_ids[i:i + chunk_size])})
+            """)
+            rows.extend(cursor.fetchall())
+        return rows
+
+    def lock_spaces(self, conn, space_ids):
+        """Write-lock space rows until the transaction ends, serializing
+        concurrent bookings of them across processes
+
+        Takes update locks with a SELECT rather than a no-op UPDATE, which
+        would move the rows' ChangeVersion on every booking.
+        """
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT SpaceID
+            FROM StorageSpaces WITH (UPDLOCK, ROWLOCK)
+            WHERE SpaceID IN ({_id_list(space_ids)})
+        """)
+        cursor.fetchall()
+
+    def space_statuses(self, conn, space_ids):
+        """{SpaceID: (IsAvailable, Status)} for the spaces that exist"""
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT SpaceID, IsAvailable, Status
+            FROM StorageSpaces
+            WHERE SpaceID IN ({_id_list(space_ids)})
+        """)
+        return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+    def existing_ids(self, conn, table, id_column, ids):
+        """Subset of `ids` present in table.id_column (trusted identifiers only)"""
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {id_column} FROM {table} WHERE {id_column} IN ({_id_list(ids)})")
+        return {row[0] for row in cursor.fetchall()}
+
+    def active_bookings_for_spaces(self, conn, space_ids):
+        """(BookingID, SpaceID, StartDate, EndDate) of active bookings of `space_ids`"""
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT BookingID, SpaceID, StartDate, EndDate
+            FROM Bookings
+            WHERE {ACTIVE_BOOKING_SQL} AND SpaceID IN ({_id_list(space_ids)})
+        """)
+        return cursor.fetchall()
+
+    def insert_rows_returning_ids(self, conn, table, columns, rows, id_column, constants=None):
+        """Insert `rows` with multi-row INSERT ... SELECT statements; returns
+        the new identity values in row order
+
+        constants -- {column: SQL expression} added to every row
+        """
+        constants = constants or {}
+        per_statement = max(1, min(self.max_params // (len(columns) + 1), self.max_values_rows))
+        insert_columns = list(columns) + list(constants)
+        select_list = ', '.join([f'v.{column}' for column in columns] + list(constants.values()))
+
+        cursor = conn.cursor()
+        ids = []
+        for start in range(0, len(rows), per_statement):
+            chunk = rows[start:start + per_statement]
+            select = (
+                f"SELECT {select_list} "
+                f"FROM {self.values_table(list(columns) + ['RowNo'], len(chunk))} "
+                f"ORDER BY v.RowNo"
+            )
+            params = [value for row_no, row in enumerate(chunk) for value in (*row, row_no)]
+            cursor.execute(
+                self.insert_select_returning(table, insert_columns, select, [id_column]), params
+            )
+            # Identity values follow ORDER BY RowNo; OUTPUT / RETURNING order does not
+            ids.extend(sorted(row[0] for row in cursor.fetchall()))
+        return ids
+
+    def find_booking_conflict(self, conn, space_id, start_dt, end_dt):
+        """BookingID of an active booking overlapping [start_dt, end_dt), or None
+
+        Same-day bookings (EndDate = StartDate) occupy their start day.
+        """
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT BookingID
+            FROM Bookings
+            WHERE SpaceID = ? AND {ACTIVE_BOOKING_SQL}
+              AND StartDate < ? AND (EndDate > ? OR StartDate >= ?)
+        """, (int(space_id), end_dt, start_dt, start_dt))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def insert_booking(self, conn, space_id, seeker_id, start_dt, end_dt,
+                       rental_months, total_amount, platform_fee):
+        """Insert a Pending booking; returns (BookingID, StartDate, EndDate,
+        TotalAmount, BookingStatus) of the new row"""
+        cursor = conn.cursor()
+        cursor.execute(self.insert_returning(
+            'Bookings',
+            ['SpaceID', 'SeekerID', 'StartDate', 'EndDate', 'RentalDurationMonths',
+             'TotalAmount', 'PlatformFee', 'BookingStatus', 'CreatedAt'],
+            ['?', '?', '?', '?', '?', '?', '?', "'Pending'", self.now()],
+            ['BookingID', 'StartDate', 'EndDate', 'TotalAmount', 'BookingStatus'],
+        ), (
+            int(space_id),
+            int(seeker_id),
+            start_dt,
+            end_dt,
+            rental_months,
+            total_amount,
+            platform_fee
+        ))
+        return cursor.fetchone()
+
+    def insert_payment(self, conn, booking_id, amount, transaction_id,
+                       payment_status='Completed', payment_method='CreditCard',
+                       payment_gateway='Manual', currency='SAR'):
+        """Insert the payment row for a booking"""
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            INSERT INTO Payments (
+                BookingID,
+                PaymentType,
+                Amount,
+                Currency,
+                PaymentMethod,
+                PaymentStatus,
+                TransactionID,
+                PaymentGateway,
+                PaymentDate,
+                RefundAmount,
+                RefundDate,
+                RefundReason,
+                CreatedAt
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, {self.now()}, NULL, NULL, NULL, {self.now()})
+        """, (
+            int(booking_id),     # BookingID
+            'Booking',           # PaymentType
+            amount,              # Amount (DECIMAL)
+            currency,            # Currency
+            payment_method,      # PaymentMethod
+            payment_status,      # PaymentStatus
+            transaction_id,      # TransactionID
+            payment_gateway      # PaymentGateway (or 'Moyasar', 'Stripe', etc.)
+        ))
+
+    def insert_bookings(self, conn, items):
+        """Insert Pending bookings for bulk_ingest.BookingItem rows; returns
+        their BookingIDs in order"""
+        return self.insert_rows_returning_ids(
+            conn, 'Bookings',
+            ['SpaceID', 'SeekerID', 'StartDate', 'EndDate', 'RentalDurationMonths',
+             'TotalAmount', 'PlatformFee'],
+            [(item.space_id, item.seeker_id, item.start_dt.date(), item.end_dt.date(),
+              item.rental_months, item.total_amount, item.platform_fee) for item in items],
+            'BookingID',
+            constants={'BookingStatus': "'Pending'", 'CreatedAt': self.now()},
+        )
+
+    def insert_payments(self, conn, payments, payment_status='Completed',
+                        payment_method='CreditCard', payment_gateway='Manual', currency='SAR'):
+        """Insert one payment per (BookingID, amount, transaction_id)"""
+        self.executemany(conn, f"""
+            INSERT INTO Payments (
+                BookingID, PaymentType, Amount, Currency, PaymentMethod, PaymentStatus,
+                TransactionID, PaymentGateway, PaymentDate, CreatedAt
+            )
+            VALUES (?, 'Booking', ?, ?, ?, ?, ?, ?, {self.now()}, {self.now()})
+        """, [
+            (int(booking_id), amount, currency, payment_method, payment_status,
+             transaction_id, payment_gateway)
+            for booking_id, amount, transaction_id in payments
+        ])
+
+    def payment(self, conn, transaction_id):
+        """(BookingID, SpaceID, SeekerID, Amount, Currency, PaymentStatus,
+        BookingStatus) of a booking payment, or None"""
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT p.BookingID, b.SpaceID, b.SeekerID, p.Amount, p.Currency,
+                   p.PaymentStatus, b.BookingStatus
+            FROM Payments p
+            JOIN Bookings b ON b.BookingID = p.BookingID
+            WHERE p.TransactionID = ?
+        """, (transaction_id,))
+        return cursor.fetchone()
+
+    def pending_payments(self, conn):
+        """(TransactionID, BookingID, SpaceID, SeekerID, Amount, Currency) of
+        payments still waiting for capture"""
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT p.TransactionID, p.BookingID, b.SpaceID, b.SeekerID, p.Amount, p.Currency
+            FROM Payments p
+            JOIN Bookings b ON b.BookingID = p.BookingID
+            WHERE p.PaymentStatus = 'Pending' AND p.TransactionID IS NOT NULL
+        """)
+        return cursor.fetchall()
+
+    def set_payment_outcome(self, conn, transaction_id, payment_status, booking_status):
+        """Move a Pending payment to `payment_status` and its Pending booking to
+        `booking_status`; a no-op for payments already settled"""
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE Bookings SET BookingStatus = ?
+            WHERE BookingStatus = 'Pending' AND BookingID IN (
+                SELECT BookingID FROM Payments
+                WHERE TransactionID = ? AND PaymentStatus = 'Pending'
+            )
+        """, (booking_status, transaction_id))
+        cursor.execute(f"""
+            UPDATE Payments SET PaymentStatus = ?, PaymentDate = {self.now()}
+            WHERE TransactionID = ? AND PaymentStatus = 'Pending'
+        """, (payment_status, transaction_id))
+        return cursor.rowcount
+
+    # -----------------------------------------
+    # Listings
+    # -----------------------------------------
+
+    def insert_spaces(self, conn, items):
+        """Insert available listings with their SpaceFeatures rows for
+        bulk_ingest.ListingItem rows; returns the SpaceIDs in order"""
+        space_ids = self.insert_rows_returning_ids(
+            conn, 'StorageSpaces',
+            ['ProviderID', 'Title', 'Description', 'SpaceType', 'Size',
+             'PricePerMonth', 'PricePerWeek', 'PricePerDay'],
+            [(item.provider_id, item.title, item.description, item.space_type, item.size,
+              item.price_per_month, item.price_per_week, item.price_per_day) for item in items],
+            'SpaceID',
+            constants={'IsAvailable': '1', 'Status': "'Active'", 'CreatedAt': self.now()},
+        )
+        self.executemany(conn, f"""
+            INSERT INTO SpaceFeatures (SpaceID, {', '.join(FEATURE_COLUMNS)})
+            VALUES (?, {', '.join('?' for _ in FEATURE_COLUMNS)})
+        """, [(space_id, *item.features) for space_id, item in zip(space_ids, items)])
+        return space_ids
+
+
+class SqlServerRepository(Repository):
+    """Azure SQL / SQL Server through pyodbc"""
+
+    name = 'sqlserver'
+    max_params = 2000
+    max_values_rows = 1000
+
+    def __init__(self, config, query_timeout=0, login_timeout=0, read_only=False):
+        self.config = config
+        # Seconds; 0 waits forever (pyodbc's default)
+        self.query_timeout = query_timeout
+        self.login_timeout = login_timeout
+        self.read_only = read_only
+
+    def replica(self, target):
+        """`target` is a server name (a geo-replica, or the primary's own
+        name to reach Azure SQL's read scale-out secondary)"""
+        return SqlServerRepository({**self.config, 'server': target}, self.query_timeout,
+                                   self.login_timeout, read_only=True)
+
+    def connect(self):
+        import pyodbc
+
+        conn_str = (
+            f"DRIVER={self.config['driver']};"
+            f"SERVER={self.config['server']};"
+            f"DATABASE={self.config['database']};"
+            f"UID={self.config['username']};"
+            f"PWD={self.config['password']}"
+        )
+        if self.read_only:
+            # Routes to a readable secondary and rejects writes
+            conn_str += ";ApplicationIntent=ReadOnly"
+        conn = pyodbc.connect(conn_str, timeout=self.login_timeout)
+        # A statement running longer than this raises OperationalError (HYT00)
+        conn.timeout = self.query_timeout
+        return conn
+
+    def concat(self, *exprs):
+        return ' + '.join(exprs)
+
+    def now(self):
+        return 'SYSDATETIME()'
+
+    def insert_returning(self, table, columns, values, returning):
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"OUTPUT {', '.join('INSERTED.' + c for c in returning)} "
+            f"VALUES ({', '.join(values)})"
+        )
+
+    def limit(self, count):
+        return f" OFFSET 0 ROWS FETCH NEXT {int(count)} ROWS ONLY"
+
+    def insert_select_returning(self, table, columns, select, returning):
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"OUTPUT {', '.join('INSERTED.' + c for c in returning)} "
+            f"{select}"
+        )
+
+    def values_table(self, columns, row_count):
+        row = f"({', '.join('?' for _ in columns)})"
+        return f"(VALUES {', '.join([row] * row_count)}) AS v({', '.join(columns)})"
+
+    def executemany(self, conn, sql, rows):
+        cursor = conn.cursor()
+        # Sends the parameter array in one round trip instead of one per row
+        cursor.fast_executemany = True
+        cursor.executemany(sql, rows)
+
+    def create_rating_summary(self, conn):
+        cursor = conn.cursor()
+        # CREATE TRIGGER must be the only statement in its batch
+        for statement in SQLSERVER_RATING_SUMMARY_DDL:
+            cursor.execute(statement)
+        conn.commit()
+
+    # rowversion moves on every insert and update of the row by itself
+    change_version_sql = 'CAST(s.ChangeVersion AS BIGINT)'
+    changed_after_sql = 's.ChangeVersion > CAST(CAST(? AS BIGINT) AS BINARY(8))'
+
+    def catalog_version(self, conn):
+        # Versions at or above MIN_ACTIVE_ROWVERSION() may belong to open
+        # transactions that would commit behind a newer version
+        cursor = conn.cursor()
+        cursor.execute("SELECT CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) - 1")
+        return cursor.fetchone()[0]
+
+    def create_change_version(self, conn):
+        cursor = conn.cursor()
+        for statement in SQLSERVER_CHANGE_VERSION_DDL:
+            cursor.execute(statement)
+        conn.commit()
+
+
+SQLSERVER_RATING_SUMMARY_DDL = [
+    """
+    IF OBJECT_ID('dbo.SpaceRatingSummary', 'U') IS NULL
+    CREATE TABLE dbo.SpaceRatingSummary (
+        SpaceID         INT NOT NULL PRIMARY KEY,
+        RatingCount     INT NOT NULL DEFAULT 0,
+        RatingSum       INT NOT NULL DEFAULT 0,
+        Rating1Count    INT NOT NULL DEFAULT 0,
+        Rating2Count    INT NOT NULL DEFAULT 0,
+        Rating3Count    INT NOT NULL DEFAULT 0,
+        Rating4Count    INT NOT NULL DEFAULT 0,
+        Rating5Count    INT NOT NULL DEFAULT 0,
+        UpdatedAt       DATETIME2 NOT NULL DEFAULT SYSDATETIME()
+    )
+    """,
+    """
+    CREATE OR ALTER TRIGGER dbo.trg_Reviews_RatingSummary
+    ON dbo.Reviews
+    AFTER INSERT, UPDATE, DELETE
+    AS
+    BEGIN
+        SET NOCOUNT ON;
+
+        -- +1 for new/edited ratings, -1 for removed/replaced ones
+        WITH delta AS (
+            SELECT b.SpaceID, i.Rating, 1 AS Sign
+            FROM inserted i JOIN dbo.Bookings b ON b.BookingID = i.BookingID
+            UNION ALL
+            SELECT b.SpaceID, d.Rating, -1 AS Sign
+            FROM deleted d JOIN dbo.Bookings b ON b.BookingID = d.BookingID
+        ),
+        agg AS (
+            SELECT
+                SpaceID,
+                SUM(Sign) AS dCount,
+                SUM(Sign * Rating) AS dSum,
+                SUM(CASE WHEN Rating = 1 THEN Sign ELSE 0 END) AS d1,
+                SUM(CASE WHEN Rating = 2 THEN Sign ELSE 0 END) AS d2,
+                SUM(CASE WHEN Rating = 3 THEN Sign ELSE 0 END) AS d3,
+                SUM(CASE WHEN Rating = 4 THEN Sign ELSE 0 END) AS d4,
+                SUM(CASE WHEN Rating = 5 THEN Sign ELSE 0 END) AS d5
+            FROM delta
+            GROUP BY SpaceID
+        )
+        MERGE dbo.SpaceRatingSummary WITH (HOLDLOCK) AS t
+        USING agg AS a ON t.SpaceID = a.SpaceID
+        WHEN MATCHED THEN UPDATE SET
+            RatingCount  = t.RatingCount + a.dCount,
+            RatingSum    = t.RatingSum + a.dSum,
+            Rating1Count = t.Rating1Count + a.d1,
+            Rating2Count = t.Rating2Count + a.d2,
+            Rating3Count = t.Rating3Count + a.d3,
+            Rating4Count = t.Rating4Count + a.d4,
+            Rating5Count = t.Rating5Count + a.d5,
+            UpdatedAt    = SYSDATETIME()
+        WHEN NOT MATCHED THEN INSERT (
+            SpaceID, RatingCount, RatingSum,
+            Rating1Count, Rating2Count, Rating3Count, Rating4Count, Rating5Count
+        )
+        VALUES (a.SpaceID, a.dCount, a.dSum, a.d1, a.d2, a.d3, a.d4, a.d5);
+    END
+    """,
+]
+
+
+# Writes to the tables the catalog snapshot reads "touch" their spaces, so
+# the spaces' rowversion moves and the next refresh re-reads them
+SQLSERVER_CHANGE_VERSION_DDL = [
+    """
+    IF COL_LENGTH('dbo.StorageSpaces', 'ChangeVersion') IS NULL
+    ALTER TABLE dbo.StorageSpaces ADD ChangeVersion ROWVERSION
+    """,
+    """
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_StorageSpaces_ChangeVersion')
+    CREATE INDEX IX_StorageSpaces_ChangeVersion ON dbo.StorageSpaces (ChangeVersion)
+    """,
+    """
+    CREATE OR ALTER TRIGGER dbo.trg_SpaceFeatures_ChangeVersion
+    ON dbo.SpaceFeatures
+    AFTER INSERT, UPDATE, DELETE
+    AS
+    BEGIN
+        SET NOCOUNT ON;
+        UPDATE s SET Status = s.Status
+        FROM dbo.StorageSpaces s
+        WHERE s.SpaceID IN (SELECT SpaceID FROM inserted UNION SELECT SpaceID FROM deleted);
+    END
+    """,
+    """
+    CREATE OR ALTER TRIGGER dbo.trg_SpaceRatingSummary_ChangeVersion
+    ON dbo.SpaceRatingSummary
+    AFTER INSERT, UPDATE, DELETE
+    AS
+    BEGIN
+        SET NOCOUNT ON;
+        UPDATE s SET Status = s.Status
+        FROM dbo.StorageSpaces s
+        WHERE s.SpaceID IN (SELECT SpaceID FROM inserted UNION SELECT SpaceID FROM deleted);
+    END
+    """,
+    """
+    CREATE OR ALTER TRIGGER dbo.trg_StorageProviders_ChangeVersion
+    ON dbo.StorageProviders
+    AFTER UPDATE
+    AS
+    BEGIN
+        SET NOCOUNT ON;
+        -- Only the fields shown with a listing (not e.g. password upgrades)
+        IF UPDATE(FirstName) OR UPDATE(LastName) OR UPDATE(PhoneNumber) OR UPDATE(Email)
+            UPDATE s SET Status = s.Status
+            FROM dbo.StorageSpaces s
+            WHERE s.ProviderID IN (SELECT ProviderID FROM inserted);
+    END
+    """,
+]
@@ -0,0 +1,133 @@
+"""
+In-process cache for /api/spaces/search results
+
+search.js maps sizes into a few fixed bands, so identical searches are very
+common. Results are cached under the normalized filter tuple with an LRU bound
+and a TTL, and entries are dropped when a space they contain changes.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from repository import SearchFilters
+
+
+# Marker for entries that depend on every matching space (e.g. total counts)
+ANY_SPACE = '*'
+
+
+def _number(value):
+    # The search query ignores 0 / missing bounds, so both map to None
+    if not value:
+        return None
+    return round(float(value), 2)
+
+
+def normalize_filters(filters):
+    """Canonical SearchFilters so equivalent requests share a cache key"""
+    return SearchFilters(
+        search_term=' '.join((filters.search_term or '').lower().split()),
+        space_type=(filters.space_type or '').strip(),
+        min_price=_number(filters.min_price),
+        max_price=_number(filters.max_price),
+        min_size=_number(filters.min_size),
+        max_size=_number(filters.max_size),
+    )
+
+
+class SearchCache:
+    """Thread-safe LRU + TTL cache with per-space invalidation
+
+    Each entry remembers the SpaceIDs it contains so a change to one space
+    only evicts the result pages that show it.
+    """
+
+    def __init__(self, max_entries=1024, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expires_at, value, space_ids)
+        self._by_space = {}             # space_id -> set of keys
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Cached value for `key`, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, space_ids):
+        """Store `value`; `space_ids` are the spaces the value depends on"""
+        space_ids = frozenset(space_ids)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, space_ids)
+            for space_id in space_ids:
+                self._by_space.setdefault(space_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_spaces(self, space_ids):
+        """Drop every entry containing any of `space_ids`"""
+        with self._lock:
+            keys = set(self._by_space.get(ANY_SPACE, ()))
+            for space_id in space_ids:
+                keys |= self._by_space.get(space_id, set())
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def invalidate_all(self):
+        """Drop everything, e.g. when a new listing may match any search"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._by_space.clear()
+            self.invalidations += count
+            return count
+
+    def stats(self):
+        """Counters for health checks and metrics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'ttlSeconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+    def _remove(self, key):
+        _, _, space_ids = self._entries.pop(key)
+        for space_id in space_ids:
+            keys = self._by_space.get(space_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_space[space_id]
@@ -0,0 +1,179 @@
+"""
+Fast JSON serialization for API responses
+
+Search responses are mostly rows, and building them the obvious way costs a
+dict(zip(columns, row)) per row, a handful of key assignments, and a trip
+through json's Python `default` hook for every Decimal and datetime. This
+module removes that work:
+
+    RowShape      compiles, once per query shape, a function that turns a DB
+                  row straight into its response dict (one dict literal, with
+                  Decimal/date columns converted inline)
+    dumps()       encodes to UTF-8 bytes with orjson when it is installed,
+                  falling back to the standard library
+    FastJSONProvider
+                  Flask JSON provider using dumps(), so jsonify() writes bytes
+                  straight into the response body
+
+The wire format matches Flask's default provider: Decimal as a string and
+dates as RFC 822 strings.
+"""
+
+import dataclasses
+import json
+import threading
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Column value types converted inline by RowShape mappers
+CONVERTERS = {
+    Decimal: str,
+    datetime: http_date,
+    date: http_date,
+}
+
+# Compiled mappers kept per RowShape; shapes only vary by which columns are NULL
+MAX_COMPILED_SHAPES = 64
+
+
+def _default(value):
+    """Types the encoders do not handle natively, as in Flask's provider"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    # Dates go through _default so they keep Flask's RFC 822 format
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj, indent=False):
+        """UTF-8 JSON bytes for `obj`"""
+        options = _ORJSON_OPTIONS | orjson.OPT_INDENT_2 if indent else _ORJSON_OPTIONS
+        return orjson.dumps(obj, default=_default, option=options)
+else:
+    def dumps(obj, indent=False):
+        """UTF-8 JSON bytes for `obj`"""
+        if indent:
+            text = json.dumps(obj, default=_default, ensure_ascii=False, indent=2)
+        else:
+            text = json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':'))
+        return text.encode()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by dumps()"""
+
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(dumps(obj, indent) + b'\n', mimetype=self.mimetype)
+
+
+class _Derived:
+    __slots__ = ('fn', 'columns')
+
+    def __init__(self, fn, columns):
+        self.fn = fn
+        self.columns = columns
+
+
+def alias(name):
+    """RowShape extra copying another column's (converted) value"""
+    return _Derived(None, (name,))
+
+
+def derived(fn, *columns):
+    """RowShape extra computed by fn from the named columns' (converted) values"""
+    return _Derived(fn, columns)
+
+
+class RowShape:
+    """Row -> response dict mapper for one kind of query
+
+    extras -- {key: value} added after the columns of every row; a value is
+              a constant, alias(name) or derived(fn, *names)
+
+    mapper(columns, sample) compiles (and caches) a function for one cursor
+    description. Columns whose value in `sample` is a Decimal or a date are
+    converted inline; other rows of the same query may still carry such
+    values where the sample had NULL, and the encoder's fallback handles them.
+    """
+
+    def __init__(self, extras=None):
+        self.extras = dict(extras or {})
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def mapper(self, columns, sample=None):
+        """Function turning one row with `columns` into its response dict"""
+        converters = tuple(
+            CONVERTERS.get(type(value)) for value in sample
+        ) if sample is not None else (None,) * len(columns)
+        key = (tuple(columns), converters)
+        fn = self._compiled.get(key)
+        if fn is None:
+            fn = self._compile(columns, converters)
+            with self._lock:
+                if len(self._compiled) >= MAX_COMPILED_SHAPES:
+                    self._compiled.clear()
+                self._compiled[key] = fn
+        return fn
+
+    def map_rows(self, columns, rows):
+        """Response dicts for a list of rows"""
+        if not rows:
+            return []
+        to_dict = self.mapper(columns, rows[0])
+        return [to_dict(row) for row in rows]
+
+    def _compile(self, columns, converters):
+        namespace = {}
+        expressions = {}
+        for i, (name, convert) in enumerate(zip(columns, converters)):
+            if convert is None:
+                expressions[name] = f"row[{i}]"
+            else:
+                namespace[f"_c{i}"] = convert
+                expressions[name] = f"(None if row[{i}] is None else _c{i}(row[{i}]))"
+
+        items = [f"{name!r}: {expression}" for name, expression in expressions.items()]
+        for n, (key, value) in enumerate(self.extras.items()):
+            if isinstance(value, _Derived):
+                arguments = ', '.join(expressions[name] for name in value.columns)
+                if value.fn is None:
+                    items.append(f"{key!r}: {arguments}")
+                    continue
+                namespace[f"_d{n}"] = value.fn
+                items.append(f"{key!r}: _d{n}({arguments})")
+            else:
+                namespace[f"_k{n}"] = value
+                items.append(f"{key!r}: _k{n}")
+
+        source = "def to_dict(row):\n    return {" + ", ".join(items) + "}\n"
+        exec(source, namespace)
+        return namespace['to_dict']
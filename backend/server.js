@@ -47,6 +47,26 @@ const hashPassword = (password) => {
     return crypto.createHash('sha256').update(password).digest('hex');
 };
 
+const pbkdf2 = require('util').promisify(crypto.pbkdf2);
+
+// Check a password against a stored hash: salted PBKDF2 written by the Flask
+// backend ("pbkdf2_sha256$<iterations>$<salt>$<hash>") or a legacy SHA-256 digest
+const verifyPassword = async (password, stored) => {
+    if (!stored) {
+        return false;
+    }
+    let digest, expected;
+    if (stored.startsWith('pbkdf2_sha256$')) {
+        const [, iterations, salt, hash] = stored.split('$');
+        expected = Buffer.from(hash, 'base64');
+        digest = await pbkdf2(password, Buffer.from(salt, 'base64'), Number(iterations), expected.length, 'sha256');
+    } else {
+        expected = Buffer.from(stored.trim().toLowerCase());
+        digest = Buffer.from(hashPassword(password));
+    }
+    return digest.length === expected.length && crypto.timingSafeEqual(digest, expected);
+};
+
 // =============================================
 // AUTHENTICATION ENDPOINTS
 // =============================================
@@ -60,7 +80,6 @@ app.post('/api/auth/login', async (req, res) => {
             return res.status(400).json({ error: 'Email and password are required' });
         }
 
-        const hashedPassword = hashPassword(password);
         const pool = await poolPromise;
 
         let user = null;
@@ -77,17 +96,18 @@ app.post('/api/auth/login', async (req, res) => {
                     PhoneNumber,
                     AccountStatus,
                     IsVerified,
+                    Password,
                     'seeker' as UserType
                 FROM StorageSeekers
-                WHERE Email = @email AND Password = @password
+                WHERE Email = @email
             `;
 
             const seekerResult = await pool.request()
                 .input('email', sql.NVarChar, email)
-                .input('password', sql.NVarChar, hashedPassword)
                 .query(seekerQuery);
 
-            if (seekerResult.recordset.length > 0) {
+            if (seekerResult.recordset.length > 0
+                && await verifyPassword(password, seekerResult.recordset[0].Password)) {
                 user = seekerResult.recordset[0];
                 userType = 'seeker';
             }
@@ -108,17 +128,18 @@ app.post('/api/auth/login', async (req, res) => {
                         AccountStatus,
                         IsVerified,
                         BusinessName,
+                        Password,
                         'provider' as UserType
                     FROM StorageProviders
-                    WHERE Email = @email AND Password = @password
+                    WHERE Email = @email
                 `;
 
                 const providerResult = await pool.request()
                     .input('email', sql.NVarChar, email)
-                    .input('password', sql.NVarChar, hashedPassword)
                     .query(providerQuery);
 
-                if (providerResult.recordset.length > 0) {
+                if (providerResult.recordset.length > 0
+                    && await verifyPassword(password, providerResult.recordset[0].Password)) {
                     user = providerResult.recordset[0];
                     userType = 'provider';
                 }
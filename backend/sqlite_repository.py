@@ -0,0 +1,417 @@
+"""
+Embedded SQLite backend for local load testing and benchmarking
+
+Mirrors the Azure SQL schema closely enough for the Flask endpoints to run
+unchanged. Populate a database with generate_sample_db.py and start the
+backend with SIAA_DB_BACKEND=sqlite.
+"""
+
+import pathlib
+import sqlite3
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from repository import Repository
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS StorageSeekers (
+    SeekerID        INTEGER PRIMARY KEY,
+    FirstName       TEXT NOT NULL,
+    LastName        TEXT NOT NULL,
+    Email           TEXT NOT NULL UNIQUE,
+    PhoneNumber     TEXT,
+    Password        TEXT NOT NULL,
+    NationalID      TEXT,
+    AccountStatus   TEXT DEFAULT 'Active',
+    CreatedAt       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS StorageProviders (
+    ProviderID      INTEGER PRIMARY KEY,
+    FirstName       TEXT NOT NULL,
+    LastName        TEXT NOT NULL,
+    Email           TEXT NOT NULL UNIQUE,
+    PhoneNumber     TEXT,
+    Password        TEXT NOT NULL,
+    NationalID      TEXT,
+    CompanyName     TEXT,
+    AccountStatus   TEXT DEFAULT 'Active',
+    CreatedAt       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS StorageSpaces (
+    SpaceID         INTEGER PRIMARY KEY,
+    ProviderID      INTEGER NOT NULL REFERENCES StorageProviders(ProviderID),
+    Title           TEXT NOT NULL,
+    Description     TEXT,
+    SpaceType       TEXT,
+    Size            REAL,
+    PricePerMonth   REAL,
+    PricePerWeek    REAL,
+    PricePerDay     REAL,
+    IsAvailable     INTEGER NOT NULL DEFAULT 1,
+    Status          TEXT NOT NULL DEFAULT 'Active',
+    FavoriteCount   INTEGER NOT NULL DEFAULT 0,
+    CreatedAt       TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    ChangeVersion   INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS SpaceFeatures (
+    FeatureID           INTEGER PRIMARY KEY,
+    SpaceID             INTEGER NOT NULL REFERENCES StorageSpaces(SpaceID),
+    Temperature         TEXT,
+    Humidity            TEXT,
+    ClimateControlled   INTEGER NOT NULL DEFAULT 0,
+    SecuritySystem      INTEGER NOT NULL DEFAULT 0,
+    CCTVMonitored       INTEGER NOT NULL DEFAULT 0,
+    AccessType          TEXT,
+    ParkingAvailable    INTEGER NOT NULL DEFAULT 0,
+    LoadingAssistance   INTEGER NOT NULL DEFAULT 0,
+    Restrictions        TEXT
+);
+
+CREATE TABLE IF NOT EXISTS Bookings (
+    BookingID               INTEGER PRIMARY KEY,
+    SpaceID                 INTEGER NOT NULL REFERENCES StorageSpaces(SpaceID),
+    SeekerID                INTEGER NOT NULL REFERENCES StorageSeekers(SeekerID),
+    StartDate               DATE NOT NULL,
+    EndDate                 DATE NOT NULL,
+    RentalDurationMonths    REAL,
+    TotalAmount             REAL,
+    PlatformFee             REAL,
+    BookingStatus           TEXT NOT NULL DEFAULT 'Pending',
+    CreatedAt               TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS Reviews (
+    ReviewID            INTEGER PRIMARY KEY,
+    BookingID           INTEGER NOT NULL REFERENCES Bookings(BookingID),
+    ReviewerSeekerID    INTEGER REFERENCES StorageSeekers(SeekerID),
+    Rating              INTEGER NOT NULL,
+    Comment             TEXT,
+    CreatedAt           TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UpdatedAt           TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS Payments (
+    PaymentID       INTEGER PRIMARY KEY,
+    BookingID       INTEGER NOT NULL REFERENCES Bookings(BookingID),
+    PaymentType     TEXT,
+    Amount          REAL,
+    Currency        TEXT,
+    PaymentMethod   TEXT,
+    PaymentStatus   TEXT,
+    TransactionID   TEXT,
+    PaymentGateway  TEXT,
+    PaymentDate     TIMESTAMP,
+    RefundAmount    REAL,
+    RefundDate      TIMESTAMP,
+    RefundReason    TEXT,
+    CreatedAt       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS SpaceRatingSummary (
+    SpaceID         INTEGER PRIMARY KEY,
+    RatingCount     INTEGER NOT NULL DEFAULT 0,
+    RatingSum       INTEGER NOT NULL DEFAULT 0,
+    Rating1Count    INTEGER NOT NULL DEFAULT 0,
+    Rating2Count    INTEGER NOT NULL DEFAULT 0,
+    Rating3Count    INTEGER NOT NULL DEFAULT 0,
+    Rating4Count    INTEGER NOT NULL DEFAULT 0,
+    Rating5Count    INTEGER NOT NULL DEFAULT 0,
+    UpdatedAt       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Same indexes the production database relies on for these access paths
+INDEXES = """
+CREATE INDEX IF NOT EXISTS IX_StorageSpaces_Search
+    ON StorageSpaces (IsAvailable, Status, PricePerMonth, SpaceID);
+CREATE INDEX IF NOT EXISTS IX_StorageSpaces_Provider ON StorageSpaces (ProviderID);
+CREATE INDEX IF NOT EXISTS IX_StorageSpaces_ChangeVersion ON StorageSpaces (ChangeVersion);
+CREATE INDEX IF NOT EXISTS IX_SpaceFeatures_Space ON SpaceFeatures (SpaceID);
+CREATE INDEX IF NOT EXISTS IX_Bookings_Space ON Bookings (SpaceID);
+CREATE INDEX IF NOT EXISTS IX_Reviews_Booking ON Reviews (BookingID);
+CREATE INDEX IF NOT EXISTS IX_Payments_Booking ON Payments (BookingID);
+CREATE INDEX IF NOT EXISTS IX_Payments_Transaction ON Payments (TransactionID);
+"""
+
+
+
+def _rating_delta_sql(row, sign):
+    """Upsert adding `sign` x the rating of trigger row NEW/OLD to its space"""
+    buckets = ', '.join(f"{sign} * ({row}.Rating = {n})" for n in range(1, 6))
+    return f"""
+    INSERT INTO SpaceRatingSummary (
+        SpaceID, RatingCount, RatingSum,
+        Rating1Count, Rating2Count, Rating3Count, Rating4Count, Rating5Count
+    )
+    SELECT b.SpaceID, {sign}, {sign} * {row}.Rating, {buckets}
+    FROM Bookings b WHERE b.BookingID = {row}.BookingID
+    ON CONFLICT(SpaceID) DO UPDATE SET
+        RatingCount  = RatingCount + excluded.RatingCount,
+        RatingSum    = RatingSum + excluded.RatingSum,
+        Rating1Count = Rating1Count + excluded.Rating1Count,
+        Rating2Count = Rating2Count + excluded.Rating2Count,
+        Rating3Count = Rating3Count + excluded.Rating3Count,
+        Rating4Count = Rating4Count + excluded.Rating4Count,
+        Rating5Count = Rating5Count + excluded.Rating5Count,
+        UpdatedAt    = CURRENT_TIMESTAMP;
+    """
+
+
+# Keep SpaceRatingSummary in step with every write to Reviews
+TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS trg_Reviews_RatingSummary_Insert
+AFTER INSERT ON Reviews
+BEGIN
+    {_rating_delta_sql('NEW', 1)}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_Reviews_RatingSummary_Update
+AFTER UPDATE OF Rating, BookingID ON Reviews
+BEGIN
+    {_rating_delta_sql('OLD', -1)}
+    {_rating_delta_sql('NEW', 1)}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_Reviews_RatingSummary_Delete
+AFTER DELETE ON Reviews
+BEGIN
+    {_rating_delta_sql('OLD', -1)}
+END;
+"""
+
+
+def _touch_spaces_sql(where):
+    """Move ChangeVersion on for the spaces matching `where`"""
+    return f"""
+    UPDATE StorageSpaces
+    SET ChangeVersion = (SELECT MAX(ChangeVersion) FROM StorageSpaces) + 1
+    WHERE {where};
+    """
+
+
+# Move StorageSpaces.ChangeVersion on for every write the catalog snapshot
+# must see: the space row itself, its features, its rating summary and its
+# provider's display fields. Writers are serialized, so versions follow
+# commit order.
+CHANGE_VERSION_TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS trg_StorageSpaces_ChangeVersion_Insert
+AFTER INSERT ON StorageSpaces
+BEGIN
+    {_touch_spaces_sql('SpaceID = NEW.SpaceID')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_StorageSpaces_ChangeVersion_Update
+AFTER UPDATE ON StorageSpaces
+WHEN NEW.ChangeVersion = OLD.ChangeVersion
+BEGIN
+    {_touch_spaces_sql('SpaceID = NEW.SpaceID')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_SpaceFeatures_ChangeVersion_Insert
+AFTER INSERT ON SpaceFeatures
+BEGIN
+    {_touch_spaces_sql('SpaceID = NEW.SpaceID')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_SpaceFeatures_ChangeVersion_Update
+AFTER UPDATE ON SpaceFeatures
+BEGIN
+    {_touch_spaces_sql('SpaceID IN (OLD.SpaceID, NEW.SpaceID)')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_SpaceFeatures_ChangeVersion_Delete
+AFTER DELETE ON SpaceFeatures
+BEGIN
+    {_touch_spaces_sql('SpaceID = OLD.SpaceID')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_SpaceRatingSummary_ChangeVersion_Insert
+AFTER INSERT ON SpaceRatingSummary
+BEGIN
+    {_touch_spaces_sql('SpaceID = NEW.SpaceID')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_SpaceRatingSummary_ChangeVersion_Update
+AFTER UPDATE ON SpaceRatingSummary
+BEGIN
+    {_touch_spaces_sql('SpaceID = NEW.SpaceID')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_StorageProviders_ChangeVersion
+AFTER UPDATE OF FirstName, LastName, PhoneNumber, Email ON StorageProviders
+BEGIN
+    {_touch_spaces_sql('ProviderID = NEW.ProviderID')}
+END;
+"""
+
+
+def _convert_date(value):
+    return datetime.fromisoformat(value.decode()).date()
+
+
+def _convert_timestamp(value):
+    return datetime.fromisoformat(value.decode())
+
+
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('DATE', _convert_date)
+sqlite3.register_converter('TIMESTAMP', _convert_timestamp)
+
+
+def add_change_version(conn):
+    """Add StorageSpaces.ChangeVersion to a database created without it"""
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(StorageSpaces)')}
+    if 'ChangeVersion' not in columns:
+        conn.execute('ALTER TABLE StorageSpaces ADD COLUMN ChangeVersion INTEGER NOT NULL DEFAULT 0')
+    conn.execute('CREATE INDEX IF NOT EXISTS IX_StorageSpaces_ChangeVersion ON StorageSpaces (ChangeVersion)')
+
+
+def create_schema(conn, indexes=True):
+    """Create the Si'aa tables, triggers and (optionally) indexes if missing"""
+    conn.executescript(SCHEMA)
+    add_change_version(conn)
+    conn.executescript(TRIGGERS)
+    conn.executescript(CHANGE_VERSION_TRIGGERS)
+    if indexes:
+        conn.executescript(INDEXES)
+    conn.commit()
+
+
+class _TimedCursor(sqlite3.Cursor):
+    def execute(self, *args):
+        self.connection.start_statement()
+        return super().execute(*args)
+
+    def executemany(self, *args):
+        self.connection.start_statement()
+        return super().executemany(*args)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection that interrupts a statement (including fetching its
+    rows) once it has run for `query_timeout` seconds; SQLite has no
+    statement timeout of its own. The statement fails with
+    sqlite3.OperationalError('interrupted')."""
+
+    query_timeout = 0
+    _deadline = None
+
+    def start_statement(self):
+        if self.query_timeout:
+            self._deadline = time.monotonic() + self.query_timeout
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or _TimedCursor)
+
+    def execute(self, *args):
+        self.start_statement()
+        return super().execute(*args)
+
+    def executemany(self, *args):
+        self.start_statement()
+        return super().executemany(*args)
+
+    def set_query_timeout(self, seconds):
+        self.query_timeout = seconds
+        # Checked every few thousand VM instructions; a true return interrupts
+        self.set_progress_handler(self._past_deadline if seconds else None, 10000)
+
+    def _past_deadline(self):
+        return self._deadline is not None and time.monotonic() > self._deadline
+
+
+class SqliteRepository(Repository):
+    """Local SQLite file; one connection per pool slot
+
+    query_timeout -- seconds a statement may run before it is interrupted
+                     (0 = no limit)
+    """
+
+    name = 'sqlite'
+    # SQLITE_MAX_VARIABLE_NUMBER was raised from 999 in 3.32
+    max_params = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+    def __init__(self, path, read_only=False, query_timeout=0):
+        self.path = path
+        self.read_only = read_only
+        self.query_timeout = query_timeout
+
+    def replica(self, target):
+        """`target` is the path of a copy of the database (a local stand-in
+        for a replica), opened read-only"""
+        return SqliteRepository(target, read_only=True, query_timeout=self.query_timeout)
+
+    def connect(self):
+        if self.read_only:
+            # mode=ro also fails fast when the file is missing
+            conn = sqlite3.connect(
+                f"{pathlib.Path(self.path).absolute().as_uri()}?mode=ro", uri=True,
+                detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False, timeout=30,
+                factory=TimedConnection,
+            )
+            conn.set_query_timeout(self.query_timeout)
+            conn.execute('PRAGMA query_only=ON')
+            return conn
+        conn = sqlite3.connect(
+            self.path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,  # connections move between pool users
+            timeout=30,
+            factory=TimedConnection,
+        )
+        conn.set_query_timeout(self.query_timeout)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+
+    def concat(self, *exprs):
+        return ' || '.join(exprs)
+
+    def now(self):
+        return 'CURRENT_TIMESTAMP'
+
+    def insert_returning(self, table, columns, values, returning):
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(values)}) "
+            f"RETURNING {', '.join(returning)}"
+        )
+
+    def limit(self, count):
+        return f" LIMIT {int(count)}"
+
+    def insert_select_returning(self, table, columns, select, returning):
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"{select} "
+            f"RETURNING {', '.join(returning)}"
+        )
+
+    def values_table(self, columns, row_count):
+        # SQLite cannot name the columns of a VALUES list, so use SELECTs
+        first = 'SELECT ' + ', '.join(f'? AS {column}' for column in columns)
+        rest = ' UNION ALL SELECT ' + ', '.join('?' for _ in columns)
+        return f"({first}{rest * (row_count - 1)}) AS v"
+
+    def lock_spaces(self, conn, space_ids):
+        # SQLite has no row locks; take the database write lock now
+        if not conn.in_transaction:
+            conn.execute('BEGIN IMMEDIATE')
+
+    def create_rating_summary(self, conn):
+        conn.executescript(SCHEMA)
+        conn.executescript(TRIGGERS)
+        conn.commit()
+
+    def create_change_version(self, conn):
+        add_change_version(conn)
+        conn.executescript(CHANGE_VERSION_TRIGGERS)
+        conn.commit()
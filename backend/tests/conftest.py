@@ -0,0 +1,51 @@
+"""
+Shared fixtures: a small generated SQLite database, and app.py configured
+against it (with one read replica, a copy of the database taken at startup)
+
+    cd backend && python -m pytest tests
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from generate_sample_db import generate  # noqa: E402
+
+SPACES = 300
+
+# app.py reads its configuration when it is imported
+_workdir = tempfile.mkdtemp(prefix='siaa-tests-')
+PRIMARY_PATH = os.path.join(_workdir, 'primary.db')
+REPLICA_PATH = os.path.join(_workdir, 'replica.db')
+generate(PRIMARY_PATH, SPACES)
+shutil.copyfile(PRIMARY_PATH, REPLICA_PATH)
+
+os.environ.update({
+    'SIAA_DB_BACKEND': 'sqlite',
+    'SIAA_SQLITE_PATH': PRIMARY_PATH,
+    'SIAA_READ_REPLICAS': REPLICA_PATH,
+    'SIAA_EMBEDDINGS': os.path.join(_workdir, 'no-embeddings'),
+    'SIAA_JOB_QUEUE_PATH': os.path.join(_workdir, 'jobs.db'),
+    'SIAA_JOB_WORKERS': '0',
+    'SIAA_RATE_LIMITS': '',
+    'SIAA_PASSWORD_ITERATIONS': '1000',
+})
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    import app
+    yield app
+    app.db_router.close()
+    shutil.rmtree(_workdir, ignore_errors=True)
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, RateLimiter, Rejected
+
+PRIORITIES = {'booking': 0, 'login': 1, 'search': 2, 'bulk': 3}
+
+
+def _controller(capacity=1, limits=None, **kwargs):
+    limits = limits or dict.fromkeys(PRIORITIES, capacity)
+    return AdmissionController(capacity, limits, PRIORITIES, **kwargs)
+
+
+def _wait_until_queued(controller, traffic_class, count=1):
+    deadline = time.monotonic() + 5
+    while controller.stats()['waiting'][traffic_class] < count:
+        assert time.monotonic() < deadline, 'request never queued'
+        time.sleep(0.005)
+
+
+def _start(controller, traffic_class, admitted):
+    def run():
+        controller.acquire(traffic_class)
+        admitted.append(traffic_class)
+        controller.release(traffic_class)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    _wait_until_queued(controller, traffic_class)
+    return thread
+
+
+def test_waiting_requests_are_admitted_in_priority_order():
+    controller = _controller(max_wait=5)
+    controller.acquire('bulk')
+    admitted = []
+    threads = [_start(controller, name, admitted) for name in ('search', 'bulk', 'booking', 'login')]
+
+    controller.release('bulk')
+    for thread in threads:
+        thread.join(5)
+    assert admitted == ['booking', 'login', 'search', 'bulk']
+
+
+def test_class_at_its_limit_does_not_block_others():
+    controller = _controller(capacity=2, limits={**dict.fromkeys(PRIORITIES, 2), 'search': 1},
+                             max_wait=5)
+    controller.acquire('search')
+    controller.acquire('booking')
+    admitted = []
+    search = _start(controller, 'search', admitted)
+    login = _start(controller, 'login', admitted)
+
+    # The booking slot frees up: search is at its limit, so login gets it
+    controller.release('booking')
+    login.join(5)
+    assert admitted == ['login']
+    controller.release('search')
+    search.join(5)
+    assert admitted == ['login', 'search']
+
+
+def test_request_waiting_past_max_wait_is_shed():
+    controller = _controller(max_wait=0.05)
+    controller.acquire('booking')
+    with pytest.raises(Rejected) as excinfo:
+        controller.acquire('search')
+    assert (excinfo.value.status, excinfo.value.reason) == (503, 'timeout')
+    assert controller.stats()['waiting']['search'] == 0
+    assert controller.stats()['rejected']['search']['timeout'] == 1
+
+
+def test_full_queue_rejects_new_arrivals():
+    controller = _controller(max_wait=5, max_queue=1)
+    controller.acquire('booking')
+    admitted = []
+    queued = _start(controller, 'search', admitted)
+    with pytest.raises(Rejected) as excinfo:
+        controller.acquire('login')
+    assert excinfo.value.reason == 'queue_full'
+    controller.release('booking')
+    queued.join(5)
+    assert admitted == ['search']
+
+
+def test_overloaded_class_is_shed_at_once():
+    controller = _controller(max_wait=5, shed_wait=0.01)
+    controller.acquire('booking')
+    admitted = []
+    slow = _start(controller, 'search', admitted)
+    time.sleep(0.05)
+    controller.release('booking')
+    slow.join(5)
+    assert controller.stats()['lastWaitMs']['search'] > 10
+
+    # The last search waited longer than shed_wait: a search that would queue
+    # behind another waiting search is rejected without waiting
+    controller.acquire('booking')
+    queued = _start(controller, 'search', admitted)
+    started = time.monotonic()
+    with pytest.raises(Rejected) as excinfo:
+        controller.acquire('search')
+    assert excinfo.value.reason == 'overloaded'
+    assert time.monotonic() - started < 1
+    controller.release('booking')
+    queued.join(5)
+    assert admitted == ['search', 'search']
+
+
+def test_rate_limiter_rejects_a_client_over_its_burst():
+    limiter = RateLimiter({'login': (1.0, 2.0)})
+    limiter.check('10.0.0.1', 'login')
+    limiter.check('10.0.0.1', 'login')
+    with pytest.raises(Rejected) as excinfo:
+        limiter.check('10.0.0.1', 'login')
+    assert excinfo.value.status == 429
+    limiter.check('10.0.0.2', 'login')
+    limiter.check('10.0.0.1', 'search')
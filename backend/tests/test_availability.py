@@ -0,0 +1,107 @@
+import sqlite3
+from datetime import date
+
+from availability import AvailabilityIndex
+from conftest import PRIMARY_PATH
+
+START, END = date(2031, 3, 1), date(2031, 3, 10)
+
+
+def test_refresh_rereads_unsettled_booking_ids():
+    table = [(1, 10, START, END)]
+    index = AvailabilityIndex.from_rows(table, settle_time=60)
+    # This process books BookingID 3 while another one still holds 2 uncommitted
+    hold = index.reserve(11, START, END)
+    index.confirm(hold, 3)
+    table.append((3, 11, START, END))
+
+    index.apply_scan([row for row in table if row[0] > index.scan_after()])
+    table.append((2, 12, START, END))
+    index.apply_scan([row for row in table if row[0] > index.scan_after()])
+
+    assert not index.is_free(12, START, END)
+
+
+def test_watermark_advances_once_settled():
+    index = AvailabilityIndex.from_rows([(5, 10, START, END)], settle_time=0)
+    assert index.scan_after() == 5
+    index.confirm(index.reserve(11, START, END), 9)
+    # Local confirms never move the watermark
+    assert index.scan_after() == 5
+    index.apply_scan([(7, 12, START, END)])
+    assert index.scan_after() == 7
+
+
+def _insert_booking(booking_id, space_id):
+    with sqlite3.connect(PRIMARY_PATH) as conn:
+        conn.execute("""
+            INSERT INTO Bookings (BookingID, SpaceID, SeekerID, StartDate, EndDate, BookingStatus)
+            VALUES (?, ?, 1, ?, ?, 'Confirmed')
+        """, (booking_id, space_id, START.isoformat(), END.isoformat()))
+
+
+def test_lower_booking_id_committed_late(app_module, monkeypatch):
+    availability = app_module.get_availability()
+    with sqlite3.connect(PRIMARY_PATH) as conn:
+        highest = conn.execute("SELECT MAX(BookingID) FROM Bookings").fetchone()[0]
+    local_space, late_space = [
+        space_id for space_id in range(1, 50) if availability.is_free(space_id, START, END)
+    ][:2]
+
+    def refresh():
+        monkeypatch.setattr(app_module, '_availability_checked', 0.0)
+        return app_module.get_availability()
+
+    try:
+        # This worker confirms highest + 2 while highest + 1 is still uncommitted elsewhere
+        _insert_booking(highest + 2, local_space)
+        availability.confirm(availability.reserve(local_space, START, END), highest + 2)
+        refresh()
+        _insert_booking(highest + 1, late_space)
+        assert not refresh().is_free(late_space, START, END)
+    finally:
+        with sqlite3.connect(PRIMARY_PATH) as conn:
+            conn.execute("DELETE FROM Bookings WHERE BookingID > ?", (highest,))
+        for booking_id in (highest + 1, highest + 2):
+            availability.remove_booking(booking_id)
+
+
+def test_pending_booking_cancelled_elsewhere_is_dropped():
+    index = AvailabilityIndex.from_rows([(1, 10, START, END, 'Pending'), (2, 11, START, END, 'Confirmed')])
+    assert index.pending_bookings() == [1]
+    index.apply_statuses([1], [(1, 'Cancelled')])
+    assert index.is_free(10, START, END)
+    assert not index.is_free(11, START, END)
+    assert index.pending_bookings() == []
+
+
+def test_confirmed_booking_is_no_longer_rechecked():
+    index = AvailabilityIndex.from_rows([(1, 10, START, END, 'Pending')])
+    index.apply_statuses([1], [(1, 'Confirmed')])
+    assert index.pending_bookings() == []
+    assert not index.is_free(10, START, END)
+
+
+def test_refresh_drops_bookings_cancelled_by_another_process(app_module, monkeypatch):
+    with sqlite3.connect(PRIMARY_PATH) as conn:
+        booking_id, space_id, start, end = conn.execute("""
+            SELECT BookingID, SpaceID, StartDate, EndDate FROM Bookings b
+            WHERE BookingStatus = 'Pending'
+              AND NOT EXISTS (SELECT 1 FROM Bookings o
+                              WHERE o.SpaceID = b.SpaceID AND o.BookingID <> b.BookingID
+                                AND o.BookingStatus NOT IN ('Cancelled', 'Completed'))
+            LIMIT 1
+        """).fetchone()
+    assert not app_module.get_availability().is_free(space_id, start, end)
+
+    with sqlite3.connect(PRIMARY_PATH) as conn:
+        conn.execute("UPDATE Bookings SET BookingStatus = 'Cancelled' WHERE BookingID = ?", (booking_id,))
+    try:
+        monkeypatch.setattr(app_module, '_availability_checked', 0.0)
+        assert app_module.get_availability().is_free(space_id, start, end)
+    finally:
+        with sqlite3.connect(PRIMARY_PATH) as conn:
+            conn.execute("UPDATE Bookings SET BookingStatus = 'Pending' WHERE BookingID = ?", (booking_id,))
+        monkeypatch.setattr(app_module, '_availability_checked', 0.0)
+        monkeypatch.setattr(app_module, '_availability_loaded', 0.0)
+        app_module.get_availability()
@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+
+from conftest import PRIMARY_PATH
+
+
+def _change_version(space_id):
+    with sqlite3.connect(PRIMARY_PATH) as conn:
+        return conn.execute(
+            "SELECT ChangeVersion FROM StorageSpaces WHERE SpaceID = ?", (space_id,)
+        ).fetchone()[0]
+
+
+def test_booking_does_not_move_the_space_change_version(app_module, client):
+    with sqlite3.connect(PRIMARY_PATH) as conn:
+        space_id = conn.execute(
+            "SELECT MAX(SpaceID) FROM StorageSpaces WHERE IsAvailable = 1 AND Status = 'Active'"
+        ).fetchone()[0]
+    version = _change_version(space_id)
+
+    response = client.post('/api/bookings', json={
+        'seekerId': 1,
+        'spaceId': space_id,
+        'startDate': '2033-02-01',
+        'endDate': '2033-02-10',
+        'totalAmount': 100,
+    })
+    assert response.status_code == 201, response.get_json()
+    booking_id = response.get_json()['booking']['bookingId']
+    try:
+        assert _change_version(space_id) == version
+    finally:
+        with sqlite3.connect(PRIMARY_PATH) as conn:
+            conn.execute("DELETE FROM Bookings WHERE BookingID = ?", (booking_id,))
+        app_module.get_availability().remove_booking(booking_id)
+
+
+def test_lock_spaces_holds_the_write_lock(app_module):
+    with app_module.db_connection() as conn:
+        app_module.repository.lock_spaces(conn, [1])
+        other = sqlite3.connect(PRIMARY_PATH, timeout=0)
+        try:
+            with pytest.raises(sqlite3.OperationalError, match='locked'):
+                other.execute("BEGIN IMMEDIATE")
+        finally:
+            other.close()
@@ -0,0 +1,53 @@
+import pytest
+
+from bulk_ingest import ItemError, validate_items, validate_listing
+
+LISTING = {
+    'providerId': 1,
+    'title': 'Garage in Al-Safa',
+    'type': 'Garage / parking',
+    'size': 12,
+    'price': 300,
+    'description': 'Dry and secure.',
+    'conditions': ['secure', 'cctv'],
+    'access_type': '24-7',
+}
+
+
+def test_valid_listing():
+    item = validate_listing(LISTING)
+    assert item.title == 'Garage in Al-Safa'
+    assert item.space_type == 'Garage / parking'
+    assert item.features[3:5] == (1, 1)
+
+
+@pytest.mark.parametrize('field, value', [
+    ('title', 42),
+    ('title', ['x']),
+    ('description', {'text': 'x'}),
+    ('type', None),
+    ('type', 3),
+    ('conditions', 'cctv'),
+    ('conditions', [{'name': 'cctv'}]),
+    ('access_type', ['24-7']),
+])
+def test_bad_field_is_an_item_error(field, value):
+    with pytest.raises(ItemError):
+        validate_listing({**LISTING, field: value})
+
+
+def test_bad_item_does_not_fail_the_batch():
+    valid, errors = validate_items([LISTING, {**LISTING, 'title': 7}], validate_listing)
+    assert [index for index, _ in valid] == [0]
+    assert errors == {1: 'title must be a string'}
+
+
+def test_bulk_endpoint_reports_bad_items(client):
+    response = client.post('/api/spaces/bulk', json={
+        'spaces': [{**LISTING, 'conditions': 'cctv'}, {**LISTING, 'type': ''}],
+    })
+    body = response.get_json()
+    assert response.status_code == 400
+    assert [result.get('error') for result in body['results']] == [
+        'conditions must be an array of strings', 'type is required',
+    ]
@@ -0,0 +1,68 @@
+import hashlib
+import sqlite3
+import threading
+
+import credentials
+from conftest import PRIMARY_PATH, REPLICA_PATH
+from credentials import PasswordHasher, hash_password, verify_password
+
+
+def test_legacy_hash_with_non_ascii_input():
+    stored = hashlib.sha256('كلمة السر'.encode()).hexdigest()
+    assert verify_password('كلمة السر', stored) == (True, True)
+    assert verify_password('pässword', stored) == (False, False)
+    assert verify_password('password', 'not-a-hash-é') == (False, False)
+
+
+def test_pbkdf2_hash_with_non_ascii_input():
+    stored = hash_password('pässword', iterations=1000)
+    assert verify_password('pässword', stored, iterations=1000) == (True, False)
+    assert verify_password('password', stored[:-2] + 'é', iterations=1000) == (False, False)
+
+
+def test_dummy_hash_is_computed_once_on_the_hashing_pool(monkeypatch):
+    calls = []
+
+    def recording_hash(password, iterations):
+        calls.append(threading.current_thread().name)
+        return hash_password(password, iterations)
+
+    monkeypatch.setattr(credentials, 'hash_password', recording_hash)
+    hasher = PasswordHasher(iterations=1000, workers=2)
+    try:
+        threads = [threading.Thread(target=hasher.verify, args=('guess', None)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert hasher.stats()['failed'] == 8
+        assert len(calls) == 1 and calls[0].startswith('hasher')
+    finally:
+        hasher.shutdown()
+
+
+def _set_password(email, password_hash):
+    """Write a hash to the primary and (as replication would) the replica"""
+    for path in (PRIMARY_PATH, REPLICA_PATH):
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE StorageSeekers SET Password = ? WHERE Email = ?", (password_hash, email))
+
+
+def test_changed_password_applies_while_the_account_is_cached(app_module, client):
+    with sqlite3.connect(PRIMARY_PATH) as conn:
+        email, previous = conn.execute(
+            "SELECT Email, Password FROM StorageSeekers ORDER BY SeekerID DESC LIMIT 1"
+        ).fetchone()
+
+    def login(password):
+        return client.post('/api/login', json={'email': email, 'password': password}).status_code
+
+    try:
+        assert login('password123') == 200
+        assert app_module.identity_cache.get(email) is not None
+        _set_password(email, hash_password('n3w-password', iterations=1000))
+        assert login('password123') == 401
+        assert login('n3w-password') == 200
+    finally:
+        _set_password(email, previous)
+        app_module.identity_cache.invalidate(email)
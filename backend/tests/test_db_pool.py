@@ -0,0 +1,93 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+class Factory:
+    """Connection factory that counts what it opened"""
+
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self):
+        conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self.opened.append(conn)
+        return conn
+
+
+def test_connections_are_reused():
+    connect = Factory()
+    pool = ConnectionPool(connect, size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+    assert first is second
+    assert len(connect.opened) == 1
+    assert pool.stats()['checkouts'] == 2
+
+
+def test_checkout_times_out_when_exhausted():
+    pool = ConnectionPool(Factory(), size=1, checkout_timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()['timeouts'] == 1
+    pool.release(held)
+    pool.release(pool.acquire(timeout=0))
+
+
+def test_waiting_checkout_gets_the_released_connection():
+    pool = ConnectionPool(Factory(), size=1, checkout_timeout=5)
+    held = pool.acquire()
+    threading.Timer(0.05, pool.release, (held,)).start()
+    entry = pool.acquire()
+    assert entry is held
+    assert pool.stats()['waitTimeMaxMs'] > 0
+    pool.release(entry)
+
+
+def test_connections_past_their_lifetime_are_recycled():
+    connect = Factory()
+    pool = ConnectionPool(connect, size=1, max_lifetime=0.05, max_idle=0)
+    with pool.connection():
+        pass
+    time.sleep(0.1)
+    with pool.connection() as conn:
+        assert conn is connect.opened[1]
+    assert pool.stats()['recycled'] >= 1
+
+
+def test_dead_idle_connection_is_replaced_on_checkout():
+    connect = Factory()
+    pool = ConnectionPool(connect, size=1, validate_after=0)
+    with pool.connection() as conn:
+        pass
+    conn.close()
+    with pool.connection() as conn:
+        assert conn is connect.opened[1]
+        conn.execute('SELECT 1')
+
+
+def test_broken_connection_is_not_returned_to_the_pool():
+    connect = Factory()
+    pool = ConnectionPool(connect, size=1)
+    entry = pool.acquire()
+    pool.release(entry, broken=True)
+    assert pool.stats()['idle'] == 0
+    with pool.connection() as conn:
+        assert conn is connect.opened[1]
+
+
+def test_uncommitted_work_is_rolled_back_on_release():
+    pool = ConnectionPool(Factory(), size=1)
+    with pool.connection() as conn:
+        conn.execute('CREATE TABLE t (x)')
+        conn.commit()
+        conn.execute('INSERT INTO t VALUES (1)')
+    with pool.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
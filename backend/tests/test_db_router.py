@@ -0,0 +1,37 @@
+import sqlite3
+import time
+
+from db_pool import ConnectionPool
+from db_router import DatabaseRouter
+
+
+def _pool(**kwargs):
+    return ConnectionPool(lambda: sqlite3.connect(':memory:', check_same_thread=False), **kwargs)
+
+
+def test_busy_replica_falls_back_without_waiting_the_checkout_timeout():
+    primary = _pool(size=1)
+    replica = _pool(size=1, checkout_timeout=5)
+    router = DatabaseRouter(primary, [('replica', replica)], replica_wait=0.05)
+    held = replica.acquire()
+    try:
+        started = time.monotonic()
+        with router.connection(read_only=True) as conn:
+            conn.execute('SELECT 1')
+        assert time.monotonic() - started < 1
+        stats = router.stats()
+        assert stats['fallbacks'] == 1
+        # Busy is not down: the replica stays in rotation
+        assert stats['replicas'][0]['healthy']
+    finally:
+        replica.release(held)
+        router.close()
+
+
+def test_free_replica_serves_reads():
+    router = DatabaseRouter(_pool(size=1), [('replica', _pool(size=1))], replica_wait=0)
+    with router.connection(read_only=True):
+        pass
+    assert router.stats()['replicas'][0]['routed'] == 1
+    assert router.stats()['primaryReads'] == 0
+    router.close()
@@ -0,0 +1,40 @@
+import os
+
+import numpy as np
+import pytest
+
+import embedding_store
+
+
+def _save(prefix, count, seed):
+    vectors = np.random.default_rng(seed).standard_normal((count, 8))
+    ids = np.arange(1, count + 1)
+    embedding_store.save(prefix, ids, vectors, hashes=np.arange(count, dtype=np.uint64))
+    return ids
+
+
+def test_open_store_keeps_its_version(tmp_path):
+    prefix = str(tmp_path / 'spaces')
+    _save(prefix, 5, seed=1)
+    store = embedding_store.EmbeddingStore(prefix)
+
+    _save(prefix, 7, seed=2)
+    assert len(store.ids) == len(store.matrix) == len(store.hashes()) == 5
+    reopened = embedding_store.EmbeddingStore(prefix)
+    assert len(reopened.ids) == len(reopened.matrix) == len(reopened.hashes()) == 7
+
+
+def test_old_versions_are_pruned(tmp_path):
+    prefix = str(tmp_path / 'spaces')
+    for seed in range(4):
+        _save(prefix, 3, seed)
+    versions = [name for name in os.listdir(tmp_path) if name.startswith('spaces.v')]
+    assert len(versions) == 2
+
+
+def test_mismatched_lengths_are_rejected(tmp_path):
+    prefix = str(tmp_path / 'spaces')
+    np.save(f"{prefix}.npy", np.ones((4, 8), dtype=np.float32))
+    np.save(f"{prefix}.ids.npy", np.arange(3, dtype=np.int64))
+    with pytest.raises(ValueError):
+        embedding_store.EmbeddingStore(prefix)
@@ -0,0 +1,13 @@
+import zlib
+
+from http_caching import gzip_stream
+
+
+def test_gzip_stream_chunks_decode_as_they_arrive():
+    lines = [f'{{"spaceId": {n}}}\n' for n in range(3)]
+    decoder = zlib.decompressobj(31)
+    stream = gzip_stream(iter(lines))
+    for line in lines:
+        assert decoder.decompress(next(stream)).decode() == line
+    decoder.decompress(b''.join(stream))
+    assert decoder.eof
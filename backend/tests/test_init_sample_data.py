@@ -0,0 +1,61 @@
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+import init_sample_data
+from init_sample_data import BulkLoader
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def json(self):
+        return {'created': 1, 'results': [{'index': 0, 'success': True}]}
+
+
+class FakeSession:
+    """Replays a list of responses / exceptions, one per POST"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.posts = 0
+
+    def post(self, url, json, timeout):
+        self.posts += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(outcome)
+
+
+def _loader(monkeypatch, outcomes):
+    monkeypatch.setattr(init_sample_data.time, 'sleep', lambda seconds: None)
+    loader = BulkLoader('http://api', provider_id=1, retries=3)
+    session = FakeSession(outcomes)
+    loader._local.session = session
+    return loader, session
+
+
+def _refused():
+    reason = NewConnectionError(None, 'Connection refused')
+    return requests.ConnectionError(MaxRetryError(None, '/api/spaces/bulk', reason))
+
+
+@pytest.mark.parametrize('outcome', [429, 503, _refused()])
+def test_retries_requests_the_server_did_not_process(monkeypatch, outcome):
+    loader, session = _loader(monkeypatch, [outcome, 201])
+    assert loader._post([{}])[0] == 201
+    assert session.posts == 2
+
+
+@pytest.mark.parametrize('outcome', [
+    500, 502, 504,
+    requests.exceptions.ReadTimeout(),
+    requests.ConnectionError('Connection aborted'),
+])
+def test_does_not_resend_a_batch_that_may_have_been_saved(monkeypatch, outcome):
+    loader, session = _loader(monkeypatch, [outcome, 201])
+    with pytest.raises(Exception):
+        loader._post([{}])
+    assert session.posts == 1
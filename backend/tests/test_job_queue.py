@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from job_queue import JobQueue, JobWorkers, PermanentJobError
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / 'jobs.db'))
+
+
+def _status(queue, key):
+    return queue._connect().execute(
+        "SELECT Status, Attempts, LastError FROM Jobs WHERE IdempotencyKey = ?", (key,)
+    ).fetchone()
+
+
+def test_enqueue_ignores_existing_keys(queue):
+    assert queue.enqueue('notify', 'tx-1:a', {'n': 1})
+    assert not queue.enqueue('notify', 'tx-1:a', {'n': 2})
+    assert queue.claim().payload == {'n': 1}
+
+
+def test_expired_lease_is_claimed_again(queue):
+    queue.enqueue('capture_payment', 'tx-1', {})
+    first = queue.claim(lease=0.05)
+    assert queue.claim() is None
+    time.sleep(0.1)
+    second = queue.claim()
+    assert second.job_id == first.job_id
+    assert second.attempts == 2
+
+
+def _run_once(queue, handlers, **kwargs):
+    workers = JobWorkers(queue, handlers, workers=0, **kwargs)
+    workers._execute(queue.claim())
+    return workers
+
+
+def test_failed_job_is_retried_with_backoff(queue):
+    queue.enqueue('notify', 'tx-1:seeker', {})
+
+    def fail(payload):
+        raise RuntimeError('downstream unavailable')
+
+    workers = _run_once(queue, {'notify': fail}, retry_delay=60)
+    assert _status(queue, 'tx-1:seeker') == ('queued', 1, 'RuntimeError: downstream unavailable')
+    assert queue.claim() is None
+    assert workers.stats()['retried'] == 1
+
+
+def test_job_is_buried_after_max_attempts(queue):
+    queue.enqueue('capture_payment', 'tx-1', {'bookingId': 7})
+    dead = []
+
+    def fail(payload):
+        raise RuntimeError('declined')
+
+    workers = _run_once(queue, {'capture_payment': fail}, max_attempts=1,
+                        on_dead=lambda job, error: dead.append((job.key, error)))
+    assert _status(queue, 'tx-1')[0] == 'dead'
+    assert dead == [('tx-1', 'RuntimeError: declined')]
+    assert workers.stats()['dead'] == 1
+
+
+def test_permanent_error_is_buried_at_once(queue):
+    queue.enqueue('capture_payment', 'tx-1', {})
+
+    def decline(payload):
+        raise PermanentJobError('card declined')
+
+    _run_once(queue, {'capture_payment': decline}, max_attempts=8)
+    assert _status(queue, 'tx-1')[:2] == ('dead', 1)
+
+
+def test_maintenance_runs_periodically_while_busy(queue):
+    runs = []
+    ran_twice = threading.Event()
+
+    def maintenance():
+        runs.append(time.monotonic())
+        if len(runs) >= 2:
+            ran_twice.set()
+
+    def handler(payload):
+        # Keep the queue busy so the workers are never idle
+        queue.enqueue('busy', f"job-{payload['n'] + 1}", {'n': payload['n'] + 1})
+
+    queue.enqueue('busy', 'job-0', {'n': 0})
+    workers = JobWorkers(queue, {'busy': handler}, workers=1,
+                         maintenance=maintenance, maintenance_interval=0.05)
+    workers.start()
+    try:
+        assert ran_twice.wait(5)
+    finally:
+        workers.stop()
@@ -0,0 +1,39 @@
+from metrics import MetricsRegistry
+
+
+def _families(text):
+    """Family names in the order their samples appear"""
+    histograms = {line.split()[2] for line in text.splitlines()
+                  if line.startswith('# TYPE') and line.endswith(' histogram')}
+    order = []
+    for line in text.splitlines():
+        if line.startswith('#'):
+            continue
+        name = line.split('{')[0]
+        base = name.rsplit('_', 1)[0]
+        if base in histograms and name[len(base):] in ('_bucket', '_sum', '_count'):
+            name = base
+        if not order or order[-1] != name:
+            order.append(name)
+    return order
+
+
+def test_render_groups_interleaved_gauges():
+    registry = MetricsRegistry()
+    registry.describe('running', 'gauge', 'Running')
+    registry.describe('waiting', 'gauge', 'Waiting')
+    text = registry.render([
+        ('running', (('class', 'a'),), 1),
+        ('waiting', (('class', 'a'),), 2),
+        ('running', (('class', 'b'),), 3),
+        ('waiting', (('class', 'b'),), 4),
+    ])
+    order = _families(text)
+    assert len(order) == len(set(order)) == 2
+    assert text.count('# TYPE') == 2
+
+
+def test_metrics_endpoint_families_are_contiguous(client):
+    client.get('/api/health')
+    order = _families(client.get('/api/metrics').get_data(as_text=True))
+    assert len(order) == len(set(order))
@@ -0,0 +1,24 @@
+import sqlite3
+import time
+
+import pytest
+
+from conftest import PRIMARY_PATH
+from sqlite_repository import SqliteRepository
+
+ENDLESS = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT COUNT(*) FROM n"
+
+
+@pytest.mark.parametrize('read_only', [False, True])
+def test_statement_is_interrupted_after_query_timeout(read_only):
+    repository = SqliteRepository(PRIMARY_PATH, read_only=read_only, query_timeout=1)
+    conn = repository.connect()
+    try:
+        started = time.monotonic()
+        with pytest.raises(sqlite3.OperationalError, match='interrupted'):
+            conn.cursor().execute(ENDLESS).fetchall()
+        assert time.monotonic() - started < 5
+        # The connection stays usable for the next statement
+        assert conn.execute("SELECT COUNT(*) FROM StorageSpaces").fetchone()[0] > 0
+    finally:
+        conn.close()
@@ -0,0 +1,47 @@
+import sqlite3
+
+from conftest import PRIMARY_PATH
+
+
+def _booking_visible(app_module, booking_id, headers):
+    with app_module.app.test_request_context(headers=headers):
+        with app_module.db_connection(read_only=True) as conn:
+            row = conn.execute("SELECT 1 FROM Bookings WHERE BookingID = ?", (booking_id,)).fetchone()
+    return row is not None
+
+
+def test_write_then_read_goes_to_primary(app_module, client):
+    with sqlite3.connect(PRIMARY_PATH) as conn:
+        space_id = conn.execute(
+            "SELECT MIN(SpaceID) FROM StorageSpaces WHERE IsAvailable = 1 AND Status = 'Active'"
+        ).fetchone()[0]
+    response = client.post('/api/bookings', json={
+        'seekerId': 1,
+        'spaceId': space_id,
+        'startDate': '2032-05-01',
+        'endDate': '2032-05-20',
+        'totalAmount': 100,
+    })
+    assert response.status_code == 201, response.get_json()
+    booking_id = response.get_json()['booking']['bookingId']
+    hint = response.headers[app_module.PRIMARY_HEADER]
+
+    # The replica is a copy taken before the booking, so only the primary has it
+    assert not _booking_visible(app_module, booking_id, {})
+    primary_reads = app_module.db_router.stats()['primaryReads']
+    assert _booking_visible(app_module, booking_id, {app_module.PRIMARY_HEADER: hint})
+    assert app_module.db_router.stats()['primaryReads'] == primary_reads + 1
+
+
+def test_expired_hint_reads_from_replica(app_module):
+    routed = app_module.db_router.stats()['replicas'][0]['routed']
+    with app_module.app.test_request_context(headers={app_module.PRIMARY_HEADER: '1.0'}):
+        with app_module.db_connection(read_only=True):
+            pass
+    assert app_module.db_router.stats()['replicas'][0]['routed'] == routed + 1
+
+
+def test_primary_header_is_exposed_to_cross_origin_pages(app_module, client):
+    response = client.get('/api/health', headers={'Origin': 'http://127.0.0.1:5500'})
+    exposed = response.headers.get('Access-Control-Expose-Headers', '')
+    assert app_module.PRIMARY_HEADER.lower() in exposed.lower()
@@ -0,0 +1,58 @@
+import sqlite3
+
+import pytest
+
+from conftest import PRIMARY_PATH, REPLICA_PATH
+from repository import SearchFilters
+
+
+def _filters(term):
+    return SearchFilters(term, None, None, None, None, None)
+
+
+@pytest.mark.parametrize('term', ['e', 'a', 's', '7', 'x*', 'storage e', 'e storage'])
+def test_short_terms_match_sql_like(app_module, term):
+    filters = _filters(term)
+    sql_filters, space_ids = app_module.resolve_search_term(filters)
+    assert space_ids is None
+    assert sql_filters.search_term == term
+
+    with app_module.db_connection() as conn:
+        via_index = app_module.repository.count_spaces_matching(conn, sql_filters, space_ids)
+        via_like = app_module.repository.count_spaces_matching(conn, filters)
+    assert via_index == via_like
+    if len(term) == 1:
+        assert via_like > 0
+
+
+def test_indexed_terms_are_resolved(app_module):
+    sql_filters, space_ids = app_module.resolve_search_term(_filters('garage'))
+    assert sql_filters.search_term == ''
+    with app_module.db_connection() as conn:
+        assert app_module.repository.count_spaces_matching(conn, sql_filters, space_ids) == \
+            app_module.repository.count_spaces_matching(conn, _filters('garage'))
+
+
+def _set_title(space_id, title):
+    """Write a title to the primary and (as replication would) the replica"""
+    previous = None
+    for path in (PRIMARY_PATH, REPLICA_PATH):
+        with sqlite3.connect(path) as conn:
+            previous = conn.execute(
+                "SELECT Title FROM StorageSpaces WHERE SpaceID = ?", (space_id,)
+            ).fetchone()[0]
+            conn.execute("UPDATE StorageSpaces SET Title = ? WHERE SpaceID = ?", (title, space_id))
+    return previous
+
+
+def test_rebuild_picks_up_edited_listings(app_module, monkeypatch):
+    index = app_module.get_text_index()
+    title = _set_title(1, 'Zanzibarish loft')
+    try:
+        monkeypatch.setattr(app_module, 'TEXT_INDEX_MAX_AGE', 0)
+        monkeypatch.setattr(app_module, '_text_index_checked', 0.0)
+        rebuilt = app_module.get_text_index()
+        assert rebuilt is not index
+        assert rebuilt.search('zanzibarish').tolist() == [1]
+    finally:
+        _set_title(1, title)
@@ -0,0 +1,270 @@
+"""
+In-memory inverted index for keyword search over listings
+
+The SQL search filters searchTerm with `Title LIKE '%term%' OR Description
+LIKE '%term%'`; the leading wildcard rules out every index, so each keyword
+search scans StorageSpaces. This index resolves the term to the SpaceIDs
+that contain it instead, and the SQL only has to look those rows up.
+
+It matches words, not substrings, so results differ from the LIKE filter:
+
+    - each query word must start a word of the listing ("gar" finds
+      "garage"); matches inside a word ("arage", "minigarage") are not found
+    - words of a multi-word query may appear anywhere and in any order, so
+      "al salama" finds "Al-Salama" and "Salama district", where LIKE only
+      finds the exact phrase
+    - stopwords ("the", "in", "في", ...) are ignored
+
+Terms shorter than MIN_PREFIX_LENGTH are left to LIKE (see search()).
+
+Text is normalized for the English and Arabic listing data:
+
+    - lowercase, accents and Arabic diacritics / tatweel stripped
+    - Arabic letter variants folded (أ إ آ -> ا, ى -> ي, ة -> ه)
+    - neighbourhood names indexed with and without the article, so
+      "Al-Salama", "Al Salama" and "Alsalama" all match "salama", and
+      "السلامة" matches "سلامه"
+
+There is no transliteration: Latin queries only match Latin text and Arabic
+queries only match Arabic text.
+
+Posting lists are sorted uint32 NumPy arrays. Listing writes go to a small
+delta (pending postings + a set of stale SpaceIDs) that is folded into the
+arrays once it grows, so updates never rebuild the whole index.
+"""
+
+import bisect
+import re
+import threading
+import unicodedata
+from array import array
+
+import numpy as np
+
+
+STOPWORDS = frozenset([
+    'a', 'al', 'an', 'and', 'el', 'for', 'in', 'of', 'on', 'the', 'to', 'with',
+    'في', 'من', 'على', 'و',
+])
+
+# Shorter query terms would expand to most of the vocabulary; they are left
+# to the SQL LIKE filter
+MIN_PREFIX_LENGTH = 2
+
+_WORD_RE = re.compile(r"\w+(?:[-'’]\w+)*", re.UNICODE)
+_SPLIT_RE = re.compile(r"[-'’_]")
+_ARABIC_FOLD = str.maketrans({'ى': 'ي', 'ة': 'ه', 'ـ': None})
+
+
+def normalize(text):
+    """Lowercase, strip accents and Arabic diacritics, fold Arabic letter forms"""
+    decomposed = unicodedata.normalize('NFKD', (text or '').lower())
+    # Arabic hamza forms decompose to a bare alef/waw/yeh + a combining mark
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return stripped.translate(_ARABIC_FOLD)
+
+
+def _strip_article(word):
+    """'alsalama' -> 'salama', 'السلامه' -> 'سلامه' (None if there is no article)"""
+    if word.startswith('ال') and len(word) > 3:
+        return word[2:]
+    if word.startswith('al') and len(word) >= 6 and word.isascii():
+        return word[2:]
+    return None
+
+
+def index_terms(text):
+    """Terms a document is indexed under (with repeats, for term frequency)"""
+    terms = []
+    for compound in _WORD_RE.findall(normalize(text)):
+        parts = [part for part in _SPLIT_RE.split(compound) if part]
+        for part in parts:
+            if part not in STOPWORDS:
+                terms.append(part)
+                bare = _strip_article(part)
+                if bare:
+                    terms.append(bare)
+        if len(parts) > 1:
+            terms.append(''.join(parts))
+    return terms
+
+
+def query_terms(text):
+    """Canonical terms of a query: compounds split, articles and stopwords dropped"""
+    terms = []
+    for compound in _WORD_RE.findall(normalize(text)):
+        for part in _SPLIT_RE.split(compound):
+            if part and part not in STOPWORDS:
+                terms.append(_strip_article(part) or part)
+    return terms
+
+
+class TextIndex:
+    """Inverted index from normalized terms to SpaceIDs
+
+    compact_after -- fold the write delta into the posting arrays once this
+                     many documents have changed since the last fold
+    """
+
+    def __init__(self, compact_after=5000):
+        self.compact_after = compact_after
+        self._lock = threading.RLock()
+        self._postings = {}       # term -> sorted np.uint32 array
+        self._vocabulary = []     # sorted terms, for prefix lookups
+        self._pending = {}        # term -> set of SpaceIDs written since the last fold
+        self._pending_terms = {}  # SpaceID -> terms of its current text (written docs only)
+        self._stale = set()       # SpaceIDs whose entries in _postings are outdated
+        self._stale_array = None
+        self.documents = 0
+        self.max_space_id = 0
+
+    # -----------------------------------------
+    # Building and updates
+    # -----------------------------------------
+
+    @classmethod
+    def build(cls, documents, **kwargs):
+        """Index (SpaceID, text) pairs in one pass"""
+        index = cls(**kwargs)
+        postings = {}
+        for space_id, text in documents:
+            space_id = int(space_id)
+            for term in set(index_terms(text)):
+                postings.setdefault(term, array('I')).append(space_id)
+            index.documents += 1
+            index.max_space_id = max(index.max_space_id, space_id)
+
+        index._postings = {term: np.unique(np.frombuffer(ids, dtype=np.uint32))
+                           for term, ids in postings.items()}
+        index._vocabulary = sorted(index._postings)
+        return index
+
+    def update(self, space_id, text):
+        """Index a new listing or re-index an edited one"""
+        space_id = int(space_id)
+        with self._lock:
+            is_new = self._forget(space_id)
+            terms = frozenset(index_terms(text))
+            self._pending_terms[space_id] = terms
+            for term in terms:
+                if term not in self._pending and term not in self._postings:
+                    bisect.insort(self._vocabulary, term)
+                self._pending.setdefault(term, set()).add(space_id)
+            if is_new:
+                self.documents += 1
+            self.max_space_id = max(self.max_space_id, space_id)
+            self._maybe_compact()
+
+    def remove(self, space_id):
+        """Drop a deleted listing"""
+        space_id = int(space_id)
+        with self._lock:
+            self._forget(space_id)
+            self._pending_terms.pop(space_id, None)
+            self.documents -= 1
+            self._maybe_compact()
+
+    def _forget(self, space_id):
+        """Hide every current entry of space_id; True if it was not indexed yet"""
+        is_new = space_id > self.max_space_id and space_id not in self._pending_terms
+        for term in self._pending_terms.get(space_id, ()):
+            self._pending[term].discard(space_id)
+        if space_id <= self.max_space_id:
+            self._stale.add(space_id)
+            self._stale_array = None
+        return is_new
+
+    def _maybe_compact(self):
+        if len(self._stale) + len(self._pending_terms) >= self.compact_after:
+            self.compact()
+
+    def compact(self):
+        """Fold pending writes and stale SpaceIDs into the posting arrays"""
+        with self._lock:
+            stale = self._stale_ids()
+            postings = {}
+            for term in set(self._postings) | set(self._pending):
+                ids = self._postings.get(term)
+                if ids is not None and len(stale):
+                    ids = ids[~np.isin(ids, stale, assume_unique=True)]
+                added = self._pending.get(term)
+                if added:
+                    extra = np.sort(np.fromiter(added, dtype=np.uint32, count=len(added)))
+                    ids = extra if ids is None else np.union1d(ids, extra)
+                if ids is not None and len(ids):
+                    postings[term] = ids.astype(np.uint32, copy=False)
+
+            self._postings = postings
+            self._vocabulary = sorted(postings)
+            self._pending = {}
+            self._pending_terms = {}
+            self._stale = set()
+            self._stale_array = None
+
+    # -----------------------------------------
+    # Queries
+    # -----------------------------------------
+
+    def search(self, query, prefix_last=True):
+        """Sorted SpaceIDs containing every query term, or None when the index
+        cannot answer the query: no indexable terms (e.g. only stopwords), or a
+        term shorter than MIN_PREFIX_LENGTH, which SQL LIKE matches anywhere
+
+        The last term is matched as a prefix when it ends in `*` or when
+        prefix_last is set, so partially typed words still match.
+        """
+        raw_terms = query.split()
+        terms = query_terms(query)
+        if not terms or any(len(term) < MIN_PREFIX_LENGTH for term in terms):
+            return None
+        prefixes = [False] * len(terms)
+        if prefix_last or (raw_terms and raw_terms[-1].endswith('*')):
+            prefixes[-1] = True
+
+        with self._lock:
+            matches = sorted(
+                (self._prefix_ids(term) if is_prefix else self._term_ids(term)
+                 for term, is_prefix in zip(terms, prefixes)),
+                key=len,
+            )
+        result = matches[0]
+        for ids in matches[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, ids, assume_unique=True)
+        return result
+
+    def _term_ids(self, term):
+        ids = self._postings.get(term)
+        if ids is None:
+            ids = np.empty(0, dtype=np.uint32)
+        elif self._stale:
+            ids = ids[~np.isin(ids, self._stale_ids(), assume_unique=True)]
+        added = self._pending.get(term)
+        if added:
+            ids = np.union1d(ids, np.fromiter(added, dtype=np.uint32, count=len(added)))
+        return ids
+
+    def _prefix_ids(self, prefix):
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + '\uffff')
+        parts = [self._term_ids(term) for term in self._vocabulary[start:end]]
+        if not parts:
+            return np.empty(0, dtype=np.uint32)
+        return np.unique(np.concatenate(parts))
+
+    def _stale_ids(self):
+        if self._stale_array is None:
+            self._stale_array = np.fromiter(self._stale, dtype=np.uint32, count=len(self._stale))
+        return self._stale_array
+
+    def stats(self):
+        with self._lock:
+            return {
+                'documents': self.documents,
+                'terms': len(self._vocabulary),
+                'postings': int(sum(len(ids) for ids in self._postings.values())),
+                'pendingDocuments': len(self._pending_terms),
+                'staleDocuments': len(self._stale),
+                'memoryBytes': int(sum(ids.nbytes for ids in self._postings.values())),
+            }